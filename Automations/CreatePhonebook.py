@@ -52,15 +52,16 @@ if __name__ == '__main__':
     from secure.secrets import ct_token
     api = ChurchToolsApi(domain_temp, ct_token)
 
-    all_persons = api.get_persons()
-
-    lemgo = list(filter(
-        lambda i: i['statusId'] == CT_PARAMETER['Status']['Mitglied'] and i['campusId'] == CT_PARAMETER['Standort'][
-            'Lemgo'], all_persons))
-
-    hameln = list(filter(
-        lambda i: i['statusId'] == CT_PARAMETER['Status']['Mitglied'] and i['campusId'] == CT_PARAMETER['Standort'][
-            'Hameln'], all_persons))
+    # Personen werden seitenweise verarbeitet während die nächste Seite bereits geladen wird
+    lemgo = []
+    hameln = []
+    for person in api.iter_persons():
+        if person['statusId'] != CT_PARAMETER['Status']['Mitglied']:
+            continue
+        if person['campusId'] == CT_PARAMETER['Standort']['Lemgo']:
+            lemgo.append(person)
+        elif person['campusId'] == CT_PARAMETER['Standort']['Hameln']:
+            hameln.append(person)
 
     # pprint(all_persons[0:5])
 
@@ -1,14 +1,57 @@
+import hashlib
 import json
 import logging
 import os
-from datetime import datetime, timedelta
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
 
-import docx
 import requests
+import urllib3
+
+from ChurchToolsApi import agenda_docx
+from ChurchToolsApi.cache import TTLCache
+from ChurchToolsApi.json_utils import json_loads
+from ChurchToolsApi.sync import IncrementalSync, SongFileMirror
+from ChurchToolsApi.transport import MultipartStream, RetryPolicy, TokenBucket
+
+# public method which started requests in worker threads - see ChurchToolsApi._with_caller
+_caller_state = threading.local()
+
+
+class _Payload:
+    def __init__(self, data, max_length=None):
+        """
+        Wrapper for response data passed to logging which is only converted to text if the message is emitted
+        :param data: any response data e.g. dict or list
+        :param max_length: max number of characters logged - None only logs a short summary of the data
+        :type max_length: int | None
+        """
+        self.data = data
+        self.max_length = max_length
+
+    def __str__(self):
+        if self.max_length is None:
+            if isinstance(self.data, (list, dict, bytes)):
+                return '<{} with {} items - enable log_payloads for content>'.format(
+                    type(self.data).__name__, len(self.data))
+            return '<{} - enable log_payloads for content>'.format(type(self.data).__name__)
+        text = str(self.data)
+        if len(text) > self.max_length:
+            return '{}... ({} characters truncated)'.format(text[:self.max_length], len(text) - self.max_length)
+        return text
 
 
 class ChurchToolsApi:
-    def __init__(self, domain, ct_token=None, ct_user=None, ct_password=None):
+    # min and max size of chunks read by file_download_from_urls - adapted to the transfer speed
+    DOWNLOAD_CHUNK_SIZES = (64 * 1024, 4 * 1024 * 1024)
+
+    def __init__(self, domain, ct_token=None, ct_user=None, ct_password=None, max_workers=4,
+                 ajax_song_cache_ttl=10, masterdata_cache_ttl=3600, retry_policy=None, rate_limit=None,
+                 pool_connections=10, pool_maxsize=None, pool_block=False, keep_alive=True, timeout=None,
+                 log_payloads=False, log_payload_max_length=1000, response_cache=None, hooks=None):
         """
         Setup of a ChurchToolsApi object for the specified ct_domain using a token login
         :param domain: including https:// ending on e.g. .de
@@ -19,11 +62,55 @@ class ChurchToolsApi:
         :type ct_user: str
         :param ct_password: indirect login using user and password combination
         :type ct_password: str
+        :param max_workers: max number of requests which are sent in parallel e.g. for pagination
+        :type max_workers: int
+        :param ajax_song_cache_ttl: number of seconds the legacy AJAX song list is kept before requesting it again
+        :type ajax_song_cache_ttl: float
+        :param masterdata_cache_ttl: number of seconds event masterdata and services are kept before requesting again
+        :type masterdata_cache_ttl: float
+        :param retry_policy: definition of retries for failed requests - defaults to RetryPolicy()
+        :type retry_policy: RetryPolicy
+        :param rate_limit: max number of requests per second sent by this object - unlimited if None
+        :type rate_limit: float
+        :param pool_connections: number of hosts for which connection pools are kept
+        :type pool_connections: int
+        :param pool_maxsize: max number of connections kept open per host - defaults to max(10, max_workers)
+        :type pool_maxsize: int
+        :param pool_block: if True threads wait for a free connection instead of opening additional ones
+        :type pool_block: bool
+        :param keep_alive: if False each connection is closed after one request
+        :type keep_alive: bool
+        :param timeout: seconds to wait for connect and each read - float or tuple (connect, read), None waits forever
+        :type timeout: float | tuple[float, float]
+        :param log_payloads: if True response data is included in debug logs - otherwise only a summary is logged
+        :type log_payloads: bool
+        :param log_payload_max_length: max number of characters of response data logged if log_payloads is True
+        :type log_payload_max_length: int
+        :param response_cache: optional persistent cache for GET responses
+            e.g. SQLiteResponseCache('cache/ct.sqlite', endpoint_ttls={'/api/event/masterdata': 86400})
+        :type response_cache: ChurchToolsApi.response_cache.ResponseCache
+        :param hooks: optional dict of event name: list of functions - see add_hook
+        :type hooks: dict[str, list[collections.abc.Callable]]
         """
         self.session = None
         self.domain = domain
-        self.ajax_song_last_update = None
-        self.ajax_song_cache = []
+        self.max_workers = max_workers
+        self.ajax_song_cache = TTLCache(ttl=ajax_song_cache_ttl)
+        self.masterdata_cache = TTLCache(ttl=masterdata_cache_ttl)
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.rate_limiter = TokenBucket(rate_limit) if rate_limit is not None else None
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize if pool_maxsize is not None else max(10, max_workers)
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.log_payloads = log_payloads
+        self.log_payload_max_length = log_payload_max_length
+        self.response_cache = response_cache
+        self.hooks = {'before_request': [], 'after_response': [], 'on_retry': []}
+        for event_name, functions in (hooks if hooks is not None else {}).items():
+            for function in functions:
+                self.add_hook(event_name, function)
 
         if ct_token is not None:
             self.login_ct_rest_api(ct_token=ct_token)
@@ -47,38 +134,331 @@ class ChurchToolsApi:
         :return: personId if login successful otherwise False
         :rtype: int | bool
         """
-        self.session = requests.Session()
+        self.session = self._create_session()
 
         if 'ct_token' in kwargs.keys():
             logging.info('Trying Login with token')
             url = self.domain + '/api/whoami'
             headers = {"Authorization": 'Login ' + kwargs['ct_token']}
-            response = self.session.get(url=url, headers=headers)
+            response = self._request('GET', url=url, headers=headers)
 
             if response.status_code == 200:
-                response_content = json.loads(response.content)
-                logging.info('Token Login Successful as {}'.format(response_content['data']['email']))
+                response_content = self._decode(response)
+                logging.info('Token Login Successful as %s', response_content['data']['email'])
                 self.session.headers['CSRF-Token'] = self.get_ct_csrf_token()
-                return json.loads(response.content)['data']['id']
+                return response_content['data']['id']
             else:
-                logging.warning("Token Login failed with {}".format(response.content.decode()))
+                logging.warning("Token Login failed with %s", response.content.decode())
                 return False
 
         elif 'ct_user' in kwargs.keys() and 'ct_password' in kwargs.keys():
             logging.info('Trying Login with Username/Password')
             url = self.domain + '/api/login'
             data = {'username': kwargs['ct_user'], 'password': kwargs['ct_password']}
-            response = self.session.post(url=url, data=data)
+            response = self._request('POST', url=url, data=data)
 
             if response.status_code == 200:
-                response_content = json.loads(response.content)
                 person = self.who_am_i()
-                logging.info('User/Password Login Successful as {}'.format(person['email']))
+                logging.info('User/Password Login Successful as %s', person['email'])
                 return person['id']
             else:
-                logging.warning("User/Password Login failed with {}".format(response.content.decode()))
+                logging.warning("User/Password Login failed with %s", response.content.decode())
                 return False
 
+    def _payload(self, data):
+        """
+        Helper to pass response data to logging without converting it to text unless the message is emitted
+        :param data: any response data e.g. dict or list
+        :return: object which is converted to (truncated) text or a summary depending on log_payloads
+        :rtype: _Payload
+        """
+        return _Payload(data, self.log_payload_max_length if self.log_payloads else None)
+
+    @staticmethod
+    def _decode(response):
+        """
+        Helper which interprets the json body of a response once
+        uses orjson or ujson if installed, otherwise the json module of the standard library
+        :param response: response of a request
+        :type response: requests.Response
+        :return: interpreted json content
+        :rtype: dict | list
+        """
+        return json_loads(response.content)
+
+    def _create_session(self):
+        """
+        Helper which creates a new requests session using the connection pool settings of this object
+        Retries are not done by urllib3 because they are handled by _request
+        :return: new session
+        :rtype: requests.Session
+        """
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=self.pool_connections,
+                                                pool_maxsize=self.pool_maxsize,
+                                                pool_block=self.pool_block)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    def get_pool_statistics(self):
+        """
+        Statistics of the connection pools of the current session which can be used to size pool_maxsize
+        connections_reused is the number of requests which did not need to open a new connection
+        :return: dict by host with number of requests, connections_created, connections_reused,
+            idle_connections and pool_maxsize - empty if there is no session
+        :rtype: dict[str, dict[str, int]]
+        """
+        statistics = {}
+        if self.session is None:
+            return statistics
+
+        adapters = {id(adapter): adapter for adapter in self.session.adapters.values()}
+        for adapter in adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                host = '{}://{}:{}'.format(pool.scheme, pool.host, pool.port)
+                statistics[host] = {
+                    'requests': pool.num_requests,
+                    'connections_created': pool.num_connections,
+                    'connections_reused': max(pool.num_requests - pool.num_connections, 0),
+                    'idle_connections': pool.pool.qsize() if pool.pool is not None else 0,
+                    'pool_maxsize': self.pool_maxsize,
+                }
+
+        return statistics
+
+    def add_hook(self, event_name, function):
+        """
+        Registers a function which is called with a dict describing each HTTP request sent to ChurchTools
+        the dict contains method, url, endpoint (url with ids replaced by {id}), caller (outermost public method
+        of this object which caused the request), attempt, status, bytes (size of the response body),
+        latency (seconds until the response was received), error (name of the exception if the request failed)
+        and delay (seconds before the next attempt - on_retry only)
+        Requests answered by response_cache are not sent and therefore not reported
+        Hooks should return quickly because they are called in the thread sending the request
+        e.g. ChurchToolsApi.metrics.MetricsAggregator().attach(api)
+        :param event_name: 'before_request', 'after_response' or 'on_retry'
+        :type event_name: str
+        :param function: function with one param which is called with the dict
+        :type function: collections.abc.Callable
+        """
+        if event_name not in self.hooks.keys():
+            raise ValueError('event_name must be one of {}'.format(list(self.hooks.keys())))
+        self.hooks[event_name].append(function)
+
+    def remove_hook(self, event_name, function):
+        """
+        Removes a function registered using add_hook
+        :param event_name: 'before_request', 'after_response' or 'on_retry'
+        :type event_name: str
+        :param function: function which was registered
+        :type function: collections.abc.Callable
+        """
+        if function in self.hooks.get(event_name, []):
+            self.hooks[event_name].remove(function)
+
+    def _call_hooks(self, event_name, event):
+        """
+        Helper which calls all functions registered for an event - failing hooks do not affect the request
+        :param event_name: 'before_request', 'after_response' or 'on_retry'
+        :type event_name: str
+        :param event: description of the request - see add_hook
+        :type event: dict
+        """
+        for function in self.hooks[event_name]:
+            try:
+                function(event)
+            except Exception:
+                logging.exception("%s hook %s failed", event_name, function)
+
+    def _observed(self):
+        """
+        :return: if any hook is registered - request details are only collected if required
+        :rtype: bool
+        """
+        return any(len(functions) > 0 for functions in self.hooks.values())
+
+    def _caller(self):
+        """
+        Helper which finds the outermost public method of this object which caused the current request
+        :return: name of the method or None if called from outside of this object e.g. while iterating iter_persons
+        :rtype: str | None
+        """
+        caller = getattr(_caller_state, 'caller', None)
+        if caller is not None:
+            return caller
+        frame = sys._getframe(1)
+        while frame is not None:
+            if not frame.f_code.co_name.startswith('_') and frame.f_locals.get('self') is self:
+                caller = frame.f_code.co_name
+            frame = frame.f_back
+        return caller
+
+    def _with_caller(self, function):
+        """
+        Helper which wraps a function executed by worker threads so its requests are reported with the public method
+        which started the threads - the function is returned unchanged if no hooks are registered
+        :param function: function which is called within a worker thread
+        :type function: collections.abc.Callable
+        :return: wrapped function
+        :rtype: collections.abc.Callable
+        """
+        if not self._observed():
+            return function
+        caller = self._caller()
+
+        def run_with_caller(*args, **kwargs):
+            previous = getattr(_caller_state, 'caller', None)
+            _caller_state.caller = caller
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _caller_state.caller = previous
+
+        return run_with_caller
+
+    @staticmethod
+    def _endpoint(url, params=None, data=None):
+        """
+        Helper which creates a name of the endpoint of a request used to group requests in metrics
+        :param url: url of the request
+        :type url: str
+        :param params: params of the request
+        :type params: dict
+        :param data: form data of the request
+        :type data: dict
+        :return: path with numeric ids replaced by {id} and the legacy module / AJAX function if available
+            e.g. /api/events/{id}/agenda or /index.php?q=churchservice/ajax&func=getAllEventData
+        :rtype: str
+        """
+        parts = urlsplit(url)
+        endpoint = '/'.join('{id}' if segment.isdigit() else segment for segment in parts.path.split('/'))
+        query = parse_qs(parts.query)
+        module = query.get('q', [None])[0] or (params.get('q') if isinstance(params, dict) else None)
+        if module is not None:
+            endpoint += '?q=' + module
+            function = query.get('func', [None])[0] or (data.get('func') if isinstance(data, dict) else None)
+            if function is not None:
+                endpoint += '&func=' + function
+        return endpoint
+
+    def _request(self, method, url, **kwargs):
+        """
+        Central helper used for all requests to ChurchTools
+        GET requests are answered from response_cache if configured, all other requests are sent using _send
+        Successful changes of REST resources remove cached responses of the same resource type
+        :param method: HTTP method e.g. 'GET'
+        :type method: str
+        :param url: full url of the request
+        :type url: str
+        :param kwargs: passed on to requests.Session.request e.g. params, data, headers, stream
+            timeout of this object is used unless specified
+        :return: response of the server or the cache
+        :rtype: requests.Response
+        """
+        if self.response_cache is None:
+            return self._send(method, url, **kwargs)
+
+        if method != 'GET':
+            response = self._send(method, url, **kwargs)
+            if response.status_code < 400 and '/api/' in url:
+                resource = '/api/' + url.split('/api/', 1)[1].split('/')[0].split('?')[0]
+                self.response_cache.invalidate(resource)
+            return response
+
+        if kwargs.get('stream', False) or not self.response_cache.is_cacheable(url):
+            return self._send(method, url, **kwargs)
+
+        key = self.response_cache.key(url, kwargs.get('params'))
+        cached = self.response_cache.get(key)
+        if cached is not None and cached.age < self.response_cache.ttl_for(key):
+            self.response_cache.record('hits')
+            return cached.to_response()
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if cached is not None:
+            if 'ETag' in cached.headers:
+                headers['If-None-Match'] = cached.headers['ETag']
+            if 'Last-Modified' in cached.headers:
+                headers['If-Modified-Since'] = cached.headers['Last-Modified']
+        response = self._send(method, url, headers=headers, **kwargs)
+
+        if response.status_code == 304 and cached is not None:
+            self.response_cache.record('revalidations')
+            self.response_cache.touch(key)
+            return cached.to_response()
+        self.response_cache.record('misses')
+        if response.status_code == 200:
+            self.response_cache.store(key, response)
+        return response
+
+    def _send(self, method, url, **kwargs):
+        """
+        Helper which sends one request to ChurchTools
+        Applies the client side rate limit and repeats failed requests according to retry_policy
+        using exponential backoff or the delay requested by the server with Retry-After
+        Requests with file uploads or streamed bodies are not repeated
+        :param method: HTTP method e.g. 'GET'
+        :type method: str
+        :param url: full url of the request
+        :type url: str
+        :param kwargs: passed on to requests.Session.request e.g. params, data, headers, stream
+            timeout of this object is used unless specified
+        :return: response of the last attempt
+        :rtype: requests.Response
+        """
+        if self.timeout is not None:
+            kwargs.setdefault('timeout', self.timeout)
+        repeatable = 'files' not in kwargs.keys() and not hasattr(kwargs.get('data'), 'read')
+        observed = self._observed()
+        if observed:
+            event = {'method': method, 'url': url, 'endpoint': self._endpoint(url, kwargs.get('params'),
+                                                                              kwargs.get('data')),
+                     'caller': self._caller(), 'attempt': 0, 'status': None, 'bytes': None, 'latency': None,
+                     'error': None}
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            if observed:
+                event['attempt'] = attempt
+                self._call_hooks('before_request', dict(event))
+                start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                if observed:
+                    event.update(latency=time.perf_counter() - start, status=None, bytes=None,
+                                 error=error.__class__.__name__)
+                    self._call_hooks('after_response', dict(event))
+                if not repeatable or not self.retry_policy.is_retryable(method, url, attempt):
+                    raise
+                delay = self.retry_policy.backoff(attempt)
+                logging.info("%s %s failed with %s - retry %s in %.1fs",
+                             method, url, error.__class__.__name__, attempt + 1, delay)
+            else:
+                if observed:
+                    size = response.headers.get('Content-Length') if kwargs.get('stream', False) \
+                        else len(response.content)
+                    event.update(latency=time.perf_counter() - start, status=response.status_code,
+                                 bytes=int(size) if size is not None else None, error=None)
+                    self._call_hooks('after_response', dict(event))
+                if not repeatable or not self.retry_policy.is_retryable(method, url, attempt, response.status_code):
+                    return response
+                retry_after = self.retry_policy.parse_retry_after(response.headers.get('Retry-After'))
+                delay = self.retry_policy.backoff(attempt, retry_after)
+                logging.info("%s %s failed with %s - retry %s in %.1fs",
+                             method, url, response.status_code, attempt + 1, delay)
+                response.close()
+            if observed:
+                self._call_hooks('on_retry', dict(event, delay=delay))
+            time.sleep(delay)
+            attempt += 1
+
     def get_ct_csrf_token(self):
         """
         Requests CSRF Token https://hilfe.church.tools/wiki/0/API-CSRF
@@ -89,13 +469,13 @@ class ChurchToolsApi:
         :rtype: str
         """
         url = self.domain + '/api/csrftoken'
-        response = self.session.get(url=url)
+        response = self._request('GET', url=url)
         if response.status_code == 200:
-            csrf_token = json.loads(response.content)["data"]
-            logging.info("CSRF Token erfolgreich abgerufen {}".format(csrf_token))
+            csrf_token = self._decode(response)["data"]
+            logging.info("CSRF Token erfolgreich abgerufen %s", csrf_token)
             return csrf_token
         else:
-            logging.warning("CSRF Token not updated because of Response {}".format(response.content.decode()))
+            logging.warning("CSRF Token not updated because of Response %s", response.content.decode())
 
     def who_am_i(self):
         """
@@ -105,18 +485,18 @@ class ChurchToolsApi:
         """
 
         url = self.domain + '/api/whoami'
-        response = self.session.get(url=url)
+        response = self._request('GET', url=url)
 
         if response.status_code == 200:
-            response_content = json.loads(response.content)
+            response_content = self._decode(response)
             if 'email' in response_content['data'].keys():
-                logging.info('Who am I as {}'.format(response_content['data']['email']))
+                logging.info('Who am I as %s', response_content['data']['email'])
                 return response_content['data']
             else:
-                logging.warning('User might not be logged in? {}'.format(response_content['data']))
+                logging.warning('User might not be logged in? %s', response_content['data'])
                 return False
         else:
-            logging.warning("Checking who am i failed with {}".format(response.status_code))
+            logging.warning("Checking who am i failed with %s", response.status_code)
             return False
 
     def check_connection_ajax(self):
@@ -129,14 +509,127 @@ class ChurchToolsApi:
         headers = {
             'accept': 'application/json'
         }
-        response = self.session.post(url=url, headers=headers)
+        response = self._request('POST', url=url, headers=headers)
         if response.status_code == 200:
             logging.debug("Response AJAX Connection successful")
             return True
         else:
-            logging.debug("Response AJAX Connection failed with {}".format(json.load(response.content)))
+            logging.debug("Response AJAX Connection failed with %s", response.status_code)
             return False
 
+    def _get_remaining_pages(self, url, response_content, headers=None, params=None):
+        """
+        Helper which requests all pages following the first page of a paginated REST response
+        As soon as the first page is known, lastPage is available - therefore all remaining pages are requested
+        in parallel (limited by max_workers) and combined in the order of the pages
+        :param url: url which was used for the first page
+        :type url: str
+        :param response_content: interpreted json content of the first page
+        :type response_content: dict
+        :param headers: headers which were used for the first page
+        :type headers: dict
+        :param params: params which were used for the first page - page number is added for each request
+        :type params: dict
+        :return: data of all pages combined or None if any page failed
+        :rtype: list | None
+        """
+        response_data = response_content['data']
+        pagination = response_content['meta']['pagination']
+        pages = range(pagination['current'] + 1, pagination['lastPage'] + 1)
+        if len(pages) == 0:
+            return response_data
+
+        logging.info("requesting pages %s to %s using %s workers", pages.start, pages.stop - 1, self.max_workers)
+
+        get_page = self._with_caller(self._get_page)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            page_results = list(executor.map(lambda page: get_page(url, headers, params, page), pages))
+
+        if None in page_results:
+            return None
+        for page_content in page_results:
+            response_data.extend(page_content['data'])
+
+        return response_data
+
+    def _get_page(self, url, headers=None, params=None, page=None):
+        """
+        Helper which requests one page of a paginated REST endpoint
+        :param url: url of the endpoint
+        :type url: str
+        :param headers: headers to send
+        :type headers: dict
+        :param params: params to send - page number is added if specified
+        :type params: dict
+        :param page: number of the page which should be requested - None for the servers default
+        :type page: int
+        :return: interpreted json content of the page or None if not successful
+        :rtype: dict | None
+        """
+        page_params = dict(params) if params is not None else {}
+        if page is not None:
+            page_params['page'] = page
+        response = self._request('GET', url=url, headers=headers, params=page_params)
+        if response.status_code != 200:
+            logging.warning("page %s of %s failed with %s", page, url, response.status_code)
+            return None
+        return self._decode(response)
+
+    def _iter_paginated(self, url, headers=None, params=None):
+        """
+        Generator which yields the items of a paginated REST endpoint page by page
+        The next page is already requested in the background while the current page is being consumed
+        :param url: url of the endpoint
+        :type url: str
+        :param headers: headers to send
+        :type headers: dict
+        :param params: params to send with each page
+        :type params: dict
+        :return: generator of items
+        :rtype: collections.abc.Iterator[dict]
+        :raises requests.HTTPError: if a page could not be loaded - instead of silently returning incomplete results
+        """
+        # the public method is only part of the call stack before the generator is started
+        return self._iter_pages(self._with_caller(self._get_page), url, headers, params)
+
+    @staticmethod
+    def _iter_pages(get_page, url, headers, params):
+        """
+        Generator used by _iter_paginated
+        :param get_page: function with the same params as _get_page
+        :type get_page: collections.abc.Callable
+        """
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            next_page = executor.submit(get_page, url, headers, params)
+            while next_page is not None:
+                response_content = next_page.result()
+                if response_content is None:
+                    raise requests.HTTPError('Requesting {} failed - results are incomplete'.format(url))
+
+                next_page = None
+                if 'meta' in response_content.keys() and 'pagination' in response_content['meta'].keys():
+                    pagination = response_content['meta']['pagination']
+                    if pagination['current'] < pagination['lastPage']:
+                        next_page = executor.submit(get_page, url, headers, params, pagination['current'] + 1)
+
+                response_data = response_content['data']
+                yield from [response_data] if isinstance(response_data, dict) else response_data
+
+    def _persons_request(self, **kwargs):
+        """
+        Helper which prepares url and params used to request persons
+        :param kwargs: same keywords as get_persons
+        :return: tuple of url and params
+        :rtype: tuple[str, dict]
+        """
+        url = self.domain + '/api/persons?limit=500'
+        params = {}
+        if 'isArchived' in kwargs.keys():
+            url += '&is_archived={}'.format(kwargs["isArchived"])
+        if 'ids' in kwargs.keys():
+            params['ids[]'] = kwargs['ids']
+        return url, params
+
     def get_persons(self, **kwargs):
         """
         Function to get list of all or a person from CT
@@ -147,40 +640,31 @@ class ChurchToolsApi:
         :return: list of user dicts
         :rtype: list[dict]
         """
-        url = self.domain + '/api/persons?limit=500'
-        params = {}
-        if 'isArchived' in kwargs.keys():
-            url += '&is_archived={}'.format(kwargs["isArchived"])
-        if 'ids' in kwargs.keys():
-            params['ids[]'] = kwargs['ids']
+        url, params = self._persons_request(**kwargs)
 
         headers = {
             'accept': 'application/json'
         }
-        response = self.session.get(url=url, params=params, headers=headers)
+        response = self._request('GET', url=url, params=params, headers=headers)
 
         if response.status_code == 200:
-            response_content = json.loads(response.content)
-            response_data = response_content['data'].copy()
+            response_content = self._decode(response)
+            response_data = response_content['data']
 
-            logging.debug("First response of GET Persons successful {}".format(response_content))
+            logging.debug("First response of GET Persons successful %s", self._payload(response_content))
 
             if len(response_data) == 0:
-                logging.warning('Requesting ct_users {} returned an empty response - '
-                                'make sure the user has correct permissions'.format(params))
+                logging.warning('Requesting ct_users %s returned an empty response - '
+                                'make sure the user has correct permissions', params)
 
             if 'meta' not in response_content.keys():  # Shortcut without Pagination
                 return [response_data] if isinstance(response_data, dict) else response_data
 
             # Long part extending results with pagination
-            while response_content['meta']['pagination']['current'] \
-                    < response_content['meta']['pagination']['lastPage']:
-                logging.info("page {} of {}".format(response_content['meta']['pagination']['current'],
-                                                    response_content['meta']['pagination']['lastPage']))
-                params = {'page': response_content['meta']['pagination']['current'] + 1}
-                response = self.session.get(url=url, headers=headers, params=params)
-                response_content = json.loads(response.content)
-                response_data.extend(response_content['data'])
+            response_data = self._get_remaining_pages(url, response_content, headers=headers, params=params)
+            if response_data is None:
+                logging.warning("Persons request failed while loading pagination")
+                return None
 
             if 'returnAsDict' in kwargs and not 'serviceId' in kwargs:
                 if kwargs['returnAsDict']:
@@ -189,12 +673,42 @@ class ChurchToolsApi:
                         result[item['id']] = item
                     response_data = result
 
-            logging.debug("Persons load successful {}".format(response_data))
+            logging.debug("Persons load successful %s", self._payload(response_data))
             return response_data
         else:
-            logging.info("Persons requested failed: {}".format(response.status_code))
+            logging.info("Persons requested failed: %s", response.status_code)
             return None
 
+    def iter_persons(self, **kwargs):
+        """
+        Generator variant of get_persons which yields one person after another while pages are loaded
+        the next page is requested in the background while the current one is processed
+        :param kwargs: optional keywords as listed
+        :keyword ids: list: of a ids filter
+        :keyword isArchived: bool
+        :return: generator of user dicts
+        :rtype: collections.abc.Iterator[dict]
+        :raises requests.HTTPError: if a page could not be loaded
+        """
+        url, params = self._persons_request(**kwargs)
+        headers = {
+            'accept': 'application/json'
+        }
+        return self._iter_paginated(url, headers=headers, params=params)
+
+    def sync_persons(self, snapshot_path, save=True):
+        """
+        Compares all persons with a local snapshot and returns the changes since the last sync
+        see ChurchToolsApi.sync.IncrementalSync
+        :param snapshot_path: filepath of the json snapshot - will be created on first run
+        :type snapshot_path: str
+        :param save: if the snapshot should be updated
+        :type save: bool
+        :return: changeset dict with keys added, changed, deleted, unchanged and watermark
+        :rtype: dict
+        """
+        return IncrementalSync(self, snapshot_path, 'persons').run(save=save)
+
     def get_songs(self, **kwargs):
         """ Gets list of all songs from the server
         :key kwargs song_id: int: optional filter by song id
@@ -208,59 +722,116 @@ class ChurchToolsApi:
         headers = {
             'accept': 'application/json'
         }
-        response = self.session.get(url=url, headers=headers)
+        response = self._request('GET', url=url, headers=headers)
 
         if response.status_code == 200:
-            response_content = json.loads(response.content)
-            response_data = response_content['data'].copy()
-            logging.debug("First response of GET Songs successful {}".format(response_content))
+            response_content = self._decode(response)
+            response_data = response_content['data']
+            logging.debug("First response of GET Songs successful %s", self._payload(response_content))
 
             if 'meta' not in response_content.keys():  # Shortcut without Pagination
                 return [response_data] if isinstance(response_data, dict) else response_data
 
             # Long part extending results with pagination
-            while response_content['meta']['pagination']['current'] \
-                    < response_content['meta']['pagination']['lastPage']:
-                logging.info("page {} of {}".format(response_content['meta']['pagination']['current'],
-                                                    response_content['meta']['pagination']['lastPage']))
-                params = {'page': response_content['meta']['pagination']['current'] + 1}
-                response = self.session.get(url=url, headers=headers, params=params)
-                response_content = json.loads(response.content)
-                response_data.extend(response_content['data'])
+            response_data = self._get_remaining_pages(url, response_content, headers=headers)
+            if response_data is None:
+                logging.warning("Something went wrong fetching songs while loading pagination")
+                return None
 
             return response_data
         else:
             if "song_id" in kwargs.keys():
-                logging.info("Did not find song ({}) with CODE {}".format(kwargs["song_id"], response.status_code))
+                logging.info("Did not find song (%s) with CODE %s", kwargs["song_id"], response.status_code)
             else:
-                logging.warning("Something went wrong fetching songs: CODE {}".format(response.status_code))
+                logging.warning("Something went wrong fetching songs: CODE %s", response.status_code)
 
-    def get_song_ajax(self, song_id=None, require_update_after_seconds=10):
+    def iter_songs(self, **kwargs):
+        """
+        Generator variant of get_songs which yields one song after another while pages are loaded
+        the next page is requested in the background while the current one is processed
+        :key kwargs song_id: int: optional filter by song id
+        :return: generator of songs
+        :rtype: collections.abc.Iterator[dict]
+        :raises requests.HTTPError: if a page could not be loaded
+        """
+        url = self.domain + '/api/songs'
+        if "song_id" in kwargs.keys():
+            url = url + '/{}'.format(kwargs["song_id"])
+        headers = {
+            'accept': 'application/json'
+        }
+        return self._iter_paginated(url, headers=headers)
+
+    def sync_songs(self, snapshot_path, save=True):
+        """
+        Compares all songs with a local snapshot and returns the changes since the last sync
+        see ChurchToolsApi.sync.IncrementalSync
+        :param snapshot_path: filepath of the json snapshot - will be created on first run
+        :type snapshot_path: str
+        :param save: if the snapshot should be updated
+        :type save: bool
+        :return: changeset dict with keys added, changed, deleted, unchanged and watermark
+        :rtype: dict
+        """
+        return IncrementalSync(self, snapshot_path, 'songs').run(save=save)
+
+    def sync_song_files(self, target_dir, delete_orphans=False):
+        """
+        Mirrors all files attached to song arrangements into a local folder - only new or changed files are
+        downloaded, see ChurchToolsApi.sync.SongFileMirror
+        :param target_dir: local folder of the mirror including its manifest.json - will be created on first run
+        :type target_dir: str
+        :param delete_orphans: if local files which are no longer attached to any arrangement should be deleted
+        :type delete_orphans: bool
+        :return: dict with keys downloaded, failed, deleted, orphaned and unchanged or None if files could not be listed
+        :rtype: dict | None
+        """
+        return SongFileMirror(self, target_dir).run(delete_orphans=delete_orphans)
+
+    def get_songs_ajax(self, require_update_after_seconds=None):
+        """
+        Legacy AJAX function to get all songs in one request
+        for efficiency reasons songs are cached in ajax_song_cache and not updated unless older than its ttl
+        or require_update_after_seconds. Song changes made using this object are applied to the cache directly
+        Be aware that params of the returned object might differ from REST API responsens (e.g. Bezeichnung instead of name)
+        :param require_update_after_seconds: number of seconds after which an update of ajax song cache is required
+            defaults to ajax_song_cache_ttl used on init
+        :type require_update_after_seconds: float
+        :return: dict of all songs by song_id as str
+        :rtype: dict
+        """
+        return self.ajax_song_cache.get_or_load('songs', self._load_songs_ajax, max_age=require_update_after_seconds)
+
+    def _load_songs_ajax(self):
+        """
+        Helper which requests the full song list using legacy AJAX API without using the cache
+        :return: dict of all songs by song_id as str or None if not successful
+        :rtype: dict | None
+        """
+        url = self.domain + '/?q=churchservice/ajax&func=getAllSongs'
+        response = self._request('POST', url=url)
+        if response.status_code != 200:
+            logging.warning("Loading AJAX song list failed with %s", response.status_code)
+            return None
+        logging.debug("AJAX song cache refreshed")
+        return self._decode(response)['data']['songs']
+
+    def get_song_ajax(self, song_id=None, require_update_after_seconds=None):
         """
         Legacy AJAX function to get a specific song
         used to e.g. check for tags requires requesting full song list
-        for efficiency reasons songs are cached and not updated unless older than 15sec or update_required
+        for efficiency reasons songs are cached and not updated unless older than the cache ttl or update_required
         Be aware that params of the returned object might differ from REST API responsens (e.g. Bezeichnung instead of name)
         :param song_id: the id of the song to be searched for
         :type song_id: int
         :param require_update_after_seconds: number of seconds after which an update of ajax song cache is required
-            defaults to 10 sedonds
-        :type require_update_after_seconds: int
+            defaults to ajax_song_cache_ttl used on init
+        :type require_update_after_seconds: float
         :return: response content interpreted as json
         :rtype: dict
         """
-
-        if self.ajax_song_last_update is None:
-            require_update = True
-        else:
-            require_update = self.ajax_song_last_update + timedelta(seconds=10) < datetime.now()
-        if require_update:
-            url = self.domain + '/?q=churchservice/ajax&func=getAllSongs'
-            response = self.session.post(url=url)
-            self.ajax_song_cache = json.loads(response.content)['data']['songs']
-            self.ajax_song_last_update = datetime.now()
-
-        song = self.ajax_song_cache[str(song_id)]
+        songs = self.get_songs_ajax(require_update_after_seconds=require_update_after_seconds)
+        song = songs[str(song_id)]
 
         return song
 
@@ -271,18 +842,13 @@ class ChurchToolsApi:
         :rtype: dict
         """
 
-        url = self.domain + '/api/event/masterdata'
-        headers = {
-            'accept': 'application/json'
-        }
-        response = self.session.get(url=url, headers=headers)
-        response_content = json.loads(response.content)
-        song_categories = response_content['data']['songCategories']
-        song_category_dict = {}
-        for item in song_categories:
-            song_category_dict[item['name']] = item['id']
+        def create_song_category_map():
+            masterdata = self._get_masterdata('event_masterdata', '/api/event/masterdata')
+            if masterdata is None:
+                return None
+            return {item['name']: item['id'] for item in masterdata['songCategories']}
 
-        return song_category_dict
+        return self.masterdata_cache.get_or_load('song_category_map', create_song_category_map)
 
     def get_groups(self, **kwargs):
         """
@@ -297,29 +863,42 @@ class ChurchToolsApi:
         headers = {
             'accept': 'application/json'
         }
-        response = self.session.get(url=url, headers=headers)
+        response = self._request('GET', url=url, headers=headers)
 
         if response.status_code == 200:
-            response_content = json.loads(response.content)
-            response_data = response_content['data'].copy()
-            logging.debug("First response of Groups successful {}".format(response_content))
+            response_content = self._decode(response)
+            response_data = response_content['data']
+            logging.debug("First response of Groups successful %s", self._payload(response_content))
 
             if 'meta' not in response_content.keys():  # Shortcut without Pagination
                 return response_data
 
             # Long part extending results with pagination
-            while response_content['meta']['pagination']['current'] \
-                    < response_content['meta']['pagination']['lastPage']:
-                logging.info("page {} of {}".format(response_content['meta']['pagination']['current'],
-                                                    response_content['meta']['pagination']['lastPage']))
-                params = {'page': response_content['meta']['pagination']['current'] + 1}
-                response = self.session.get(url=url, headers=headers, params=params)
-                response_content = json.loads(response.content)
-                response_data.extend(response_content['data'])
+            response_data = self._get_remaining_pages(url, response_content, headers=headers)
+            if response_data is None:
+                logging.warning("Something went wrong fetching groups while loading pagination")
+                return None
 
             return response_data
         else:
-            logging.warning("Something went wrong fetching groups: {}".format(response.status_code))
+            logging.warning("Something went wrong fetching groups: %s", response.status_code)
+
+    def iter_groups(self, **kwargs):
+        """
+        Generator variant of get_groups which yields one group after another while pages are loaded
+        the next page is requested in the background while the current one is processed
+        :keyword group_id: int: optional filter by group id
+        :return: generator of groups
+        :rtype: collections.abc.Iterator[dict]
+        :raises requests.HTTPError: if a page could not be loaded
+        """
+        url = self.domain + '/api/groups'
+        if 'group_id' in kwargs.keys():
+            url = url + '/{}'.format(kwargs['group_id'])
+        headers = {
+            'accept': 'application/json'
+        }
+        return self._iter_paginated(url, headers=headers)
 
     def file_upload(self, source_filepath, domain_type, domain_identifier, custom_file_name=None, overwrite=False):
         """
@@ -339,53 +918,103 @@ class ChurchToolsApi:
         :return: if successful
         :rtype: bool
         """
+        result = self.file_upload_many([(source_filepath, domain_type, domain_identifier, custom_file_name)],
+                                       overwrite=overwrite)
+        return all(result['results'].values())
 
-        source_file = open(source_filepath, 'rb')
-
-        url = '{}/api/files/{}/{}'.format(self.domain, domain_type, domain_identifier)
-
-        if overwrite:
-            logging.debug("deleting old file {} before new upload".format(source_file))
-            delete_file_name = source_file.name.split('/')[-1] if custom_file_name is None else custom_file_name
-            self.file_delete(domain_type, domain_identifier, delete_file_name)
-
-        # add files as files form data with dict using 'files[]' as key and (tuple of filename and fileobject)
-        if custom_file_name is None:
-            files = {'files[]': (source_file.name.split('/')[-1], source_file)}
-        else:
-            if '/' in custom_file_name:
-                logging.warning('/ in file name ({}) will fail upload!'.format(custom_file_name))
-                files = {}
-            else:
-                files = {'files[]': (custom_file_name, source_file)}
-
-        response = self.session.post(url=url, files=files)
-        source_file.close()
-
+    def file_upload_many(self, uploads, overwrite=False, files_per_request=10):
+        """
+        Uploads many attachments - objects are handled in parallel (limited by max_workers) and up to
+        files_per_request files of one object are sent in one streamed request, so files are not kept in memory
+        :param uploads: list of (source_filepath, domain_type, domain_identifier, custom_file_name or None)
+            see file_upload for the params
+        :type uploads: list[tuple[str, str, int, str | None]]
+        :param overwrite: if true existing files with the same names are deleted before the upload -
+            files of each object are listed once
+        :type overwrite: bool
+        :param files_per_request: max number of files in one request
+        :type files_per_request: int
+        :return: dict with keys results (dict of (domain_type, domain_identifier, file name): if successful),
+            bytes (size of successful requests), duration (seconds) and throughput (bytes per second)
+        :rtype: dict
         """
-        # Issues with HEADERS in Request module when using non standard 'files[]' key in POST Request
-        # Workaround for ChurchTools - generate session with /api/whoami GET request and reuse it
-        # Requests module usually automatically completes required header Params e.g. Content-Type ...
-        # in case manual header e.g. for AUTH is used, headers don't auto complete
-        # and server rejects messsages or data is ommited 
-        # Error Code 500 is also missing in API documentation
-        
-        headers = {'Authorization': 'Login GEHEIM'}
-        response_test = requests.post(url=url, headers=headers, files=files)
-        #> this fails !
+        uploads_by_object = {}
+        results = {}
+        for source_filepath, domain_type, domain_identifier, custom_file_name in uploads:
+            filename = os.path.basename(source_filepath) if custom_file_name is None else custom_file_name
+            if '/' in filename:
+                logging.warning('/ in file name (%s) will fail upload!', filename)
+                results[(domain_type, domain_identifier, filename)] = False
+                continue
+            uploads_by_object.setdefault((domain_type, domain_identifier), []).append((filename, source_filepath))
+
+        start = time.perf_counter()
+        upload_object = self._with_caller(self._file_upload_object)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            object_results = list(executor.map(lambda item: upload_object(*item[0], item[1], overwrite,
+                                                                          files_per_request),
+                                               uploads_by_object.items()))
+        duration = time.perf_counter() - start
+
+        uploaded_bytes = 0
+        for (domain_type, domain_identifier), (files_results, files_bytes) in zip(uploads_by_object.keys(),
+                                                                                  object_results):
+            results.update({(domain_type, domain_identifier, filename): result
+                            for filename, result in files_results.items()})
+            uploaded_bytes += files_bytes
+        throughput = uploaded_bytes / duration if duration > 0 else None
+        logging.info("Uploaded %s of %s files with %s bytes in %.2fs (%.0f bytes/s)", sum(results.values()),
+                     len(results), uploaded_bytes, duration, throughput or 0)
+        return {'results': results, 'bytes': uploaded_bytes, 'duration': duration, 'throughput': throughput}
+
+    def _file_upload_object(self, domain_type, domain_identifier, files, overwrite, files_per_request):
+        """
+        Helper which uploads the files of one object for file_upload_many
+        :param files: list of (filename, source_filepath)
+        :type files: list[tuple[str, str]]
+        :return: dict of filename: if successful and number of bytes sent by successful requests
+        :rtype: tuple[dict[str, bool], int]
         """
+        url = '{}/api/files/{}/{}'.format(self.domain, domain_type, domain_identifier)
+        results = {}
+        uploaded_bytes = 0
 
-        if response.status_code == 200:
+        if overwrite:
+            existing_files = self.get_files(domain_type, domain_identifier)
+            if existing_files is None:
+                return {filename: False for filename, _ in files}, 0
+            filenames = {filename for filename, _ in files}
+            for file in existing_files:
+                if file['name'] in filenames:
+                    logging.debug("deleting old file %s before new upload", file['name'])
+                    self._request('DELETE', url='{}/api/files/{}'.format(self.domain, file['id']))
+
+        for position in range(0, len(files), files_per_request):
+            batch = files[position:position + files_per_request]
+            stream = None
             try:
-                response_content = json.loads(response.content)
-                logging.debug("Upload successful {}".format(response_content))
-                return True
-            except:
-                logging.warning(response.content.decode())
-                return False
-        else:
-            logging.warning(response.content.decode())
-            return False
+                # missing or unreadable files only fail their own batch
+                stream = MultipartStream(batch)
+                response = self._request('POST', url=url, data=stream, headers={'Content-Type': stream.content_type})
+            except (requests.RequestException, OSError) as e:
+                logging.warning("Upload failed with %s", e)
+                response = None
+            finally:
+                if stream is not None:
+                    stream.close()
+
+            success = response is not None and response.status_code == 200
+            if response is not None and not success:
+                logging.warning("Upload failed with %s", response.content.decode())
+            elif success:
+                try:
+                    logging.debug("Upload successful %s", self._payload(self._decode(response)))
+                    uploaded_bytes += len(stream)
+                except ValueError:
+                    logging.warning("Upload failed with invalid response %s", response.content.decode())
+                    success = False
+            results.update({filename: success for filename, _ in batch})
+        return results, uploaded_bytes
 
     def file_delete(self, domain_type, domain_identifier, filename_for_selective_delete=None):
         """
@@ -404,16 +1033,16 @@ class ChurchToolsApi:
         url = self.domain + '/api/files/{}/{}'.format(domain_type, domain_identifier)
 
         if filename_for_selective_delete is not None:
-            response = self.session.get(url=url)
-            files = json.loads(response.content)['data']
+            response = self._request('GET', url=url)
+            files = self._decode(response)['data']
             selective_file_ids = [item["id"] for item in files if item['name'] == filename_for_selective_delete]
             for current_file_id in selective_file_ids:
                 url = self.domain + '/api/files/{}'.format(current_file_id)
-                response = self.session.delete(url=url)
+                response = self._request('DELETE', url=url)
 
         # Delete all Files for the id online
         else:
-            response = self.session.delete(url=url)
+            response = self._request('DELETE', url=url)
 
         return response.status_code == 204  # success code for delete action upload
 
@@ -450,16 +1079,17 @@ class ChurchToolsApi:
             'beat': beat
         }
 
-        response = self.session.post(url=url, data=data)
+        response = self._request('POST', url=url, data=data)
+        self.ajax_song_cache.invalidate('songs')
 
         if response.status_code == 200:
-            response_content = json.loads(response.content)
+            response_content = self._decode(response)
             new_id = int(response_content['data'])
-            logging.debug("Song created successful with ID={}".format(new_id))
+            logging.debug("Song created successful with ID=%s", new_id)
             return new_id
 
         else:
-            logging.info("Creating song failed with {}".format(response.status_code))
+            logging.info("Creating song failed with %s", response.status_code)
             return None
 
     def edit_song(self, song_id: int, songcategory_id=None, title=None, author=None, copyright=None, ccli=None,
@@ -501,7 +1131,8 @@ class ChurchToolsApi:
             'practice_yn': practice_yn if practice_yn is not None else existing_song['shouldPractice'],
         }
 
-        response = self.session.post(url=url, data=data)
+        response = self._request('POST', url=url, data=data)
+        self.ajax_song_cache.invalidate('songs')
         return response
 
     def delete_song(self, song_id: int):
@@ -522,7 +1153,12 @@ class ChurchToolsApi:
             'id': song_id,
         }
 
-        response = self.session.post(url=url, data=data)
+        response = self._request('POST', url=url, data=data)
+        if response.status_code == 200:
+            self.ajax_song_cache.update('songs', lambda songs: songs.pop(str(song_id), None))
+            self.ajax_song_cache.invalidate('tag_index')
+        else:
+            self.ajax_song_cache.invalidate('songs')
         return response
 
     def add_song_tag(self, song_id: int, song_tag_id: int):
@@ -546,7 +1182,8 @@ class ChurchToolsApi:
             'tag_id': song_tag_id
         }
 
-        response = self.session.post(url=url, data=data)
+        response = self._request('POST', url=url, data=data)
+        self._update_ajax_song_tags(song_id, song_tag_id, add=True, successful=response.status_code == 200)
         return response
 
     def remove_song_tag(self, song_id, song_tag_id):
@@ -570,9 +1207,123 @@ class ChurchToolsApi:
             'tag_id': song_tag_id
         }
 
-        response = self.session.post(url=url, data=data)
+        response = self._request('POST', url=url, data=data)
+        self._update_ajax_song_tags(song_id, song_tag_id, add=False, successful=response.status_code == 200)
         return response
 
+    def add_song_tags_bulk(self, song_tag_ids):
+        """
+        Method to add many song tags at once using legacy AJAX API
+        pairs which already have the tag according to the AJAX song cache are skipped
+        all other pairs are sent in parallel (limited by max_workers)
+
+        :param song_tag_ids: list of tuples (song_id, song_tag_id)
+        :type song_tag_ids: list[tuple[int, int]]
+        :return: list of dicts with keys song_id, song_tag_id and result ('skipped', 'changed' or 'failed')
+            in the same order as song_tag_ids
+        :rtype: list[dict]
+        """
+        return self._change_song_tags_bulk(song_tag_ids, add=True)
+
+    def remove_song_tags_bulk(self, song_tag_ids):
+        """
+        Method to remove many song tags at once using legacy AJAX API
+        pairs which do not have the tag according to the AJAX song cache are skipped
+        all other pairs are sent in parallel (limited by max_workers)
+
+        :param song_tag_ids: list of tuples (song_id, song_tag_id)
+        :type song_tag_ids: list[tuple[int, int]]
+        :return: list of dicts with keys song_id, song_tag_id and result ('skipped', 'changed' or 'failed')
+            in the same order as song_tag_ids
+        :rtype: list[dict]
+        """
+        return self._change_song_tags_bulk(song_tag_ids, add=False)
+
+    def _change_song_tags_bulk(self, song_tag_ids, add):
+        """
+        Helper for add_song_tags_bulk and remove_song_tags_bulk
+        :param song_tag_ids: list of tuples (song_id, song_tag_id)
+        :type song_tag_ids: list[tuple[int, int]]
+        :param add: True if tags should be added, False if they should be removed
+        :type add: bool
+        :return: list of result dicts
+        :rtype: list[dict]
+        """
+        songs = self.get_songs_ajax()
+        if songs is None:
+            songs = {}
+
+        results = []
+        pending = []
+        requested = set()
+        for song_id, song_tag_id in song_tag_ids:
+            results.append({'song_id': song_id, 'song_tag_id': song_tag_id, 'result': 'skipped'})
+            song = songs.get(str(song_id))
+            if (song_id, song_tag_id) in requested:
+                continue
+            if song is not None and (str(song_tag_id) in song['tags']) == add:
+                continue
+            requested.add((song_id, song_tag_id))
+            pending.append(len(results) - 1)
+
+        change_song_tag = self._with_caller(self.add_song_tag if add else self.remove_song_tag)
+        logging.info("%s song tags to change, %s skipped", len(pending), len(results) - len(pending))
+
+        def change(index):
+            try:
+                return change_song_tag(results[index]['song_id'], results[index]['song_tag_id'])
+            except requests.RequestException as e:
+                # the tag might have been changed anyway - cached songs are not reliable any more
+                logging.warning("Changing song tag %s of song %s failed with %s", results[index]['song_tag_id'],
+                                results[index]['song_id'], e)
+                self.ajax_song_cache.invalidate('songs')
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for index, response in zip(pending, executor.map(change, pending)):
+                results[index]['result'] = 'changed' if response is not None and response.status_code == 200 \
+                    else 'failed'
+
+        return results
+
+    def _update_ajax_song_tags(self, song_id, song_tag_id, add, successful):
+        """
+        Helper which applies a tag change to the cached AJAX song list instead of requesting all songs again
+        The cache is invalidated if the change was not successful or the song is not cached
+        :param song_id: ChurchTools site specific song_id which was modified
+        :type song_id: int
+        :param song_tag_id: ChurchTools site specific song_tag_id which was added or removed
+        :type song_tag_id: int
+        :param add: True if the tag was added, False if it was removed
+        :type add: bool
+        :param successful: if the change was confirmed by the server
+        :type successful: bool
+        """
+
+        def patch_song(songs):
+            tags = songs[str(song_id)]['tags']
+            if add and str(song_tag_id) not in tags:
+                tags.append(str(song_tag_id))
+            elif not add and str(song_tag_id) in tags:
+                tags.remove(str(song_tag_id))
+
+        def patch_index(cached):
+            song_ids = cached['index'].setdefault(int(song_tag_id), set())
+            if add:
+                song_ids.add(int(song_id))
+            else:
+                song_ids.discard(int(song_id))
+
+        if not successful:
+            self.ajax_song_cache.invalidate('songs')
+            return
+        try:
+            self.ajax_song_cache.update('songs', patch_song)
+            self.ajax_song_cache.update('tag_index', patch_index)
+        except (KeyError, AttributeError):
+            logging.debug("Song %s not patchable in AJAX song cache - invalidating", song_id)
+            self.ajax_song_cache.invalidate('songs')
+
     def get_song_tags(self, song_id):
         """
         Method to get a song tag workaround using legacy AJAX API for getSong
@@ -597,6 +1348,99 @@ class ChurchToolsApi:
         tags = self.get_song_tags(song_id)
         return str(song_tag_id) in tags
 
+    def get_song_tag_index(self):
+        """
+        Helper which returns an inverted index of all song tags based on one legacy AJAX getAllSongs payload
+        The index is cached with the payload (see get_songs_ajax) - it should not be modified
+        :return: dict of song_tag_id: set of song_ids which have this tag or None if songs could not be loaded
+        :rtype: dict[int, set[int]] | None
+        """
+        return self._get_song_tag_index()[1]
+
+    def _get_song_tag_index(self):
+        """
+        Helper which returns the legacy AJAX song list together with its inverted tag index
+        The index is kept in ajax_song_cache and only created again if the song list was loaded again
+        :return: songs as returned by get_songs_ajax and dict of song_tag_id: set of song_ids
+            or (None, None) if songs could not be loaded
+        :rtype: tuple[dict | None, dict[int, set[int]] | None]
+        """
+        songs = self.get_songs_ajax()
+        if songs is None:
+            logging.warning("Song tag index not available because AJAX songs could not be loaded")
+            return None, None
+        # the index is valid as long as it was created from the currently cached song list
+        cached = self.ajax_song_cache.get('tag_index', max_age=float('inf'))
+        if cached is None or cached['songs'] is not songs:
+            cached = {'songs': songs, 'index': self._song_tag_index(songs)}
+            self.ajax_song_cache.set('tag_index', cached)
+        return songs, cached['index']
+
+    @staticmethod
+    def _song_tag_index(songs):
+        """
+        Helper which inverts the tags of a legacy AJAX getAllSongs payload
+        :param songs: dict of songs by song_id as returned by get_songs_ajax
+        :type songs: dict
+        :return: dict of song_tag_id: set of song_ids which have this tag
+        :rtype: dict[int, set[int]]
+        """
+        tag_index = {}
+        for song_id, song in songs.items():
+            for song_tag_id in song['tags']:
+                tag_index.setdefault(int(song_tag_id), set()).add(int(song_id))
+
+        return tag_index
+
+    def get_song_ids_by_tags(self, any_of=None, all_of=None, none_of=None):
+        """
+        Helper which filters song_ids by tags using the inverted song tag index
+        :param any_of: song_tag_ids of which at least one must be present
+        :type any_of: list[int]
+        :param all_of: song_tag_ids which all must be present
+        :type all_of: list[int]
+        :param none_of: song_tag_ids which must not be present
+        :type none_of: list[int]
+        :return: ids of the songs matching all criteria - empty if songs could not be loaded
+        :rtype: set[int]
+        """
+        songs, tag_index = self._get_song_tag_index()
+        if songs is None:
+            return set()
+
+        song_ids = {int(song_id) for song_id in songs.keys()}
+        if any_of is not None:
+            song_ids &= set().union(*[tag_index.get(song_tag_id, set()) for song_tag_id in any_of])
+        if all_of is not None:
+            for song_tag_id in all_of:
+                song_ids &= tag_index.get(song_tag_id, set())
+        if none_of is not None:
+            for song_tag_id in none_of:
+                song_ids -= tag_index.get(song_tag_id, set())
+
+        return song_ids
+
+    def get_songs_by_tags(self, any_of=None, all_of=None, none_of=None):
+        """
+        Helper which returns all songs matching a combination of tags
+        :param any_of: song_tag_ids of which at least one must be present
+        :type any_of: list[int]
+        :param all_of: song_tag_ids which all must be present
+        :type all_of: list[int]
+        :param none_of: song_tag_ids which must not be present
+        :type none_of: list[int]
+        :return: list of songs
+        :rtype: list[dict]
+        """
+        song_ids = self.get_song_ids_by_tags(any_of=any_of, all_of=all_of, none_of=none_of)
+        if len(song_ids) == 0:
+            return []
+
+        songs = self.get_songs()
+        result = [song for song in songs if song['id'] in song_ids]
+
+        return result
+
     def get_songs_by_tag(self, song_tag_id):
         """
         Helper which returns all songs that contain have a specific tag
@@ -605,17 +1449,7 @@ class ChurchToolsApi:
         :return: list of songs
         :rtype: list[dict]
         """
-        songs = self.get_songs()
-        songs_dict = {song['id']: song for song in songs}
-
-        filtered_song_ids = []
-        for id in songs_dict.keys():
-            if self.contains_song_tag(id, song_tag_id):
-                filtered_song_ids.append(id)
-
-        result = [songs_dict[song_id] for song_id in filtered_song_ids]
-
-        return result
+        return self.get_songs_by_tags(all_of=[song_tag_id])
 
     def get_events(self, **kwargs):
         """
@@ -631,11 +1465,59 @@ class ChurchToolsApi:
         :return: list of events
         :rtype: list[dict]
         """
-        url = self.domain + '/api/events'
+        url, params = self._events_request(**kwargs)
 
         headers = {
             'accept': 'application/json'
         }
+
+        response = self._request('GET', url=url, params=params, headers=headers)
+
+        if response.status_code == 200:
+            response_content = self._decode(response)
+            response_data = response_content['data']
+            logging.debug("First response of Events successful %s", self._payload(response_content))
+
+            if 'meta' not in response_content.keys():  # Shortcut without Pagination
+                return [response_data] if isinstance(response_data, dict) else response_data
+
+            if 'pagination' not in response_content['meta'].keys():
+                return [response_data] if isinstance(response_data, dict) else response_data
+
+            # Long part extending results with pagination
+            # TODO #1 copied from other method unsure if pagination works the same as with groups
+            response_data = self._get_remaining_pages(url, response_content, headers=headers, params=params)
+            if response_data is None:
+                logging.warning("Something went wrong fetching events while loading pagination")
+                return None
+
+            return response_data
+        else:
+            logging.warning("Something went wrong fetching events: %s", response.status_code)
+
+    def iter_events(self, **kwargs):
+        """
+        Generator variant of get_events which yields one event after another while pages are loaded
+        the next page is requested in the background while the current one is processed
+        :param kwargs: optional params to modify the search criteria - same as get_events
+        :return: generator of events
+        :rtype: collections.abc.Iterator[dict]
+        :raises requests.HTTPError: if a page could not be loaded
+        """
+        url, params = self._events_request(**kwargs)
+        headers = {
+            'accept': 'application/json'
+        }
+        return self._iter_paginated(url, headers=headers, params=params)
+
+    def _events_request(self, **kwargs):
+        """
+        Helper which prepares url and params used to request events
+        :param kwargs: same keywords as get_events
+        :return: tuple of url and params
+        :rtype: tuple[str, dict]
+        """
+        url = self.domain + '/api/events'
         params = {}
 
         if 'eventId' in kwargs.keys():
@@ -661,33 +1543,7 @@ class ChurchToolsApi:
             if 'include' in kwargs.keys():
                 params['include'] = kwargs['include']
 
-        response = self.session.get(url=url, params=params, headers=headers)
-
-        if response.status_code == 200:
-            response_content = json.loads(response.content)
-            response_data = response_content['data'].copy()
-            logging.debug("First response of Events successful {}".format(response_content))
-
-            if 'meta' not in response_content.keys():  # Shortcut without Pagination
-                return [response_data] if isinstance(response_data, dict) else response_data
-
-            if 'pagination' not in response_content['meta'].keys():
-                return [response_data] if isinstance(response_data, dict) else response_data
-
-            # Long part extending results with pagination
-            # TODO #1 copied from other method unsure if pagination works the same as with groups
-            while response_content['meta']['pagination']['current'] \
-                    < response_content['meta']['pagination']['lastPage']:
-                logging.info("page {} of {}".format(response_content['meta']['pagination']['current'],
-                                                    response_content['meta']['pagination']['lastPage']))
-                params = {'page': response_content['meta']['pagination']['current'] + 1}
-                response = self.session.get(url=url, headers=headers, params=params)
-                response_content = json.loads(response.content)
-                response_data.extend(response_content['data'])
-
-            return response_data
-        else:
-            logging.warning("Something went wrong fetching events: {}".format(response.status_code))
+        return url, params
 
 
     def get_appointments(self, calendarId, startDate, endDate):
@@ -713,16 +1569,14 @@ class ChurchToolsApi:
             'endDate': endDate
         }
 
-        response = self.session.get(url=url, headers=headers, data=data)
+        response = self._request('GET', url=url, headers=headers, data=data)
 
         if response.status_code == 201 or response.status_code == 200:
-            response_content = json.loads(response.content)
-            # print(response_content)
-            response_data = response_content['data'].copy()
+            response_content = self._decode(response)
             logging.debug("Appointments successfully retrieved")
             return response_content
         else:
-            logging.warning("Something went wrong creating the appointment: {}".format(response.status_code))
+            logging.warning("Something went wrong creating the appointment: %s", response.status_code)
 
 
 
@@ -783,19 +1637,18 @@ class ChurchToolsApi:
 
         if eventId is None:
             url = self.domain + f'/api/calendars/{calendarId}/appointments'
-            response = self.session.post(url=url, headers=headers, data=data)
+            response = self._request('POST', url=url, headers=headers, data=data)
         else:
             url = self.domain + f'/api/calendars/{calendarId}/appointments/{eventId}'
-            response = self.session.put(url=url, headers=headers, data=data)
+            response = self._request('PUT', url=url, headers=headers, data=data)
 
         if response.status_code == 201 or response.status_code == 200:
-            response_content = json.loads(response.content)
-            # print(response_content)
-            response_data = response_content['data'].copy()
-            logging.debug("Appointment successfully created or updated {}".format(response_content))
+            response_content = self._decode(response)
+            response_data = response_content['data']
+            logging.debug("Appointment successfully created or updated %s", self._payload(response_content))
             return response_data
         else:
-            logging.warning("Something went wrong creating the appointment: {}".format(response.status_code))
+            logging.warning("Something went wrong creating the appointment: %s", response.status_code)
             return None
 
 
@@ -809,17 +1662,16 @@ class ChurchToolsApi:
         headers = {
             'accept': 'application/json'
         }
-        response = self.session.get(url=url, headers=headers)
+        response = self._request('GET', url=url, headers=headers)
 
         if response.status_code == 200:
-            response_content = json.loads(response.content)
-            response_data = response_content['data'].copy()
-            logging.debug("Calendars loaded successfully {}".format(response_content))
+            response_content = self._decode(response)
+            response_data = response_content['data']
+            logging.debug("Calendars loaded successfully %s", self._payload(response_content))
 
             return response_data
         else:
-            logging.info(
-                "Calendars could not be loaded with status: {}".format(response.status_code))
+            logging.info("Calendars could not be loaded with status: %s", response.status_code)
             return None
 
     def get_AllEventData_ajax(self, eventId):
@@ -841,19 +1693,19 @@ class ChurchToolsApi:
             'id': eventId,
             'func': 'getAllEventData'
         }
-        response = self.session.post(url=url, headers=headers, params=params, data=data)
+        response = self._request('POST', url=url, headers=headers, params=params, data=data)
 
         if response.status_code == 200:
-            response_content = json.loads(response.content)
+            response_content = self._decode(response)
             if len(response_content['data']) > 0:
                 response_data = response_content['data'][str(eventId)]
-                logging.debug("AJAX Event data {}".format(response_data))
+                logging.debug("AJAX Event data %s", self._payload(response_data))
                 return response_data
             else:
-                logging.info("AJAX All Event data not successful - no event found: {}".format(response.status_code))
+                logging.info("AJAX All Event data not successful - no event found: %s", response.status_code)
                 return None
         else:
-            logging.info("AJAX All Event data not successful: {}".format(response.status_code))
+            logging.info("AJAX All Event data not successful: %s", response.status_code)
             return None
 
     def get_event_services_counts_ajax(self, eventId, **kwargs):
@@ -870,31 +1722,36 @@ class ChurchToolsApi:
         """
 
         event = self.get_events(eventId=eventId)[0]
+        event_services_counts = self._count_event_services(event)
 
         if 'serviceId' in kwargs.keys() and 'serviceGroupId' not in kwargs.keys():
-            service_count = 0
-            for service in event['eventServices']:
-                if service['serviceId'] == kwargs['serviceId']:
-                    service_count += 1
-            return {kwargs['serviceId']: service_count}
+            return {kwargs['serviceId']: event_services_counts.get(kwargs['serviceId'], 0)}
         elif 'serviceId' not in kwargs.keys() and 'serviceGroupId' in kwargs.keys():
             all_services = self.get_services()
             serviceGroupServiceIds = [service['id'] for service in all_services
                                       if service['serviceGroupId'] == kwargs['serviceGroupId']]
 
-            services = {}
-            for service in event['eventServices']:
-                serviceId = service['serviceId']
-                if serviceId in serviceGroupServiceIds:
-                    if serviceId in services.keys():
-                        services[serviceId] += 1
-                    else:
-                        services[serviceId] = 1
+            services = {serviceId: count for serviceId, count in event_services_counts.items()
+                        if serviceId in serviceGroupServiceIds}
 
             return services
         else:
             logging.warning('Illegal combination of kwargs - check documentation either')
 
+    @staticmethod
+    def _count_event_services(event):
+        """
+        Helper which counts the services of an event by service type
+        :param event: event as returned by get_events including eventServices
+        :type event: dict
+        :return: dict of serviceId: number of services planned
+        :rtype: dict
+        """
+        services = {}
+        for service in event['eventServices']:
+            services[service['serviceId']] = services.get(service['serviceId'], 0) + 1
+        return services
+
     def set_event_services_counts_ajax(self, eventId, serviceId, servicesCount):
         """
         update the number of services currently set for one event specific id
@@ -908,51 +1765,108 @@ class ChurchToolsApi:
         :return: successful execution
         :rtype: bool
         """
+        return self.set_event_services_counts_bulk(eventId, {serviceId: servicesCount})
 
+    def set_event_services_counts_bulk(self, eventId, servicesCounts):
+        """
+        update the number of services for multiple service types of one event
+        current services of the event are requested once, one request is sent per affected service group
+        and all changes are verified with one more request of the event
+
+        :param eventId: id number of the calendar event
+        :type eventId: int
+        :param servicesCounts: dict of serviceId: number of services of this type to be planned
+        :type servicesCounts: dict[int, int]
+        :return: successful execution of all changes - False if any serviceId is unknown, other changes are still sent
+        :rtype: bool
+        """
         url = self.domain + '/index.php'
         headers = {
             'accept': 'application/json'
         }
         params = {'q': 'churchservice/ajax'}
 
-        # restore other ServiceGroup assignments required for request form data
-
         services = self.get_services(returnAsDict=True)
-        serviceGroupId = services[serviceId]['serviceGroupId']
-        servicesOfServiceGroup = self.get_event_services_counts_ajax(eventId, serviceGroupId=serviceGroupId)
-        # set new assignment
-        servicesOfServiceGroup[serviceId] = servicesCount
-
-        # Generate form specific data
-        item_id = 0
-        data = {
-            'id': eventId,
-            'func': 'addOrRemoveServiceToEvent'
-        }
-        for serviceIdRow, serviceCount in servicesOfServiceGroup.items():
-            data['col{}'.format(item_id)] = serviceIdRow
-            if serviceCount > 0:
-                data['val{}'.format(item_id)] = 'checked'
-            data['count{}'.format(item_id)] = serviceCount
-            item_id += 1
+        if services is None:
+            return False
+        event_services_counts = self._count_event_services(self.get_events(eventId=eventId)[0])
 
-        response = self.session.post(url=url, headers=headers, params=params, data=data)
+        unknown_services = [serviceId for serviceId in servicesCounts.keys() if serviceId not in services]
+        if len(unknown_services) > 0:
+            logging.warning("Services %s of event %s are skipped because they do not exist", unknown_services,
+                            eventId)
+        servicesCounts = {serviceId: servicesCount for serviceId, servicesCount in servicesCounts.items()
+                          if serviceId in services}
 
-        if response.status_code == 200:
-            response_content = json.loads(response.content)
-            response_success = response_content['status'] == 'success'
+        # restore other ServiceGroup assignments required for request form data
+        changes_by_service_group = {}
+        for serviceId, servicesCount in servicesCounts.items():
+            if event_services_counts.get(serviceId, 0) == servicesCount:
+                continue
+            serviceGroupId = services[serviceId]['serviceGroupId']
+            changes_by_service_group.setdefault(serviceGroupId, {})[serviceId] = servicesCount
+
+        response_success = True
+        for serviceGroupId, changes in changes_by_service_group.items():
+            servicesOfServiceGroup = {serviceId: count for serviceId, count in event_services_counts.items()
+                                      if services.get(serviceId, {}).get('serviceGroupId') == serviceGroupId}
+            # set new assignment
+            servicesOfServiceGroup.update(changes)
+
+            # Generate form specific data
+            item_id = 0
+            data = {
+                'id': eventId,
+                'func': 'addOrRemoveServiceToEvent'
+            }
+            for serviceIdRow, serviceCount in servicesOfServiceGroup.items():
+                data['col{}'.format(item_id)] = serviceIdRow
+                if serviceCount > 0:
+                    data['val{}'.format(item_id)] = 'checked'
+                data['count{}'.format(item_id)] = serviceCount
+                item_id += 1
+
+            response = self._request('POST', url=url, headers=headers, params=params, data=data)
 
-            number_match = self.get_event_services_counts_ajax(eventId, serviceId=serviceId)[serviceId] == servicesCount
-            if number_match and response_success:
-                return True
+            if response.status_code == 200:
+                response_content = self._decode(response)
+                response_success &= response_content['status'] == 'success'
             else:
-                logging.warning("Request was successful but serviceId {} not changed to count {} "
-                                .format(serviceId, servicesCount))
-                return False
+                logging.info("set_event_services_counts_bulk not successful for serviceGroup %s: %s",
+                             serviceGroupId, response.status_code)
+                response_success = False
+
+        if len(changes_by_service_group) == 0:
+            logging.debug("Services of event %s already match %s", eventId, servicesCounts)
+            return len(unknown_services) == 0
+
+        new_event_services_counts = self._count_event_services(self.get_events(eventId=eventId)[0])
+        mismatches = {serviceId: servicesCount for serviceId, servicesCount in servicesCounts.items()
+                      if new_event_services_counts.get(serviceId, 0) != servicesCount}
+        if len(mismatches) == 0 and response_success:
+            return len(unknown_services) == 0
         else:
-            logging.info("set_event_services_counts_ajax not successful: {}".format(response.status_code))
+            logging.warning("Request was sent but services of event %s not changed to counts %s",
+                            eventId, mismatches)
             return False
 
+    def set_events_services_counts_bulk(self, eventsServicesCounts):
+        """
+        update the number of services for multiple events in parallel - see set_event_services_counts_bulk
+
+        :param eventsServicesCounts: dict of eventId: dict of serviceId: number of services to be planned
+        :type eventsServicesCounts: dict[int, dict[int, int]]
+        :return: dict of eventId: successful execution of all changes for this event
+        :rtype: dict[int, bool]
+        """
+        self.get_services(returnAsDict=True)  # load cache once before parallel requests
+
+        set_event_services_counts = self._with_caller(self.set_event_services_counts_bulk)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = executor.map(lambda item: set_event_services_counts(*item),
+                                   eventsServicesCounts.items())
+            return dict(zip(eventsServicesCounts.keys(), results))
+
     def get_event_admins_ajax(self, eventId):
         """
         get the admin id list of an event using legacy AJAX API
@@ -995,17 +1909,17 @@ class ChurchToolsApi:
             'admin': ", ".join([str(id) for id in admin_ids]),
             'func': 'updateEventInfo'
         }
-        response = self.session.post(url=url, headers=headers, params=params, data=data)
+        response = self._request('POST', url=url, headers=headers, params=params, data=data)
 
         if response.status_code == 200:
-            response_content = json.loads(response.content)
+            response_content = self._decode(response)
             response_data = response_content['status'] == 'success'
-            logging.debug("Setting Admin IDs {} for event {} success".format(admin_ids, eventId))
+            logging.debug("Setting Admin IDs %s for event %s success", admin_ids, eventId)
 
             return response_data
         else:
-            logging.info(
-                "Setting Admin IDs {} for event {} failed with : {}".format(admin_ids, eventId, response.status_code))
+            logging.info("Setting Admin IDs %s for event %s failed with : %s",
+                         admin_ids, eventId, response.status_code)
             return False
 
     def get_event_agenda(self, eventId):
@@ -1020,18 +1934,31 @@ class ChurchToolsApi:
         headers = {
             'accept': 'application/json'
         }
-        response = self.session.get(url=url, headers=headers)
+        response = self._request('GET', url=url, headers=headers)
 
         if response.status_code == 200:
-            response_content = json.loads(response.content)
-            response_data = response_content['data'].copy()
-            logging.debug("Agenda load successful {}".format(response_content))
+            response_content = self._decode(response)
+            response_data = response_content['data']
+            logging.debug("Agenda load successful %s", self._payload(response_content))
 
             return response_data
         else:
-            logging.info("Event requested that does not have an agenda with status: {}".format(response.status_code))
+            logging.info("Event requested that does not have an agenda with status: %s", response.status_code)
             return None
 
+    def get_event_agendas(self, eventIds):
+        """
+        Retrieve agendas of multiple events in parallel (limited by max_workers) - see get_event_agenda
+        :param eventIds: numbers of the events
+        :type eventIds: list[int]
+        :return: dict of eventId: list of event agenda items or None if the event does not have an agenda
+        :rtype: dict[int, list | None]
+        """
+        eventIds = list(eventIds)
+        get_event_agenda = self._with_caller(self.get_event_agenda)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return dict(zip(eventIds, executor.map(get_event_agenda, eventIds)))
+
     def export_event_agenda(self, target_format, target_path='./downloads', **kwargs):
         """
         Exports the agenda as zip file for imports in presenter-programs
@@ -1067,7 +1994,7 @@ class ChurchToolsApi:
             # If folder doesn't exist, then create it.
             if not folder_exists:
                 os.makedirs(target_path)
-                logging.debug("created folder : ", target_path)
+                logging.debug("created folder : %s", target_path)
 
             if 'eventId' in kwargs.keys():
                 new_file_name = '{}_{}.zip'.format(agenda['name'], target_format)
@@ -1103,29 +2030,32 @@ class ChurchToolsApi:
             'Content-Type': 'application/json',
         }
 
-        response = self.session.post(url=url, params=params, headers=headers, json=json_data)
+        response = self._request('POST', url=url, params=params, headers=headers, json=json_data)
         result_ok = False
         if response.status_code == 200:
-            response_content = json.loads(response.content)
-            agenda_data = response_content['data'].copy()
-            logging.debug("Agenda package found {}".format(response_content))
+            response_content = self._decode(response)
+            agenda_data = response_content['data']
+            logging.debug("Agenda package found %s", self._payload(response_content))
             result_ok = self.file_download_from_url('{}/{}'.format(self.domain, agenda_data['url']), target_path)
             if result_ok:
                 logging.debug('download finished')
         else:
-            logging.warning("export of event_agenda failed: {}".format(response.status_code))
+            logging.warning("export of event_agenda failed: %s", response.status_code)
 
         return result_ok
 
     def get_event_agenda_docx(self, agenda, **kwargs):
         """
         Function to generate a custom docx document with the content of the event agenda from churchtools
+        Uses the AgendaDocxRenderer with default template of this process -
+        see ChurchToolsApi.agenda_docx for custom templates and rendering of many agendas
         :param agenda: event agenda with services
         :type event: dict
         :param kwargs: optional keywords as listed
-        :key serviceGroups: list of servicegroup IDs that should be included - defaults to all if not supplied
+        :key serviceGroups: dict of service groups by id whose notes should be included - no notes if not supplied
         :key excludeBeforeEvent: bool: by default pre-event parts are excluded
-        :return:
+        :return: python-docx document
+        :rtype: docx.document.Document
         """
 
         if 'excludeBeforeEvent' in kwargs.keys():
@@ -1133,141 +2063,134 @@ class ChurchToolsApi:
         else:
             excludeBeforeEvent = False
 
-        logging.debug('Trying to get agenda for: ' + agenda['name'])
+        logging.debug('Trying to get agenda for: %s', agenda['name'])
+
+        return agenda_docx.default_renderer().render(agenda, serviceGroups=kwargs.get('serviceGroups'),
+                                                     excludeBeforeEvent=excludeBeforeEvent)
+
+    # entries of masterdata_cache which are created from another entry and must be replaced together with it
+    MASTERDATA_DERIVED_KEYS = {
+        'event_masterdata': ('event_masterdata_by_id', 'song_category_map'),
+        'services': ('services_by_id',),
+    }
+
+    def _get_masterdata(self, key, endpoint):
+        """
+        Helper which returns the data of a masterdata endpoint from masterdata_cache or requests it if outdated
+        Entries derived from it (see MASTERDATA_DERIVED_KEYS) are discarded whenever it is requested again
+        Returned items are shared with the cache and should not be modified
+        :param key: name of the entry in masterdata_cache
+        :type key: str
+        :param endpoint: REST endpoint starting with /api/
+        :type endpoint: str
+        :return: data of the response or None if not successful
+        :rtype: dict | list | None
+        """
+
+        def load():
+            url = self.domain + endpoint
+            headers = {
+                'accept': 'application/json'
+            }
+            response = self._request('GET', url=url, headers=headers)
+            if response.status_code != 200:
+                logging.info("Masterdata request %s failed: %s", endpoint, response.status_code)
+                return None
+            for derived_key in self.MASTERDATA_DERIVED_KEYS.get(key, ()):
+                self.masterdata_cache.invalidate(derived_key)
+            return self._decode(response)['data']
 
-        document = docx.Document()
-        heading = agenda['name']
-        heading += '- Draft' if not agenda['isFinal'] else ''
-        document.add_heading(heading)
-        modifiedDate = datetime.strptime(agenda["meta"]['modifiedDate'], '%Y-%m-%dT%H:%M:%S%z')
-        modifiedDate2 = modifiedDate.astimezone().strftime('%a %d.%m (%H:%M:%S)')
-        document.add_paragraph("Download from ChurchTools including changes until.: " + modifiedDate2)
+        return self.masterdata_cache.get_or_load(key, load)
 
-        agenda_item = 0  # Position Argument from Event Agenda is weird therefore counting manually
-        pre_event_last_item = True  # Event start is no item therefore look for change
+    def _get_masterdata_by_id(self, key, endpoint):
+        """
+        Helper which returns the data of a masterdata endpoint as dict by ID
+        The dict is created once per masterdata update and kept in masterdata_cache
+        :param key: name of the entry in masterdata_cache
+        :type key: str
+        :param endpoint: REST endpoint starting with /api/
+        :type endpoint: str
+        :return: dict of items by id or for event masterdata dict of types with dict of items by id
+        :rtype: dict | None
+        """
 
-        for item in agenda["items"]:
-            if excludeBeforeEvent and item['isBeforeEvent']:
-                continue
+        # requested first so an outdated dict is discarded when the data itself is requested again
+        data = self._get_masterdata(key, endpoint)
+        if data is None:
+            return None
 
-            if item['type'] == 'header':
-                document.add_heading(item["title"], level=1)
-                continue
+        def create_dict():
+            if isinstance(data, list):
+                return {item['id']: item for item in data}
+            return {data_type: {item['id']: item for item in items}
+                    for data_type, items in data.items() if isinstance(items, list)}
+
+        return self.masterdata_cache.get_or_load(key + '_by_id', create_dict)
+
+    def refresh_masterdata(self):
+        """
+        Discards all cached masterdata and requests event masterdata and services again
+        Should be used after changing masterdata in ChurchTools - otherwise it is updated after masterdata_cache_ttl
+        :return: if successful
+        :rtype: bool
+        """
+        self.masterdata_cache.invalidate()
+        event_masterdata = self._get_masterdata('event_masterdata', '/api/event/masterdata')
+        services = self._get_masterdata('services', '/api/services')
+        return event_masterdata is not None and services is not None
 
-            if pre_event_last_item:  # helper for event start heading which is not part of the ct_api
-                if not item['isBeforeEvent']:
-                    pre_event_last_item = False
-                    document.add_heading('Eventstart', level=1)
-
-            agenda_item += 1
-
-            title = str(agenda_item)
-            title += ' ' + item["title"]
-
-            if item['type'] == 'song':
-                title += ': ' + item['song']['title']
-                title += ' (' + item['song']['category'] + ')'  # TODO #5 Word... check if fails on empty song items
-
-            document.add_heading(title, level=2)
-
-            responsible_list = []
-            for responsible_item in item['responsible']['persons']:
-                if responsible_item['person'] is not None:
-                    responsible_text = responsible_item['person']['title']
-                    if not responsible_item['accepted']:
-                        responsible_text += ' (Angefragt)'
-                else:
-                    responsible_text = '?'
-                responsible_text += ' ' + responsible_item['service'] + ''
-                responsible_list.append(responsible_text)
-
-            if len(item['responsible']) > 0 and len(item['responsible']['persons']) == 0:
-                if len(item['responsible']['text']) > 0:
-                    responsible_list.append(
-                        item['responsible']['text'] + ' (Person statt Rolle in ChurchTools hinterlegt!)')
-
-            responsible_text = ", ".join(responsible_list)
-            document.add_paragraph(responsible_text)
-
-            if item['note'] is not None and item['note'] != '':
-                document.add_paragraph(item["note"])
-
-            if len(item['serviceGroupNotes']) > 0:
-                for note in item['serviceGroupNotes']:
-                    if note['serviceGroupId'] in kwargs['serviceGroups'].keys() and len(note['note']) > 0:
-                        document.add_heading(
-                            "Bemerkung für {}:"
-                            .format(kwargs['serviceGroups'][note['serviceGroupId']]['name']), level=4)
-                        document.add_paragraph(note['note'])
-
-        return document
     def get_event_masterdata(self, **kwargs):
         """
         Function to get the Masterdata of the event module
         This information is required to map some IDs to specific items
+        Masterdata is cached (see masterdata_cache_ttl and refresh_masterdata) - returned items should not be modified
         :param kwargs: optional keywords as listed below
         :keyword type: str with name of the masterdata type (not datatype) common types are 'absenceReasons', 'songCategories', 'services', 'serviceGroups'
         :keyword returnAsDict: if the list with one type should be returned as dict by ID
         :return: list of masterdata items, if multiple types list of lists (by type)
         :rtype: list | list[list] | dict | list[dict]
         """
-        url = self.domain + '/api/event/masterdata'
-
-        headers = {
-            'accept': 'application/json'
-        }
-        response = self.session.get(url=url, headers=headers)
-
-        if response.status_code == 200:
-            response_content = json.loads(response.content)
-            response_data = response_content['data'].copy()
+        response_data = self._get_masterdata('event_masterdata', '/api/event/masterdata')
 
+        if response_data is not None:
             if 'type' in kwargs:
+                if kwargs.get('returnAsDict', False):
+                    response_data = self._get_masterdata_by_id('event_masterdata', '/api/event/masterdata')
+                if kwargs['type'] not in response_data:
+                    # types without a list of items are not available as dict
+                    logging.warning("Event Masterdata type %s not available", kwargs['type'])
+                    return None
                 response_data = response_data[kwargs['type']]
-                if 'returnAsDict' in kwargs.keys():
-                    if kwargs['returnAsDict']:
-                        response_data2 = response_data.copy()
-                        response_data = {item['id']: item for item in response_data2}
-            logging.debug("Event Masterdata load successful {}".format(response_data))
+            logging.debug("Event Masterdata load successful %s", self._payload(response_data))
 
             return response_data
         else:
-            logging.info("Event Masterdata requested failed: {}".format(response.status_code))
+            logging.info("Event Masterdata requested failed")
             return None
 
     def get_services(self, **kwargs):
         """
         Function to get list of all or a single services configuration item from CT
+        Services are cached (see masterdata_cache_ttl and refresh_masterdata) - returned items should not be modified
         :param kwargs: optional keywords as listed
         :keyword serviceId: id of a single item for filter
         :keyword returnAsDict: true if should return a dict instead of list (not combineable if serviceId)
         :return: list of services
         :rtype: list[dict]
         """
-        url = self.domain + '/api/services'
         if 'serviceId' in kwargs.keys():
-            url += '/{}'.format(kwargs['serviceId'])
-
-        headers = {
-            'accept': 'application/json'
-        }
-        response = self.session.get(url=url, headers=headers)
-
-        if response.status_code == 200:
-            response_content = json.loads(response.content)
-            response_data = response_content['data'].copy()
-
-            if 'returnAsDict' in kwargs and not 'serviceId' in kwargs:
-                if kwargs['returnAsDict']:
-                    result = {}
-                    for item in response_data:
-                        result[item['id']] = item
-                    response_data = result
+            services = self._get_masterdata_by_id('services', '/api/services')
+            response_data = services.get(kwargs['serviceId']) if services is not None else None
+        elif kwargs.get('returnAsDict', False):
+            response_data = self._get_masterdata_by_id('services', '/api/services')
+        else:
+            response_data = self._get_masterdata('services', '/api/services')
 
-            logging.debug("Services load successful {}".format(response_data))
+        if response_data is not None:
+            logging.debug("Services load successful %s", self._payload(response_data))
             return response_data
         else:
-            logging.info("Services requested failed: {}".format(response.status_code))
+            logging.info("Services requested failed")
             return None
 
     def get_tags(self, type='songs'):
@@ -1288,16 +2211,15 @@ class ChurchToolsApi:
         params = {
             'type': type,
         }
-        response = self.session.get(url=url, params=params, headers=headers)
+        response = self._request('GET', url=url, params=params, headers=headers)
 
         if response.status_code == 200:
-            response_content = json.loads(response.content)
-            response_data = response_content['data'].copy()
-            logging.debug("SongTags load successful {}".format(response_content))
+            response_content = self._decode(response)
+            logging.debug("SongTags load successful %s", self._payload(response_content))
 
             return response_content['data']
         else:
-            logging.warning("Something went wrong fetching Song-tags: {}".format(response.status_code))
+            logging.warning("Something went wrong fetching Song-tags: %s", response.status_code)
 
     def file_download(self, filename, domain_type, domain_identifier, target_path='./downloads'):
         """
@@ -1323,12 +2245,12 @@ class ChurchToolsApi:
 
         url = '{}/api/files/{}/{}'.format(self.domain, domain_type, domain_identifier)
 
-        response = self.session.get(url=url)
+        response = self._request('GET', url=url)
 
         if response.status_code == 200:
-            response_content = json.loads(response.content)
-            arrangement_files = response_content['data'].copy()
-            logging.debug("SongArrangement-Files load successful {}".format(response_content))
+            response_content = self._decode(response)
+            arrangement_files = response_content['data']
+            logging.debug("SongArrangement-Files load successful %s", self._payload(response_content))
             file_found = False
 
             for file in arrangement_files:
@@ -1338,17 +2260,17 @@ class ChurchToolsApi:
                     break
 
             if file_found:
-                logging.debug("Found File: {}".format(filename))
+                logging.debug("Found File: %s", filename)
                 # Build path OS independent
                 fileUrl = str(file['fileUrl'])
                 path_file = os.sep.join([target_path, filename])
                 StateOK = self.file_download_from_url(fileUrl, path_file)
             else:
-                logging.warning("File {} does not exist".format(filename))
+                logging.warning("File %s does not exist", filename)
 
             return StateOK
         else:
-            logging.warning("Something went wrong fetching SongArrangement-Files: {}".format(response.status_code))
+            logging.warning("Something went wrong fetching SongArrangement-Files: %s", response.status_code)
 
     def file_download_from_url(self, file_url, target_path):
         """
@@ -1363,7 +2285,7 @@ class ChurchToolsApi:
         :rtype: bool
         """
         # NOTE the stream=True parameter below
-        with self.session.get(url=file_url, stream=True) as r:
+        with self._request('GET', url=file_url, stream=True) as r:
             if r.status_code == 200:
                 with open(target_path, 'wb') as f:
                     for chunk in r.iter_content(chunk_size=8192):
@@ -1371,8 +2293,169 @@ class ChurchToolsApi:
                         # and set chunk_size parameter to None.
                         # if chunk:
                         f.write(chunk)
-                logging.debug("Download of {} successful".format(file_url))
+                logging.debug("Download of %s successful", file_url)
                 return True
             else:
-                logging.warning("Something went wrong during file_download: {}".format(r.status_code))
+                logging.warning("Something went wrong during file_download: %s", r.status_code)
+                return False
+
+    def get_files(self, domain_type, domain_identifier):
+        """
+        Lists all files attached to an object in ChurchTools
+        :param domain_type: e.g. 'song_arrangement' - see file_download
+        :type domain_type: str
+        :param domain_identifier: ID of the object in ChurchTools
+        :type domain_identifier: int | str
+        :return: list of file dicts including name, fileUrl and size or None if not successful
+        :rtype: list[dict] | None
+        """
+        url = '{}/api/files/{}/{}'.format(self.domain, domain_type, domain_identifier)
+        response = self._request('GET', url=url)
+
+        if response.status_code == 200:
+            response_content = self._decode(response)
+            logging.debug("Files load successful %s", self._payload(response_content))
+            return response_content['data']
+        else:
+            logging.warning("Something went wrong fetching files of %s %s: %s", domain_type, domain_identifier,
+                            response.status_code)
+            return None
+
+    def file_download_bulk(self, targets, target_path='./downloads'):
+        """
+        Downloads many files in parallel (limited by max_workers) - see file_download_from_urls
+        Files are stored as target_path/domain_type/domain_identifier/filename
+        :param targets: list of (domain_type, domain_identifier, filename) - filename None downloads all files
+            attached to the object
+        :type targets: list[tuple[str, int | str, str | None]]
+        :param target_path: local path as target for the downloads - will be created if not exists
+        :type target_path: str
+        :return: dict of (domain_type, domain_identifier, filename): if successful
+            - filename None is replaced by the names of all files which were found
+        :rtype: dict[tuple, bool]
+        """
+        objects = list(dict.fromkeys((domain_type, domain_identifier) for domain_type, domain_identifier, _ in targets))
+        get_files = self._with_caller(self.get_files)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            files_by_object = dict(zip(objects, executor.map(lambda item: get_files(*item), objects)))
+
+        results = {}
+        downloads = {}
+        for domain_type, domain_identifier, filename in targets:
+            files = files_by_object[(domain_type, domain_identifier)]
+            if files is None:
+                results[(domain_type, domain_identifier, filename)] = False
+                continue
+            matches = [file for file in files if filename is None or file['name'] == filename]
+            if len(matches) == 0:
+                logging.warning("File %s does not exist", filename)
+                results[(domain_type, domain_identifier, filename)] = False
+            # first file with the name is used like in file_download
+            for file in reversed(matches):
+                path = os.sep.join([target_path, domain_type, str(domain_identifier), file['name']])
+                downloads[(domain_type, domain_identifier, file['name'])] = (file['fileUrl'], path, file.get('size'))
+
+        results.update(zip(downloads.keys(), self.file_download_from_urls(downloads.values()).values()))
+        return results
+
+    def file_download_from_urls(self, downloads):
+        """
+        Downloads many files in parallel (limited by max_workers)
+        Files with the expected size are skipped. Data is written to a .part file first - if a download is interrupted
+        the next call continues it using a HTTP Range request. The chunk size is adapted to the transfer speed.
+        :param downloads: list of (file_url, path, size) - size as listed by ChurchTools or None if not known
+            which downloads the file again and does not resume it. Folders are created if not existing
+        :type downloads: list[tuple[str, str, int | None]]
+        :return: dict of path: if successful
+        :rtype: dict[str, bool]
+        """
+        downloads = list(downloads)
+        download = self._with_caller(self._file_download_resumable)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = executor.map(lambda item: download(*item), downloads)
+            return dict(zip([path for _, path, _ in downloads], results))
+
+    def _file_download_resumable(self, file_url, path, size):
+        """
+        Helper which downloads one file for file_download_from_urls
+        :return: if successful
+        :rtype: bool
+        """
+        if size is not None and os.path.isfile(path) and os.path.getsize(path) == size:
+            logging.debug("Download of %s skipped because %s has the expected size", file_url, path)
+            return True
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # name of the partial file depends on the url so data of different files is never combined
+        part_path = '{}.{}.part'.format(path, hashlib.sha1(file_url.encode('utf-8')).hexdigest()[:12])
+
+        for _ in range(self.retry_policy.max_retries + 1):
+            offset = os.path.getsize(part_path) if size is not None and os.path.isfile(part_path) else 0
+            if size is not None and offset > size:
+                offset = 0
+            if size is None or offset < size:
+                complete = self._file_download_chunks(file_url, part_path, offset)
+                if complete is None:
+                    return False
+                if not complete:
+                    continue
+            if size is not None and os.path.getsize(part_path) != size:
+                logging.warning("Download of %s incomplete - %s of %s bytes", file_url,
+                                os.path.getsize(part_path), size)
+                continue
+            os.replace(part_path, path)
+            logging.debug("Download of %s successful", file_url)
+            return True
+        return False
+
+    def _file_download_chunks(self, file_url, part_path, offset):
+        """
+        Helper which appends the content of file_url starting at offset to part_path
+        :return: True if the response was received completely, False if it was interrupted
+            and None if the server did not send the file
+        :rtype: bool | None
+        """
+        # content encoding would apply ranges to compressed data
+        headers = {'Accept-Encoding': 'identity'}
+        if offset > 0:
+            headers['Range'] = 'bytes={}-'.format(offset)
+        chunk_size = self.DOWNLOAD_CHUNK_SIZES[0]
+
+        try:
+            r = self._request('GET', url=file_url, headers=headers, stream=True)
+        except requests.RequestException as e:
+            # retries were already done by _request - only this file fails
+            logging.warning("Download of %s failed: %s", file_url, e)
+            return None
+
+        with r:
+            if r.status_code == 206:
+                logging.debug("Resuming download of %s at %s bytes", file_url, offset)
+                mode = 'ab'
+            elif r.status_code == 200:
+                mode = 'wb'
+            else:
+                logging.warning("Something went wrong during file_download: %s", r.status_code)
+                if r.status_code == 416 and os.path.isfile(part_path):
+                    os.remove(part_path)
+                    return False
+                return None
+
+            try:
+                with open(part_path, mode) as f:
+                    while True:
+                        start = time.monotonic()
+                        # read from one raw stream so the chunk size can change between reads
+                        chunk = r.raw.read(chunk_size, decode_content=True)
+                        if len(chunk) == 0:
+                            return True
+                        f.write(chunk)
+                        # larger chunks for fast connections, smaller ones if a chunk takes long
+                        duration = time.monotonic() - start
+                        if duration < 0.05:
+                            chunk_size = min(chunk_size * 2, self.DOWNLOAD_CHUNK_SIZES[1])
+                        elif duration > 0.5:
+                            chunk_size = max(chunk_size // 2, self.DOWNLOAD_CHUNK_SIZES[0])
+            except (requests.RequestException, urllib3.exceptions.HTTPError, OSError) as e:
+                logging.warning("Download of %s interrupted: %s", file_url, e)
                 return False
@@ -0,0 +1,233 @@
+import io
+import re
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+import docx
+
+DOCUMENT_PART = 'word/document.xml'
+PAGE_BREAK_XML = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+# heading levels of agenda_paragraphs - a template must contain the styles Heading 1, Heading 2 and Heading 4
+HEADING_LEVELS = (1, 2, 4)
+# control characters which are not allowed in XML documents
+INVALID_XML_CHARACTERS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# renderer with the default template of this process - see default_renderer
+_process_renderer = None
+_process_renderer_lock = threading.Lock()
+# renderer of worker processes of AgendaDocxRenderer.render_parallel
+_worker_renderer = None
+
+
+def agenda_paragraphs(agenda, serviceGroups=None, excludeBeforeEvent=False):
+    """
+    Content of the docx document of an agenda without any formatting
+    :param agenda: event agenda with services as returned by get_event_agenda
+    :type agenda: dict
+    :param serviceGroups: dict of service groups by id whose notes should be included - no notes if not supplied
+    :type serviceGroups: dict
+    :param excludeBeforeEvent: if True items before the event start are excluded
+    :type excludeBeforeEvent: bool
+    :return: list of (heading level or None for normal text, text)
+    :rtype: list[tuple[int | None, str]]
+    """
+    serviceGroups = serviceGroups if serviceGroups is not None else {}
+    paragraphs = []
+
+    heading = agenda['name']
+    heading += '- Draft' if not agenda['isFinal'] else ''
+    paragraphs.append((1, heading))
+    modifiedDate = datetime.strptime(agenda["meta"]['modifiedDate'], '%Y-%m-%dT%H:%M:%S%z')
+    modifiedDate2 = modifiedDate.astimezone().strftime('%a %d.%m (%H:%M:%S)')
+    paragraphs.append((None, "Download from ChurchTools including changes until.: " + modifiedDate2))
+
+    agenda_item = 0  # Position Argument from Event Agenda is weird therefore counting manually
+    pre_event_last_item = True  # Event start is no item therefore look for change
+
+    for item in agenda["items"]:
+        if excludeBeforeEvent and item['isBeforeEvent']:
+            continue
+
+        if item['type'] == 'header':
+            paragraphs.append((1, item["title"]))
+            continue
+
+        if pre_event_last_item:  # helper for event start heading which is not part of the ct_api
+            if not item['isBeforeEvent']:
+                pre_event_last_item = False
+                paragraphs.append((1, 'Eventstart'))
+
+        agenda_item += 1
+
+        title = str(agenda_item)
+        title += ' ' + item["title"]
+
+        if item['type'] == 'song':
+            title += ': ' + item['song']['title']
+            title += ' (' + item['song']['category'] + ')'  # TODO #5 Word... check if fails on empty song items
+
+        paragraphs.append((2, title))
+
+        responsible_list = []
+        for responsible_item in item['responsible']['persons']:
+            if responsible_item['person'] is not None:
+                responsible_text = responsible_item['person']['title']
+                if not responsible_item['accepted']:
+                    responsible_text += ' (Angefragt)'
+            else:
+                responsible_text = '?'
+            responsible_text += ' ' + responsible_item['service'] + ''
+            responsible_list.append(responsible_text)
+
+        if len(item['responsible']) > 0 and len(item['responsible']['persons']) == 0:
+            if len(item['responsible']['text']) > 0:
+                responsible_list.append(
+                    item['responsible']['text'] + ' (Person statt Rolle in ChurchTools hinterlegt!)')
+
+        paragraphs.append((None, ", ".join(responsible_list)))
+
+        if item['note'] is not None and item['note'] != '':
+            paragraphs.append((None, item["note"]))
+
+        for note in item['serviceGroupNotes']:
+            if note['serviceGroupId'] in serviceGroups.keys() and len(note['note']) > 0:
+                paragraphs.append((4, "Bemerkung für {}:".format(serviceGroups[note['serviceGroupId']]['name'])))
+                paragraphs.append((None, note['note']))
+
+    return paragraphs
+
+
+class AgendaDocxRenderer:
+    def __init__(self, template=None):
+        """
+        Creates docx documents of event agendas
+        The template is prepared once - its body is removed and all other parts of the docx package are kept
+        compressed in memory. Paragraphs of an agenda are created as one XML fragment which is inserted into the
+        document part, so neither the template nor the agenda is processed using the python-docx object model.
+        :param template: path or file object of a docx file with custom styles - python-docx default if None
+        :type template: str | typing.IO | None
+        :raises ValueError: if the template does not contain a heading style used for agendas
+        """
+        document = docx.Document(template)
+        body = document.element.body
+        for element in list(body):
+            if element is not body.sectPr:
+                body.remove(element)
+
+        self.style_ids = {}
+        for level in range(10):
+            try:
+                self.style_ids[level] = document.styles['Title' if level == 0 else 'Heading {}'.format(level)].style_id
+            except KeyError:
+                pass
+        missing = ['Heading {}'.format(level) for level in HEADING_LEVELS if level not in self.style_ids]
+        if len(missing) > 0:
+            raise ValueError('docx template does not contain the styles {}'.format(', '.join(missing)))
+
+        source = io.BytesIO()
+        document.save(source)
+        target = io.BytesIO()
+        with zipfile.ZipFile(source) as archive, zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as template:
+            for info in archive.infolist():
+                if info.filename != DOCUMENT_PART:
+                    template.writestr(info, archive.read(info))
+            self.document_info = archive.getinfo(DOCUMENT_PART)
+            document_xml = archive.read(DOCUMENT_PART).decode('utf-8').replace('<w:body/>', '<w:body></w:body>')
+        self.template = target.getvalue()
+
+        # content of the agenda is inserted before the section properties at the end of the body
+        position = document_xml.rfind('<w:sectPr')
+        position = position if position >= 0 else document_xml.rfind('</w:body>')
+        self.document_xml = (document_xml[:position], document_xml[position:])
+
+    def _paragraph_xml(self, level, text):
+        runs = []
+        for part in re.split('([\t\n\r])', INVALID_XML_CHARACTERS.sub('', text)):
+            if part == '\t':
+                runs.append('<w:tab/>')
+            elif part in ('\n', '\r'):
+                runs.append('<w:br/>')
+            elif part != '':
+                runs.append('<w:t xml:space="preserve">{}</w:t>'.format(escape(part)))
+        style = '<w:pPr><w:pStyle w:val="{}"/></w:pPr>'.format(self.style_ids[level]) if level is not None else ''
+        run = '<w:r>{}</w:r>'.format(''.join(runs)) if len(runs) > 0 else ''
+        return '<w:p>{}{}</w:p>'.format(style, run)
+
+    def _agenda_xml(self, agenda, serviceGroups=None, excludeBeforeEvent=False):
+        return ''.join(self._paragraph_xml(level, text)
+                       for level, text in agenda_paragraphs(agenda, serviceGroups, excludeBeforeEvent))
+
+    def _package(self, xml):
+        # only the document part is compressed - all other parts are copied from the template
+        buffer = io.BytesIO(self.template)
+        with zipfile.ZipFile(buffer, 'a') as archive:
+            # timestamp of the template keeps the result identical for the same agenda
+            archive.writestr(zipfile.ZipInfo(DOCUMENT_PART, self.document_info.date_time),
+                             (self.document_xml[0] + xml + self.document_xml[1]).encode('utf-8'),
+                             compress_type=zipfile.ZIP_DEFLATED)
+        return buffer.getvalue()
+
+    def render(self, agenda, serviceGroups=None, excludeBeforeEvent=False):
+        """
+        Document of one agenda - see agenda_paragraphs for params
+        render_bytes is faster if the document is not changed afterwards
+        :return: python-docx document which can be changed or saved
+        :rtype: docx.document.Document
+        """
+        return docx.Document(io.BytesIO(self.render_bytes(agenda, serviceGroups, excludeBeforeEvent)))
+
+    def render_bytes(self, agenda, serviceGroups=None, excludeBeforeEvent=False):
+        """
+        Document of one agenda as docx file content - see agenda_paragraphs for params
+        :rtype: bytes
+        """
+        return self._package(self._agenda_xml(agenda, serviceGroups, excludeBeforeEvent))
+
+    def render_many_bytes(self, agendas, serviceGroups=None, excludeBeforeEvent=False):
+        """
+        One document with all agendas separated by page breaks e.g. all services of a month
+        :param agendas: list of agendas as returned by get_event_agenda
+        :type agendas: list[dict]
+        :return: docx file content
+        :rtype: bytes
+        """
+        return self._package(PAGE_BREAK_XML.join(self._agenda_xml(agenda, serviceGroups, excludeBeforeEvent)
+                                                 for agenda in agendas))
+
+    def render_parallel(self, agendas, serviceGroups=None, excludeBeforeEvent=False, processes=None):
+        """
+        One document per agenda rendered in parallel worker processes
+        :param agendas: list of agendas as returned by get_event_agenda
+        :type agendas: list[dict]
+        :param processes: number of worker processes - number of CPUs if None
+        :type processes: int | None
+        :return: docx file contents in the order of agendas
+        :rtype: list[bytes]
+        """
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(self,)) as executor:
+            return list(executor.map(_render_in_worker, agendas,
+                                     [serviceGroups] * len(agendas), [excludeBeforeEvent] * len(agendas)))
+
+
+def default_renderer():
+    """
+    Renderer with the python-docx default template which is created once per process
+    :rtype: AgendaDocxRenderer
+    """
+    global _process_renderer
+    with _process_renderer_lock:
+        if _process_renderer is None:
+            _process_renderer = AgendaDocxRenderer()
+        return _process_renderer
+
+
+def _init_worker(renderer):
+    global _worker_renderer
+    _worker_renderer = renderer
+
+
+def _render_in_worker(agenda, serviceGroups, excludeBeforeEvent):
+    return _worker_renderer.render_bytes(agenda, serviceGroups, excludeBeforeEvent)
@@ -0,0 +1,590 @@
+import asyncio
+import logging
+import os
+
+from ChurchToolsApi.json_utils import json_loads
+
+try:
+    import aiohttp
+except ImportError:  # optional dependency - pip install ChurchToolsApi[async]
+    aiohttp = None
+
+
+class AsyncChurchToolsApi:
+    def __init__(self, domain, ct_token=None, ct_user=None, ct_password=None, limit=20, limit_per_host=10):
+        """
+        Setup of an asyncio based ChurchToolsApi object which mirrors the methods of ChurchToolsApi as coroutines
+        Requires the optional dependency aiohttp
+        Login is executed when entering the async context manager or by awaiting login_ct_rest_api
+
+        async with AsyncChurchToolsApi(domain, ct_token=token) as api:
+            agendas = await asyncio.gather(*[api.get_event_agenda(event['id']) for event in events])
+
+        :param domain: including https:// ending on e.g. .de
+        :type domain: str
+        :param ct_token: direct access using a user token
+        :type ct_token: str
+        :param ct_user: indirect login using user and password combination
+        :type ct_user: str
+        :param ct_password: indirect login using user and password combination
+        :type ct_password: str
+        :param limit: max number of simultaneous connections
+        :type limit: int
+        :param limit_per_host: max number of simultaneous connections to the ChurchTools server
+        :type limit_per_host: int
+        """
+        if aiohttp is None:
+            raise ImportError('AsyncChurchToolsApi requires aiohttp - install with pip install ChurchToolsApi[async]')
+
+        self.domain = domain
+        self.session = None
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.csrf_token = None
+        self._ct_token = ct_token
+        self._ct_user = ct_user
+        self._ct_password = ct_password
+        self._login_lock = None
+        self._csrf_lock = None
+
+        logging.debug('AsyncChurchToolsApi init finished')
+
+    async def __aenter__(self):
+        if self._ct_token is not None:
+            await self.login_ct_rest_api(ct_token=self._ct_token)
+        elif self._ct_user is not None and self._ct_password is not None:
+            await self.login_ct_rest_api(ct_user=self._ct_user, ct_password=self._ct_password)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """
+        Close the underlying aiohttp session and all its connections
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _create_session(self):
+        """
+        Helper which creates a new aiohttp session with connection limits
+        Must be called within a running event loop
+        """
+        connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+        # unsafe accepts the session cookie of servers addressed by IP like requests does
+        self.session = aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.CookieJar(unsafe=True))
+        self._login_lock = asyncio.Lock()
+        self._csrf_lock = asyncio.Lock()
+        self.csrf_token = None
+
+    async def _request(self, method, url, **kwargs):
+        """
+        Helper which sends one request and reads the complete body
+        :param method: HTTP method e.g. GET or POST
+        :type method: str
+        :param url: full url of the request
+        :type url: str
+        :param kwargs: passed on to aiohttp e.g. params, data, headers
+        :return: tuple of status code and content
+        :rtype: tuple[int, bytes]
+        """
+        async with self.session.request(method, url, **kwargs) as response:
+            return response.status, await response.read()
+
+    async def _ajax_request(self, url, **kwargs):
+        """
+        Helper for legacy AJAX requests which require a CSRF token
+        The token is requested once for all parallel requests and refreshed once if the server rejects it
+        :param url: full url of the request
+        :type url: str
+        :param kwargs: passed on to aiohttp e.g. params, data
+        :return: tuple of status code and content
+        :rtype: tuple[int, bytes]
+        """
+        csrf_token = await self.ensure_csrf_token()
+        headers = kwargs.pop('headers', {})
+        headers['CSRF-Token'] = csrf_token
+        status, content = await self._request('POST', url, headers=headers, **kwargs)
+        if status in (401, 403):
+            logging.info("AJAX request rejected with %s - refreshing CSRF token", status)
+            headers['CSRF-Token'] = await self.ensure_csrf_token(outdated_token=csrf_token)
+            status, content = await self._request('POST', url, headers=headers, **kwargs)
+        return status, content
+
+    async def _get_paginated(self, url, headers=None, params=None):
+        """
+        Helper which requests all pages of a paginated REST endpoint
+        Pages following the first one are requested in parallel and combined in the order of the pages
+        :param url: url of the endpoint
+        :type url: str
+        :param headers: headers to send
+        :type headers: dict
+        :param params: params to send with each page
+        :type params: dict | list[tuple]
+        :return: tuple of status code of the first page and list of items
+        :rtype: tuple[int, list | None]
+        """
+        if params is None:
+            params = []
+        elif isinstance(params, dict):
+            params = list(params.items())
+        status, content = await self._request('GET', url, headers=headers, params=params)
+        if status != 200:
+            return status, None
+
+        response_content = json_loads(content)
+        response_data = response_content['data']
+        if 'meta' not in response_content.keys() or 'pagination' not in response_content['meta'].keys():
+            return status, [response_data] if isinstance(response_data, dict) else response_data
+
+        pagination = response_content['meta']['pagination']
+
+        async def get_page(page):
+            page_status, page_content = await self._request('GET', url, headers=headers,
+                                                            params=params + [('page', page)])
+            if page_status != 200:
+                logging.warning("page %s of %s failed with %s", page, url, page_status)
+                return None
+            return json_loads(page_content)['data']
+
+        page_results = await asyncio.gather(
+            *[get_page(page) for page in range(pagination['current'] + 1, pagination['lastPage'] + 1)])
+        if None in page_results:
+            return 500, None
+        for page_data in page_results:
+            response_data.extend(page_data)
+
+        return status, response_data
+
+    async def login_ct_rest_api(self, **kwargs):
+        """
+        Same as ChurchToolsApi.login_ct_rest_api - parallel calls are serialized
+        :param kwargs: optional keyword arguments as listed
+        :keyword ct_token: str : token to be used for login into CT
+        :keyword ct_user: str: the username to be used in case of unknown login token
+        :keyword ct_password: str: the password to be used in case of unknown login token
+        :return: personId if login successful otherwise False
+        :rtype: int | bool
+        """
+        if self.session is None:
+            self._create_session()
+
+        async with self._login_lock:
+            if 'ct_token' in kwargs.keys():
+                logging.info('Trying Login with token')
+                url = self.domain + '/api/whoami'
+                headers = {"Authorization": 'Login ' + kwargs['ct_token']}
+                status, content = await self._request('GET', url, headers=headers)
+
+                if status == 200:
+                    response_content = json_loads(content)
+                    logging.info('Token Login Successful as %s', response_content['data']['email'])
+                    await self.ensure_csrf_token(outdated_token=self.csrf_token)
+                    return response_content['data']['id']
+                else:
+                    logging.warning("Token Login failed with %s", content.decode())
+                    return False
+
+            elif 'ct_user' in kwargs.keys() and 'ct_password' in kwargs.keys():
+                logging.info('Trying Login with Username/Password')
+                url = self.domain + '/api/login'
+                data = {'username': kwargs['ct_user'], 'password': kwargs['ct_password']}
+                status, content = await self._request('POST', url, data=data)
+
+                if status == 200:
+                    person = await self.who_am_i()
+                    logging.info('User/Password Login Successful as %s', person['email'])
+                    await self.ensure_csrf_token(outdated_token=self.csrf_token)
+                    return person['id']
+                else:
+                    logging.warning("User/Password Login failed with %s", content.decode())
+                    return False
+
+    async def get_ct_csrf_token(self):
+        """
+        Requests CSRF Token https://hilfe.church.tools/wiki/0/API-CSRF
+        :return: token
+        :rtype: str
+        """
+        url = self.domain + '/api/csrftoken'
+        status, content = await self._request('GET', url)
+        if status == 200:
+            csrf_token = json_loads(content)["data"]
+            logging.info("CSRF Token erfolgreich abgerufen %s", csrf_token)
+            return csrf_token
+        else:
+            logging.warning("CSRF Token not updated because of Response %s", content.decode())
+
+    async def ensure_csrf_token(self, outdated_token=None):
+        """
+        Returns the CSRF token of this session - requesting it only once even if called by many coroutines
+        :param outdated_token: token which was rejected - a new one is requested unless another coroutine already did
+        :type outdated_token: str
+        :return: token
+        :rtype: str
+        """
+        async with self._csrf_lock:
+            if self.csrf_token is None or self.csrf_token == outdated_token:
+                self.csrf_token = await self.get_ct_csrf_token()
+            return self.csrf_token
+
+    async def who_am_i(self):
+        """
+        Simple function which returns the user information for the authorized user
+        :return: CT user dict if found or bool
+        :rtype: dict | bool
+        """
+        url = self.domain + '/api/whoami'
+        status, content = await self._request('GET', url)
+
+        if status == 200:
+            response_content = json_loads(content)
+            if 'email' in response_content['data'].keys():
+                logging.info('Who am I as %s', response_content['data']['email'])
+                return response_content['data']
+            else:
+                logging.warning('User might not be logged in? %s', response_content['data'])
+                return False
+        else:
+            logging.warning("Checking who am i failed with %s", status)
+            return False
+
+    async def check_connection_ajax(self):
+        """
+        Checks whether a successful connection can be initiated using the legacy AJAX API
+        :return: if successful
+        :rtype: bool
+        """
+        url = self.domain + '/?q=churchservice/ajax&func=getAllFacts'
+        status, content = await self._ajax_request(url, headers={'accept': 'application/json'})
+        if status == 200:
+            logging.debug("Response AJAX Connection successful")
+            return True
+        else:
+            logging.debug("Response AJAX Connection failed with %s", status)
+            return False
+
+    async def get_persons(self, **kwargs):
+        """
+        Function to get list of all or a person from CT
+        :param kwargs: optional keywords as listed
+        :keyword ids: list: of a ids filter
+        :keyword returnAsDict: bool: true if should return a dict instead of list
+        :keyword isArchived: bool
+        :return: list of user dicts
+        :rtype: list[dict]
+        """
+        url = self.domain + '/api/persons'
+        params = [('limit', 500)]
+        if 'isArchived' in kwargs.keys():
+            params.append(('is_archived', str(kwargs["isArchived"])))
+        if 'ids' in kwargs.keys():
+            params.extend([('ids[]', person_id) for person_id in kwargs['ids']])
+
+        status, response_data = await self._get_paginated(url, headers={'accept': 'application/json'},
+                                                          params=params)
+        if response_data is None:
+            logging.info("Persons requested failed: %s", status)
+            return None
+
+        if kwargs.get('returnAsDict', False):
+            response_data = {item['id']: item for item in response_data}
+
+        logging.debug("Persons load successful with %s items", len(response_data))
+        return response_data
+
+    async def get_songs(self, **kwargs):
+        """ Gets list of all songs from the server
+        :key kwargs song_id: int: optional filter by song id
+        :return: list of songs
+        :rtype: list[dict]
+        """
+        url = self.domain + '/api/songs'
+        if "song_id" in kwargs.keys():
+            url = url + '/{}'.format(kwargs["song_id"])
+
+        status, response_data = await self._get_paginated(url, headers={'accept': 'application/json'})
+        if response_data is None:
+            if "song_id" in kwargs.keys():
+                logging.info("Did not find song (%s) with CODE %s", kwargs["song_id"], status)
+            else:
+                logging.warning("Something went wrong fetching songs: CODE %s", status)
+        return response_data
+
+    async def get_songs_ajax(self):
+        """
+        Legacy AJAX function to get all songs in one request - not cached in the async variant
+        :return: dict of all songs by song_id as str
+        :rtype: dict
+        """
+        url = self.domain + '/?q=churchservice/ajax&func=getAllSongs'
+        status, content = await self._ajax_request(url)
+        if status != 200:
+            logging.warning("Loading AJAX song list failed with %s", status)
+            return None
+        return json_loads(content)['data']['songs']
+
+    async def get_song_ajax(self, song_id=None):
+        """
+        Legacy AJAX function to get a specific song
+        Be aware that params of the returned object might differ from REST API responsens (e.g. Bezeichnung instead of name)
+        :param song_id: the id of the song to be searched for
+        :type song_id: int
+        :return: response content interpreted as json
+        :rtype: dict
+        """
+        songs = await self.get_songs_ajax()
+        return songs[str(song_id)]
+
+    async def add_song_tag(self, song_id, song_tag_id):
+        """
+        Method to add a song tag using legacy AJAX API on a specific song
+        :param song_id: ChurchTools site specific song_id which should be modified - required
+        :type song_id: int
+        :param song_tag_id: ChurchTools site specific song_tag_id which should be added - required
+        :type song_tag_id: int
+        :return: if successful
+        :rtype: bool
+        """
+        url = self.domain + '/?q=churchservice/ajax&func=addSongTag'
+        status, content = await self._ajax_request(url, data={'id': song_id, 'tag_id': song_tag_id})
+        return status == 200
+
+    async def remove_song_tag(self, song_id, song_tag_id):
+        """
+        Method to remove a song tag using legacy AJAX API on a specifc song
+        :param song_id: ChurchTools site specific song_id which should be modified - required
+        :type song_id: int
+        :param song_tag_id: ChurchTools site specific song_tag_id which should be removed - required
+        :type song_tag_id: int
+        :return: if successful
+        :rtype: bool
+        """
+        url = self.domain + '/?q=churchservice/ajax&func=delSongTag'
+        status, content = await self._ajax_request(url, data={'id': song_id, 'tag_id': song_tag_id})
+        return status == 200
+
+    async def get_groups(self, **kwargs):
+        """
+        Gets list of all groups
+        :keyword group_id: int: optional filter by group id
+        :return: list of groups
+        :rtype: list[dict] | dict
+        """
+        url = self.domain + '/api/groups'
+        if 'group_id' in kwargs.keys():
+            url = url + '/{}'.format(kwargs['group_id'])
+
+        status, response_data = await self._get_paginated(url, headers={'accept': 'application/json'})
+        if response_data is None:
+            logging.warning("Something went wrong fetching groups: %s", status)
+            return None
+        if 'group_id' in kwargs.keys():
+            return response_data[0]
+        return response_data
+
+    async def get_events(self, **kwargs):
+        """
+        Method to get all the events from given timespan or only the next event
+        :param kwargs: optional params to modify the search criteria - same as ChurchToolsApi.get_events
+        :return: list of events
+        :rtype: list[dict]
+        """
+        url = self.domain + '/api/events'
+        params = {}
+
+        if 'eventId' in kwargs.keys():
+            url += '/{}'.format(kwargs['eventId'])
+        else:
+            if 'from_' in kwargs.keys() and len(kwargs['from_']) == 10:
+                params['from'] = kwargs['from_']
+                if 'to_' in kwargs.keys() and len(kwargs['to_']) == 10:
+                    params['to'] = kwargs['to_']
+            elif 'to_' in kwargs.keys():
+                logging.warning('Use of to_ is only allowed together with from_')
+            if 'canceled' in kwargs.keys():
+                params['canceled'] = str(kwargs['canceled']).lower()
+            if 'direction' in kwargs.keys():
+                params['direction'] = kwargs['direction']
+                if 'limit' in kwargs.keys():
+                    params['limit'] = kwargs['limit']
+            elif 'limit' in kwargs.keys():
+                logging.warning('Use of limit is only allowed together with direction keyword')
+            if 'include' in kwargs.keys():
+                params['include'] = kwargs['include']
+
+        status, response_data = await self._get_paginated(url, headers={'accept': 'application/json'},
+                                                          params=params)
+        if response_data is None:
+            logging.warning("Something went wrong fetching events: %s", status)
+        return response_data
+
+    async def get_AllEventData_ajax(self, eventId):
+        """
+        Reverse engineered function from legacy AJAX API which is used to get all event data for one event
+        :param eventId: number of the event to be requested
+        :type eventId: int
+        :return: event information
+        :rtype: dict
+        """
+        url = self.domain + '/index.php'
+        status, content = await self._ajax_request(url, headers={'accept': 'application/json'},
+                                                   params={'q': 'churchservice/ajax'},
+                                                   data={'id': eventId, 'func': 'getAllEventData'})
+
+        if status == 200:
+            response_content = json_loads(content)
+            if len(response_content['data']) > 0:
+                return response_content['data'][str(eventId)]
+            else:
+                logging.info("AJAX All Event data not successful - no event found: %s", status)
+                return None
+        else:
+            logging.info("AJAX All Event data not successful: %s", status)
+            return None
+
+    async def get_event_agenda(self, eventId):
+        """
+        Retrieve agenda for event by ID from ChurchTools
+        :param eventId: number of the event
+        :type eventId: int
+        :return: event agenda
+        :rtype: dict
+        """
+        url = self.domain + '/api/events/{}/agenda'.format(eventId)
+        status, content = await self._request('GET', url, headers={'accept': 'application/json'})
+
+        if status == 200:
+            return json_loads(content)['data']
+        else:
+            logging.info("Event requested that does not have an agenda with status: %s", status)
+            return None
+
+    async def get_event_masterdata(self, **kwargs):
+        """
+        Function to get the Masterdata of the event module
+        :param kwargs: optional keywords as listed below
+        :keyword type: str with name of the masterdata type (not datatype)
+        :keyword returnAsDict: if the list with one type should be returned as dict by ID
+        :return: list of masterdata items, if multiple types list of lists (by type)
+        :rtype: list | list[list] | dict | list[dict]
+        """
+        url = self.domain + '/api/event/masterdata'
+        status, content = await self._request('GET', url, headers={'accept': 'application/json'})
+
+        if status == 200:
+            response_data = json_loads(content)['data']
+            if 'type' in kwargs:
+                response_data = response_data[kwargs['type']]
+                if kwargs.get('returnAsDict', False):
+                    response_data = {item['id']: item for item in response_data}
+            return response_data
+        else:
+            logging.info("Event Masterdata requested failed: %s", status)
+            return None
+
+    async def get_services(self, **kwargs):
+        """
+        Function to get list of all or a single services configuration item from CT
+        :param kwargs: optional keywords as listed
+        :keyword serviceId: id of a single item for filter
+        :keyword returnAsDict: true if should return a dict instead of list (not combineable if serviceId)
+        :return: list of services
+        :rtype: list[dict]
+        """
+        url = self.domain + '/api/services'
+        if 'serviceId' in kwargs.keys():
+            url += '/{}'.format(kwargs['serviceId'])
+        status, content = await self._request('GET', url, headers={'accept': 'application/json'})
+
+        if status == 200:
+            response_data = json_loads(content)['data']
+            if kwargs.get('returnAsDict', False) and 'serviceId' not in kwargs:
+                response_data = {item['id']: item for item in response_data}
+            return response_data
+        else:
+            logging.info("Services requested failed: %s", status)
+            return None
+
+    async def get_tags(self, type='songs'):
+        """
+        Retrieve a list of all available tags of a specific ct_domain type from ChurchTools
+        :param type: 'songs' (default) or 'persons'
+        :type type: str
+        :return: list of dicts describing each tag. Each contains keys 'id' and 'name'
+        :rtype list[dict]
+        """
+        url = self.domain + '/api/tags'
+        status, content = await self._request('GET', url, headers={'accept': 'application/json'},
+                                              params={'type': type})
+        if status == 200:
+            return json_loads(content)['data']
+        else:
+            logging.warning("Something went wrong fetching Song-tags: %s", status)
+
+    async def get_AllCalendars(self):
+        """
+        Retrieve infos about all calendars from ChurchTools
+        :return: list of calendar-dicts
+        :rtype: list
+        """
+        url = self.domain + '/api/calendars'
+        status, content = await self._request('GET', url, headers={'accept': 'application/json'})
+        if status == 200:
+            return json_loads(content)['data']
+        else:
+            logging.info("Calendars could not be loaded with status: %s", status)
+            return None
+
+    async def file_download(self, filename, domain_type, domain_identifier, target_path='./downloads'):
+        """
+        Retrieves the first file from ChurchTools for specific filename, domain_type and domain_identifier
+        :param filename: display name of the file as shown in ChurchTools
+        :type filename: str
+        :param domain_type: e.g. 'song_arrangement' - see ChurchToolsApi.file_download
+        :type domain_type: str
+        :param domain_identifier: = Id e.g. of song_arrangement
+        :type domain_identifier: str
+        :param target_path: local path as target for the download (without filename) - will be created if not exists
+        :type target_path: str
+        :return: if successful
+        :rtype: bool
+        """
+        os.makedirs(target_path, exist_ok=True)
+
+        url = '{}/api/files/{}/{}'.format(self.domain, domain_type, domain_identifier)
+        status, content = await self._request('GET', url)
+        if status != 200:
+            logging.warning("Something went wrong fetching SongArrangement-Files: %s", status)
+            return False
+
+        for file in json_loads(content)['data']:
+            if str(file['name']) == filename:
+                logging.debug("Found File: %s", filename)
+                return await self.file_download_from_url(str(file['fileUrl']), os.sep.join([target_path, filename]))
+
+        logging.warning("File %s does not exist", filename)
+        return False
+
+    async def file_download_from_url(self, file_url, target_path):
+        """
+        Retrieves file from ChurchTools for specific file_url from churchtools
+        :param file_url: file url as listed in the files of a domain object
+        :type file_url: str
+        :param target_path: filepath to drop the download into - directory must exist before use!
+        :type target_path: str
+        :return: if successful
+        :rtype: bool
+        """
+        async with self.session.get(file_url) as response:
+            if response.status == 200:
+                with open(target_path, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(65536):
+                        f.write(chunk)
+                logging.debug("Download of %s successful", file_url)
+                return True
+            else:
+                logging.warning("Something went wrong during file_download: %s", response.status)
+                return False
@@ -0,0 +1,119 @@
+import threading
+import time
+
+
+class TTLCache:
+    def __init__(self, ttl=10):
+        """
+        Simple thread safe in memory cache which keeps values for a limited time only
+        :param ttl: default number of seconds after which an entry is considered outdated
+        :type ttl: float
+        """
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.RLock()
+
+    def get(self, key, max_age=None):
+        """
+        Get a value from cache if it is not outdated
+        :param key: identifier of the entry
+        :type key: collections.abc.Hashable
+        :param max_age: number of seconds after which the entry is outdated - defaults to ttl of the cache
+        :type max_age: float
+        :return: cached value or None if missing or outdated
+        """
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] + max_age < time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        """
+        Store a value in cache - the age of the entry starts with 0
+        :param key: identifier of the entry
+        :type key: collections.abc.Hashable
+        :param value: any value which should be cached
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+
+    def get_or_load(self, key, loader, max_age=None):
+        """
+        Get a value from cache or use loader to create a new entry if it is missing or outdated
+        Loading is done while holding the lock so parallel calls do not request the same data twice
+        :param key: identifier of the entry
+        :type key: collections.abc.Hashable
+        :param loader: function without params which returns the value to be cached - None is not cached
+        :type loader: collections.abc.Callable
+        :param max_age: number of seconds after which the entry is outdated - defaults to ttl of the cache
+        :type max_age: float
+        :return: cached or loaded value
+        """
+        with self._lock:
+            value = self.get(key, max_age=max_age)
+            if value is None:
+                value = loader()
+                if value is not None:
+                    self.set(key, value)
+            return value
+
+    def update(self, key, function):
+        """
+        Modify a cached value in place without changing its age
+        e.g. to apply a known change instead of invalidating a large entry
+        :param key: identifier of the entry
+        :type key: collections.abc.Hashable
+        :param function: function which is called with the cached value if the entry exists
+        :type function: collections.abc.Callable
+        :return: if an entry was updated
+        :rtype: bool
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            function(entry[1])
+            return True
+
+    def invalidate(self, key=None):
+        """
+        Remove one or all entries from cache
+        :param key: identifier of the entry - all entries are removed if None
+        :type key: collections.abc.Hashable
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def remove_expired(self, max_age=None):
+        """
+        Remove all outdated entries e.g. if keys are not requested again once their content changed
+        :param max_age: number of seconds after which an entry is outdated - defaults to ttl of the cache
+        :type max_age: float
+        :return: number of removed entries
+        :rtype: int
+        """
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            now = time.monotonic()
+            expired = [key for key, entry in self._entries.items() if entry[0] + max_age < now]
+            for key in expired:
+                del self._entries[key]
+            return len(expired)
+
+    def statistics(self):
+        """
+        Summary of cache usage
+        :return: dict with number of hits, misses and entries
+        :rtype: dict
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
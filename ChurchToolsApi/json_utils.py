@@ -0,0 +1,14 @@
+import json
+
+# faster optional json parsers are used if installed - all of them accept bytes as returned by response.content
+try:
+    import orjson
+
+    json_loads = orjson.loads
+except ImportError:
+    try:
+        import ujson
+
+        json_loads = ujson.loads
+    except ImportError:
+        json_loads = json.loads
@@ -0,0 +1,137 @@
+import threading
+
+
+class MetricsAggregator:
+    LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self):
+        """
+        Collects request events of ChurchToolsApi hooks grouped by calling public method, HTTP method and endpoint
+        usage: metrics = MetricsAggregator(); metrics.attach(api); ...; print(metrics.summary_table())
+        """
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def attach(self, api):
+        """
+        Registers this aggregator for after_response and on_retry events of an api object
+        :param api: api object to be observed
+        :type api: ChurchToolsApi.ChurchToolsApi
+        """
+        api.add_hook('after_response', self.record_response)
+        api.add_hook('on_retry', self.record_retry)
+
+    def detach(self, api):
+        """
+        Removes the hooks registered by attach
+        :param api: api object which is observed
+        :type api: ChurchToolsApi.ChurchToolsApi
+        """
+        api.remove_hook('after_response', self.record_response)
+        api.remove_hook('on_retry', self.record_retry)
+
+    def _entry(self, event):
+        key = (event['caller'] or '', event['method'], event['endpoint'])
+        entry = self._stats.get(key)
+        if entry is None:
+            entry = {'caller': key[0], 'method': key[1], 'endpoint': key[2], 'requests': 0, 'errors': 0,
+                     'retries': 0, 'bytes': 0, 'latency_sum': 0.0, 'latency_max': 0.0, 'statuses': {},
+                     'buckets': [0] * len(self.LATENCY_BUCKETS)}
+            self._stats[key] = entry
+        return entry
+
+    def record_response(self, event):
+        """
+        Hook for after_response events
+        :param event: dict as created by ChurchToolsApi._send
+        :type event: dict
+        """
+        status = event['status'] if event['status'] is not None else event['error']
+        with self._lock:
+            entry = self._entry(event)
+            entry['requests'] += 1
+            if event['status'] is None or event['status'] >= 400:
+                entry['errors'] += 1
+            entry['statuses'][status] = entry['statuses'].get(status, 0) + 1
+            entry['bytes'] += event['bytes'] or 0
+            entry['latency_sum'] += event['latency']
+            entry['latency_max'] = max(entry['latency_max'], event['latency'])
+            for index, bucket in enumerate(self.LATENCY_BUCKETS):
+                if event['latency'] <= bucket:
+                    entry['buckets'][index] += 1
+
+    def record_retry(self, event):
+        """
+        Hook for on_retry events
+        :param event: dict as created by ChurchToolsApi._send
+        :type event: dict
+        """
+        with self._lock:
+            self._entry(event)['retries'] += 1
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def summary(self):
+        """
+        :return: list of dicts with caller, method, endpoint, requests, errors, retries, bytes, latency_avg and
+            latency_max - sorted by number of requests
+        :rtype: list[dict]
+        """
+        with self._lock:
+            rows = [{'caller': entry['caller'], 'method': entry['method'], 'endpoint': entry['endpoint'],
+                     'requests': entry['requests'], 'errors': entry['errors'], 'retries': entry['retries'],
+                     'bytes': entry['bytes'],
+                     'latency_avg': entry['latency_sum'] / entry['requests'] if entry['requests'] > 0 else 0.0,
+                     'latency_max': entry['latency_max']}
+                    for entry in self._stats.values()]
+        return sorted(rows, key=lambda row: row['requests'], reverse=True)
+
+    def summary_table(self):
+        """
+        :return: text table of summary() e.g. to find public methods causing many requests
+        :rtype: str
+        """
+        columns = ['caller', 'method', 'endpoint', 'requests', 'errors', 'retries', 'bytes', 'latency_avg',
+                   'latency_max']
+        rows = [[row[column] if not isinstance(row[column], float) else '{:.3f}'.format(row[column])
+                 for column in columns] for row in self.summary()]
+        widths = [max([len(column)] + [len(str(row[index])) for row in rows]) for index, column in enumerate(columns)]
+        lines = ['  '.join(column.ljust(width) for column, width in zip(columns, widths))]
+        lines.extend('  '.join(str(value).ljust(width) for value, width in zip(row, widths)) for row in rows)
+        return '\n'.join(lines)
+
+    def prometheus(self, prefix='churchtools'):
+        """
+        :param prefix: prefix of the metric names
+        :type prefix: str
+        :return: counters and latency histogram in Prometheus text exposition format
+        :rtype: str
+        """
+        requests, retries, response_bytes, durations = [], [], [], []
+        with self._lock:
+            for entry in self._stats.values():
+                labels = 'caller="{}",method="{}",endpoint="{}"'.format(
+                    *[str(value).replace('\\', '\\\\').replace('"', '\\"')
+                      for value in (entry['caller'], entry['method'], entry['endpoint'])])
+                for status, count in entry['statuses'].items():
+                    requests.append('{}_requests_total{{{},status="{}"}} {}'.format(prefix, labels, status, count))
+                retries.append('{}_retries_total{{{}}} {}'.format(prefix, labels, entry['retries']))
+                response_bytes.append('{}_response_bytes_total{{{}}} {}'.format(prefix, labels, entry['bytes']))
+                for bucket, count in zip(self.LATENCY_BUCKETS, entry['buckets']):
+                    durations.append('{}_request_duration_seconds_bucket{{{},le="{}"}} {}'.format(
+                        prefix, labels, bucket, count))
+                durations.append('{}_request_duration_seconds_bucket{{{},le="+Inf"}} {}'.format(
+                    prefix, labels, entry['requests']))
+                durations.append('{}_request_duration_seconds_sum{{{}}} {}'.format(
+                    prefix, labels, entry['latency_sum']))
+                durations.append('{}_request_duration_seconds_count{{{}}} {}'.format(
+                    prefix, labels, entry['requests']))
+
+        # all samples of one metric have to be grouped below its TYPE line
+        lines = ['# TYPE {}_requests_total counter'.format(prefix)] + requests
+        lines += ['# TYPE {}_retries_total counter'.format(prefix)] + retries
+        lines += ['# TYPE {}_response_bytes_total counter'.format(prefix)] + response_bytes
+        lines += ['# TYPE {}_request_duration_seconds histogram'.format(prefix)] + durations
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,301 @@
+import abc
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class CachedResponse:
+    def __init__(self, url, content, headers, stored_at):
+        """
+        One GET response stored by a ResponseCache
+        :param url: full url including params
+        :type url: str
+        :param content: body of the response
+        :type content: bytes
+        :param headers: subset of response headers - Content-Type, ETag and Last-Modified
+        :type headers: dict
+        :param stored_at: unix timestamp of the last successful validation with the server
+        :type stored_at: float
+        """
+        self.url = url
+        self.content = content
+        self.headers = headers
+        self.stored_at = stored_at
+
+    @property
+    def age(self):
+        return time.time() - self.stored_at
+
+    def to_response(self):
+        """
+        Creates a requests.Response with status 200 which can be used like a response of the server
+        :return: response object
+        :rtype: requests.Response
+        """
+        response = requests.Response()
+        response.status_code = 200
+        response.url = self.url
+        response.headers = CaseInsensitiveDict(self.headers)
+        response._content = self.content
+        response.encoding = 'utf-8'
+        return response
+
+
+class ResponseCache(abc.ABC):
+    STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+    def __init__(self, default_ttl=0, endpoint_ttls=None, uncached_endpoints=('/api/whoami', '/api/csrftoken')):
+        """
+        Base class of persistent caches for GET responses used by ChurchToolsApi(response_cache=...)
+        Responses younger than their ttl are used without contacting the server.
+        Older responses are revalidated using If-None-Match / If-Modified-Since if the server sent ETag / Last-Modified
+        Be aware that responses depend on the permissions of the user - use one cache location per user
+        Changes using REST requests of the same client remove cached responses of the affected resource type,
+        changes using legacy AJAX functions (e.g. song tags) are only noticed after the ttl of a response
+        :param default_ttl: seconds a response is used without revalidation - 0 always revalidates
+        :type default_ttl: float
+        :param endpoint_ttls: dict of url part: ttl overwriting default_ttl - first match is used
+            e.g. {'/api/event/masterdata': 86400, '/api/songs': 3600}
+        :type endpoint_ttls: dict[str, float]
+        :param uncached_endpoints: url parts of requests which are never cached
+        :type uncached_endpoints: tuple[str]
+        """
+        self.default_ttl = default_ttl
+        self.endpoint_ttls = endpoint_ttls if endpoint_ttls is not None else {}
+        self.uncached_endpoints = uncached_endpoints
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self._statistics_lock = threading.Lock()
+
+    @staticmethod
+    def key(url, params=None):
+        """
+        Identifier of a request - full url including params in the order sent by requests
+        :param url: url of the request
+        :type url: str
+        :param params: params of the request
+        :type params: dict | list[tuple]
+        :return: key used to store the response
+        :rtype: str
+        """
+        return requests.Request('GET', url, params=params).prepare().url
+
+    def is_cacheable(self, url):
+        """
+        :param url: url of the request
+        :type url: str
+        :return: if responses of this url can be stored
+        :rtype: bool
+        """
+        return not any(endpoint in url for endpoint in self.uncached_endpoints)
+
+    def ttl_for(self, url):
+        """
+        :param url: url of the request
+        :type url: str
+        :return: number of seconds a response for this url is used without revalidation
+        :rtype: float
+        """
+        for endpoint, ttl in self.endpoint_ttls.items():
+            if endpoint in url:
+                return ttl
+        return self.default_ttl
+
+    @abc.abstractmethod
+    def get(self, key):
+        """
+        :param key: identifier as created by key()
+        :type key: str
+        :return: stored response or None
+        :rtype: CachedResponse | None
+        """
+
+    def store(self, key, response):
+        """
+        Stores a successful response if the server allows revalidation or a ttl is configured
+        :param key: identifier as created by key()
+        :type key: str
+        :param response: response of the server with status 200
+        :type response: requests.Response
+        """
+        headers = {name: response.headers[name] for name in self.STORED_HEADERS if name in response.headers}
+        if 'ETag' not in headers and 'Last-Modified' not in headers and self.ttl_for(key) <= 0:
+            return
+        self._write(CachedResponse(key, response.content, headers, time.time()))
+
+    @abc.abstractmethod
+    def touch(self, key):
+        """
+        Marks a stored response as validated now - used after a 304 Not Modified
+        :param key: identifier as created by key()
+        :type key: str
+        """
+
+    @abc.abstractmethod
+    def invalidate(self, url_part=None):
+        """
+        Removes stored responses
+        :param url_part: only responses with urls containing this text are removed - all if None
+        :type url_part: str
+        """
+
+    @abc.abstractmethod
+    def _write(self, entry):
+        """
+        Stores a response replacing any previous one with the same url
+        :param entry: response to be stored
+        :type entry: CachedResponse
+        """
+
+    def record(self, result):
+        """
+        Counts the result of a request - thread safe because requests of one client can run in parallel
+        :param result: one of hits, revalidations or misses - see statistics
+        :type result: str
+        """
+        with self._statistics_lock:
+            setattr(self, result, getattr(self, result) + 1)
+
+    def statistics(self):
+        """
+        :return: dict with number of hits (no request), revalidations (304 Not Modified) and misses
+        :rtype: dict
+        """
+        with self._statistics_lock:
+            return {'hits': self.hits, 'revalidations': self.revalidations, 'misses': self.misses}
+
+
+class SQLiteResponseCache(ResponseCache):
+    def __init__(self, path, **kwargs):
+        """
+        Response cache stored in one SQLite database file
+        :param path: filepath of the database - will be created if not exists
+        :type path: str
+        :param kwargs: see ResponseCache
+        """
+        super().__init__(**kwargs)
+        self.path = path
+        self._lock = threading.Lock()
+        self._connect()
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory != '':
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute('CREATE TABLE IF NOT EXISTS responses '
+                                 '(url TEXT PRIMARY KEY, content BLOB, headers TEXT, stored_at REAL)')
+        self._connection.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._connection.execute('SELECT content, headers, stored_at FROM responses WHERE url = ?',
+                                           (key,)).fetchone()
+        if row is None:
+            return None
+        return CachedResponse(key, row[0], json.loads(row[1]), row[2])
+
+    def _write(self, entry):
+        with self._lock:
+            self._connection.execute('REPLACE INTO responses (url, content, headers, stored_at) VALUES (?, ?, ?, ?)',
+                                     (entry.url, entry.content, json.dumps(entry.headers), entry.stored_at))
+            self._connection.commit()
+
+    def touch(self, key):
+        with self._lock:
+            self._connection.execute('UPDATE responses SET stored_at = ? WHERE url = ?', (time.time(), key))
+            self._connection.commit()
+
+    def invalidate(self, url_part=None):
+        with self._lock:
+            if url_part is None:
+                self._connection.execute('DELETE FROM responses')
+            else:
+                self._connection.execute("DELETE FROM responses WHERE instr(url, ?) > 0", (url_part,))
+            self._connection.commit()
+
+
+class DirectoryResponseCache(ResponseCache):
+    def __init__(self, path, **kwargs):
+        """
+        Response cache stored as one body file and one json metadata file per response in a directory
+        :param path: directory to store the responses in - will be created if not exists
+        :type path: str
+        :param kwargs: see ResponseCache
+        """
+        super().__init__(**kwargs)
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _filepath(self, key):
+        return os.sep.join([self.path, hashlib.sha256(key.encode('utf-8')).hexdigest()])
+
+    def get(self, key):
+        filepath = self._filepath(key)
+        try:
+            with open(filepath + '.json', 'r', encoding='utf-8') as file:
+                metadata = json.load(file)
+            with open(filepath + '.body', 'rb') as file:
+                content = file.read()
+        except (OSError, ValueError):
+            return None
+        return CachedResponse(key, content, metadata['headers'], metadata['stored_at'])
+
+    def _write(self, entry):
+        filepath = self._filepath(entry.url)
+        self._replace_file(filepath + '.body', entry.content)
+        self._write_metadata(filepath, entry.url, entry.headers, entry.stored_at)
+
+    def _write_metadata(self, filepath, url, headers, stored_at):
+        self._replace_file(filepath + '.json', json.dumps({'url': url, 'headers': headers, 'stored_at': stored_at})
+                           .encode('utf-8'))
+
+    def _replace_file(self, filepath, content):
+        """
+        Writes a file using a uniquely named temporary file in the same directory which replaces it when complete
+        so neither readers nor other threads / processes writing the same response see partial content
+        :param filepath: file to be replaced
+        :type filepath: str
+        :param content: new content of the file
+        :type content: bytes
+        """
+        descriptor, temp_filepath = tempfile.mkstemp(suffix='.tmp', dir=self.path)
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(content)
+            os.replace(temp_filepath, filepath)
+        except OSError:
+            os.remove(temp_filepath)
+            raise
+
+    def touch(self, key):
+        entry = self.get(key)
+        if entry is not None:
+            self._write_metadata(self._filepath(key), key, entry.headers, time.time())
+
+    def invalidate(self, url_part=None):
+        for filename in os.listdir(self.path):
+            if not filename.endswith('.json'):
+                continue
+            filepath = os.sep.join([self.path, filename[:-len('.json')]])
+            if url_part is not None:
+                try:
+                    with open(filepath + '.json', 'r', encoding='utf-8') as file:
+                        if url_part not in json.load(file)['url']:
+                            continue
+                except (OSError, ValueError):
+                    pass
+            for suffix in ('.json', '.body'):
+                try:
+                    os.remove(filepath + suffix)
+                except OSError:
+                    logging.debug('Cached response %s%s already removed', filepath, suffix)
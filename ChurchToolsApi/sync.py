@@ -0,0 +1,274 @@
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+class IncrementalSync:
+    COLLECTIONS = ('persons', 'songs')
+
+    def __init__(self, api, snapshot_path, collection):
+        """
+        Keeps a local json snapshot of all persons or songs and reports changes since the last run
+        Records are compared by id and meta.modifiedDate only - records without modifiedDate are compared completely
+        :param api: connected ChurchToolsApi object used to request the records
+        :type api: ChurchToolsApi.ChurchToolsApi
+        :param snapshot_path: filepath of the json snapshot - will be created on first run
+        :type snapshot_path: str
+        :param collection: 'persons' or 'songs'
+        :type collection: str
+        """
+        if collection not in self.COLLECTIONS:
+            raise ValueError('collection must be one of {}'.format(self.COLLECTIONS))
+        self.api = api
+        self.snapshot_path = snapshot_path
+        self.collection = collection
+
+    def load_snapshot(self):
+        """
+        Reads the local snapshot
+        :return: dict with keys watermark (latest modifiedDate) and records (dict of str(id): record)
+        :rtype: dict
+        """
+        if not os.path.isfile(self.snapshot_path):
+            return {'collection': self.collection, 'watermark': None, 'records': {}}
+        with open(self.snapshot_path, 'r', encoding='utf-8') as file:
+            snapshot = json.load(file)
+        if snapshot.get('collection') != self.collection:
+            raise ValueError('{} is a snapshot of {}'.format(self.snapshot_path, snapshot.get('collection')))
+        return snapshot
+
+    def save_snapshot(self, snapshot):
+        """
+        Replaces the local snapshot - the file is written completely before it replaces the old one
+        :param snapshot: dict as returned by load_snapshot
+        :type snapshot: dict
+        """
+        directory = os.path.dirname(self.snapshot_path)
+        if directory != '':
+            os.makedirs(directory, exist_ok=True)
+        with open(self.snapshot_path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(snapshot, file)
+        os.replace(self.snapshot_path + '.tmp', self.snapshot_path)
+
+    @staticmethod
+    def modified_date(record):
+        """
+        :param record: person or song as returned by the REST API
+        :type record: dict
+        :return: meta.modifiedDate if available
+        :rtype: str | None
+        """
+        return record.get('meta', {}).get('modifiedDate')
+
+    def run(self, save=True):
+        """
+        Requests all records page by page, merges changes into the snapshot and returns the changes
+        Deleted records are detected by ids which are no longer returned
+        :param save: if the merged snapshot should be saved
+        :type save: bool
+        :return: changeset dict with keys added, changed (lists of records), deleted (list of ids),
+            unchanged (number of records) and watermark (latest modifiedDate)
+        :rtype: dict
+        """
+        snapshot = self.load_snapshot()
+        old_records = snapshot['records']
+        records = {}
+        changeset = {'added': [], 'changed': [], 'deleted': [], 'unchanged': 0, 'watermark': snapshot['watermark']}
+
+        records_iterator = self.api.iter_persons() if self.collection == 'persons' else self.api.iter_songs()
+        for record in records_iterator:
+            record_id = str(record['id'])
+            records[record_id] = record
+            old_record = old_records.get(record_id)
+            modified_date = self.modified_date(record)
+
+            if modified_date is not None and (changeset['watermark'] is None or modified_date > changeset['watermark']):
+                changeset['watermark'] = modified_date
+
+            if old_record is None:
+                changeset['added'].append(record)
+            elif modified_date is not None and modified_date == self.modified_date(old_record):
+                changeset['unchanged'] += 1
+            elif modified_date is None and record == old_record:
+                changeset['unchanged'] += 1
+            else:
+                changeset['changed'].append(record)
+
+        changeset['deleted'] = [int(record_id) if record_id.isdigit() else record_id
+                                for record_id in old_records.keys() if record_id not in records]
+
+        logging.info('Sync of %s: %s added, %s changed, %s deleted, %s unchanged', self.collection,
+                     len(changeset['added']), len(changeset['changed']), len(changeset['deleted']),
+                     changeset['unchanged'])
+
+        if save:
+            self.save_snapshot({'collection': self.collection, 'watermark': changeset['watermark'],
+                                'records': records})
+        return changeset
+
+
+class SongFileMirror:
+    def __init__(self, api, target_dir, manifest_path=None):
+        """
+        Keeps a local copy of all files attached to song arrangements
+        Downloaded files are recorded in a json manifest by file id with name, size, path and a hash of the url,
+        so files which did not change are not downloaded again
+        Files are stored as target_dir/arrangement id/file name
+        :param api: connected ChurchToolsApi object used to request songs and files
+        :type api: ChurchToolsApi.ChurchToolsApi
+        :param target_dir: local folder of the mirror - will be created on first run
+        :type target_dir: str
+        :param manifest_path: filepath of the json manifest - defaults to manifest.json within target_dir
+        :type manifest_path: str
+        """
+        self.api = api
+        self.target_dir = target_dir
+        self.manifest_path = manifest_path if manifest_path is not None else os.sep.join([target_dir, 'manifest.json'])
+
+    def load_manifest(self):
+        """
+        Reads the local manifest
+        :return: dict of str(file id): dict with name, size, url_hash and path (relative to target_dir)
+        :rtype: dict
+        """
+        if not os.path.isfile(self.manifest_path):
+            return {}
+        with open(self.manifest_path, 'r', encoding='utf-8') as file:
+            return json.load(file)['files']
+
+    def save_manifest(self, files):
+        """
+        Replaces the local manifest - the file is written completely before it replaces the old one
+        :param files: dict as returned by load_manifest
+        :type files: dict
+        """
+        directory = os.path.dirname(self.manifest_path)
+        if directory != '':
+            os.makedirs(directory, exist_ok=True)
+        with open(self.manifest_path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump({'files': files}, file)
+        os.replace(self.manifest_path + '.tmp', self.manifest_path)
+
+    def list_files(self):
+        """
+        All files of all song arrangements - files included in songs are used directly,
+        arrangements of songs without files are listed in parallel
+        :return: list of (arrangement id, file dict) or None if songs could not be loaded
+        :rtype: list[tuple[int, dict]] | None
+        """
+        songs = self.api.get_songs()
+        if songs is None:
+            return None
+        files = []
+        unlisted = []
+        for song in songs:
+            for arrangement in song['arrangements']:
+                if 'files' in arrangement.keys():
+                    files.extend((arrangement['id'], file) for file in arrangement['files'])
+                else:
+                    unlisted.append(arrangement['id'])
+
+        get_files = self.api._with_caller(self.api.get_files)
+        with ThreadPoolExecutor(max_workers=self.api.max_workers) as executor:
+            for arrangement_id, arrangement_files in zip(
+                    unlisted, executor.map(lambda item: get_files('song_arrangement', item), unlisted)):
+                if arrangement_files is None:
+                    return None
+                files.extend((arrangement_id, file) for file in arrangement_files)
+        return files
+
+    def run(self, delete_orphans=False):
+        """
+        Downloads new and changed files and updates the manifest
+        Files are downloaded next to their local copy which is only replaced once the download succeeded.
+        Failed files keep their previous manifest entry and are therefore retried (resumed) on the next run
+        :param delete_orphans: if local files which are no longer attached to any arrangement should be deleted
+            otherwise they are kept and reported as orphaned
+        :type delete_orphans: bool
+        :return: dict with keys downloaded, failed, deleted, orphaned (lists of paths relative to target_dir)
+            and unchanged (number of files) or None if files could not be listed
+        :rtype: dict | None
+        """
+        files = self.list_files()
+        if files is None:
+            logging.warning('Song files could not be listed - mirror in %s not changed', self.target_dir)
+            return None
+
+        old_manifest = self.load_manifest()
+        manifest = {}
+        downloads = {}
+        paths = set()
+        result = {'downloaded': [], 'failed': [], 'deleted': [], 'orphaned': [], 'unchanged': 0}
+
+        for arrangement_id, file in files:
+            file_id = str(file['id'])
+            path = os.sep.join([str(arrangement_id), file['name'].replace('/', '_').replace(os.sep, '_')])
+            if path in paths:  # files with the same name in one arrangement
+                path = os.sep.join([str(arrangement_id), '{}_{}'.format(file_id, os.path.basename(path))])
+            paths.add(path)
+            entry = {'name': file['name'], 'size': file.get('size'), 'path': path,
+                     'url_hash': hashlib.sha1(file['fileUrl'].encode('utf-8')).hexdigest()}
+
+            old_entry = old_manifest.get(file_id)
+            local_path = os.sep.join([self.target_dir, path])
+            if old_entry == entry and os.path.isfile(local_path) \
+                    and (entry['size'] is None or os.path.getsize(local_path) == entry['size']):
+                manifest[file_id] = entry
+                result['unchanged'] += 1
+                continue
+
+            entry['url'] = file['fileUrl']
+            downloads[file_id] = entry
+
+        for file_id, entry in old_manifest.items():
+            if file_id in manifest.keys() or file_id in downloads.keys():
+                continue
+            if entry['path'] in paths:
+                # replaced by a new file with the same name e.g. file_upload with overwrite - the file is downloaded
+                continue
+            if delete_orphans:
+                if os.path.isfile(os.sep.join([self.target_dir, entry['path']])):
+                    os.remove(os.sep.join([self.target_dir, entry['path']]))
+                result['deleted'].append(entry['path'])
+            else:
+                manifest[file_id] = entry
+                result['orphaned'].append(entry['path'])
+
+        # previous entries are kept until the new version is downloaded
+        for file_id in downloads.keys():
+            if file_id in old_manifest.keys():
+                manifest[file_id] = old_manifest[file_id]
+
+        try:
+            # downloaded to a separate path because file_download_from_urls keeps files with the expected size
+            staging_paths = {file_id: os.sep.join([self.target_dir, entry['path']]) + '.download'
+                             for file_id, entry in downloads.items()}
+            for staging_path in staging_paths.values():
+                if os.path.isfile(staging_path):
+                    os.remove(staging_path)
+            results = self.api.file_download_from_urls(
+                [(entry['url'], staging_paths[file_id], entry['size']) for file_id, entry in downloads.items()])
+
+            for file_id, entry in downloads.items():
+                if not results[staging_paths[file_id]]:
+                    result['failed'].append(entry['path'])
+                    continue
+                os.replace(staging_paths[file_id], os.sep.join([self.target_dir, entry['path']]))
+                # old path of a changed file is only removed if no current file uses it
+                old_path = old_manifest.get(file_id, {}).get('path')
+                if old_path is not None and old_path not in paths \
+                        and os.path.isfile(os.sep.join([self.target_dir, old_path])):
+                    os.remove(os.sep.join([self.target_dir, old_path]))
+                del entry['url']
+                manifest[file_id] = entry
+                result['downloaded'].append(entry['path'])
+        finally:
+            self.save_manifest(manifest)
+
+        logging.info('Sync of song files: %s downloaded, %s failed, %s deleted, %s orphaned, %s unchanged',
+                     len(result['downloaded']), len(result['failed']), len(result['deleted']),
+                     len(result['orphaned']), result['unchanged'])
+
+        return result
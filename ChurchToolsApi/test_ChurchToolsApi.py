@@ -1,10 +1,640 @@
 import ast
+import asyncio
+import hashlib
+import io
 import logging
 import os
+import re
+import tempfile
+import threading
+import time
 import unittest
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+
+import docx
+import requests
+from werkzeug.serving import make_server
+
+import ChurchToolsWebService
 
 from ChurchToolsApi import ChurchToolsApi
+from ChurchToolsApi.agenda_docx import AgendaDocxRenderer, agenda_paragraphs
+from ChurchToolsApi.async_api import AsyncChurchToolsApi, aiohttp
+from ChurchToolsApi.metrics import MetricsAggregator
+from ChurchToolsApi.response_cache import DirectoryResponseCache, ResponseCache, SQLiteResponseCache
+from ChurchToolsApi.transport import RetryPolicy, TokenBucket
+from ChurchToolsBenchmark import percentile, run_benchmarks
+from ChurchToolsMockServer import MockServer
+from ChurchToolsMockServer.fixtures import generate_fixtures
+from ChurchToolsWebService.client_registry import ClientRegistry
+
+
+class TestsTransport(unittest.TestCase):
+    """
+    Tests of the request helpers which do not require a connection to ChurchTools
+    """
+
+    def test_retry_policy(self):
+        """
+        Checks which requests are repeated and how long to wait
+        :return:
+        """
+        policy = RetryPolicy(max_retries=2, backoff_factor=1, max_backoff=3, endpoint_max_retries={'/api/songs': 0})
+        self.assertTrue(policy.is_retryable('GET', 'https://x/api/persons', 0, 503))
+        self.assertFalse(policy.is_retryable('GET', 'https://x/api/persons', 2, 503))
+        self.assertFalse(policy.is_retryable('GET', 'https://x/api/persons', 0, 404))
+        self.assertFalse(policy.is_retryable('GET', 'https://x/api/songs', 0, 503))
+        self.assertFalse(policy.is_retryable('POST', 'https://x/api/persons', 0, 503))
+        self.assertTrue(policy.is_retryable('POST', 'https://x/api/persons', 0, 429))
+        self.assertTrue(policy.is_retryable('GET', 'https://x/api/persons', 0, None))
+
+        self.assertLessEqual(policy.backoff(5), 3)
+        self.assertEqual(policy.backoff(0, retry_after=7), 7)
+        self.assertEqual(policy.parse_retry_after('12'), 12)
+        self.assertLess(policy.parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'), 0)
+        self.assertIsNone(policy.parse_retry_after(None))
+
+    def test_token_bucket(self):
+        """
+        Checks that requests exceeding the burst capacity have to wait
+        :return:
+        """
+        bucket = TokenBucket(rate=20, capacity=2)
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertGreater(bucket.acquire(), 0)
+
+
+class TestsResponseCache(unittest.TestCase):
+    """
+    Tests of the persistent response caches which do not require a connection to ChurchTools
+    """
+
+    def check_response_cache(self, cache):
+        """
+        Stores, reads, revalidates and removes a response using the specified cache
+        :param cache: empty cache to be tested
+        :type cache: ChurchToolsApi.response_cache.ResponseCache
+        :return:
+        """
+        key = cache.key('https://example.church.tools/api/songs', params={'page': 2})
+        self.assertEqual(key, 'https://example.church.tools/api/songs?page=2')
+        self.assertIsNone(cache.get(key))
+
+        response = requests.Response()
+        response.status_code = 200
+        response.headers['ETag'] = '"abc"'
+        response._content = b'{"data": []}'
+        cache.store(key, response)
+
+        cached = cache.get(key)
+        self.assertEqual(cached.content, b'{"data": []}')
+        self.assertEqual(cached.headers['ETag'], '"abc"')
+        self.assertEqual(cached.to_response().json(), {'data': []})
+        self.assertEqual(cache.ttl_for(key), 60)
+
+        cache.touch(key)
+        self.assertLess(cache.get(key).age, 5)
+
+        cache.invalidate('/api/persons')
+        self.assertIsNotNone(cache.get(key))
+        cache.invalidate('/api/songs')
+        self.assertIsNone(cache.get(key))
+
+    def test_sqlite_response_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = SQLiteResponseCache(os.sep.join([directory, 'cache.sqlite']), endpoint_ttls={'/api/songs': 60})
+            self.check_response_cache(cache)
+
+    def test_directory_response_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = DirectoryResponseCache(directory, endpoint_ttls={'/api/songs': 60})
+            self.check_response_cache(cache)
+            self.assertEqual([filename for filename in os.listdir(directory) if filename.endswith('.tmp')], [])
+
+    def test_response_cache_abstract(self):
+        with self.assertRaises(TypeError):
+            ResponseCache()
+
+
+class TestsMockServer(unittest.TestCase):
+    """
+    Tests of the client against the local mock server which do not require a connection to ChurchTools
+    """
+
+    def setUp(self):
+        self.server = MockServer(page_size=7).start()
+        self.api = ChurchToolsApi(domain=self.server.url, ct_token=self.server.state.token,
+                                  retry_policy=RetryPolicy(backoff_factor=0.01))
+
+    def tearDown(self):
+        self.api.session.close()
+        self.server.stop()
+
+    def test_pagination(self):
+        """
+        Checks that all pages are combined and that the generator yields the same items
+        :return:
+        """
+        persons = self.api.get_persons()
+        self.assertEqual(len(persons), len(self.server.state.data['persons']))
+        self.assertEqual([person['id'] for person in persons], [person['id'] for person in self.api.iter_persons()])
+        self.assertEqual(len(self.api.get_persons(ids=[1, 2])), 2)
+        self.assertEqual(self.api.get_songs(song_id=3)[0]['id'], 3)
+
+    def test_error_injection(self):
+        """
+        Checks that injected transient errors are repeated and persistent errors are reported
+        :return:
+        """
+        self.server.state.fail_next = 2
+        self.assertEqual(len(self.api.get_songs()), len(self.server.state.data['songs']))
+        self.assertEqual(self.server.state.statistics()['errors'], 2)
+
+        self.server.state.error_rate = 1
+        self.server.state.error_endpoints = ['page=2']
+        self.assertIsNone(self.api.get_songs())
+        with self.assertRaises(requests.HTTPError):
+            list(self.api.iter_songs())
+
+    def test_ajax_song_tags(self):
+        """
+        Checks that legacy AJAX tag changes are visible in the song list
+        :return:
+        """
+        self.api.remove_song_tag(1, 50)
+        self.assertFalse(self.api.contains_song_tag(1, 50))
+        self.api.add_song_tag(1, 50)
+        self.api.ajax_song_cache.invalidate()
+        self.assertTrue(self.api.contains_song_tag(1, 50))
+        self.assertIn(1, self.api.get_song_ids_by_tags(all_of=[50]))
+
+        # the index is created once per song list and patched by tag changes
+        tag_index = self.api.get_song_tag_index()
+        self.assertIs(self.api.get_song_tag_index(), tag_index)
+        self.api.remove_song_tag(1, 50)
+        self.assertNotIn(1, self.api.get_song_ids_by_tags(all_of=[50]))
+        self.assertIs(self.api.get_song_tag_index(), tag_index)
+
+        self.api.ajax_song_cache.invalidate()
+        self.server.state.error_endpoints = ['getAllSongs']
+        self.server.state.error_status = 404
+        self.server.state.fail_next = 1
+        self.assertEqual(self.api.get_song_ids_by_tags(all_of=[50]), set())
+
+    def test_song_tags_bulk_connection_error(self):
+        """
+        Checks that a connection error only fails the affected song tag change
+        :return:
+        """
+        send = self.api._send
+
+        def send_failing_for_song_2(method, url, **kwargs):
+            if method == 'POST' and kwargs.get('data', {}).get('id') == 2:
+                raise requests.ConnectionError('Injected connection error')
+            return send(method, url, **kwargs)
+
+        song_tags = self.server.state.data['song_tags']
+        song_tag_id = next(tag['id'] for tag in self.server.state.data['tags']['songs']
+                           if all(tag['id'] not in song_tags[song_id] for song_id in (1, 2, 3)))
+        self.api._send = send_failing_for_song_2
+        results = self.api.add_song_tags_bulk([(1, song_tag_id), (2, song_tag_id), (3, song_tag_id)])
+        self.assertEqual([result['result'] for result in results], ['changed', 'failed', 'changed'])
+        self.assertTrue(self.api.contains_song_tag(3, song_tag_id))
+
+    def test_masterdata_refresh(self):
+        """
+        Checks that dicts by id are replaced together with the masterdata they were created from
+        :return:
+        """
+        service = self.server.state.data['services'][0]
+        self.assertEqual(self.api.get_services(serviceId=service['id'])['name'], service['name'])
+        self.assertIn(service['id'], self.api.get_event_masterdata(type='services', returnAsDict=True))
+
+        # only the requested data is outdated e.g. created slightly before its dict
+        self.server.state.data['services'][0] = dict(service, name='Renamed')
+        self.api.masterdata_cache.invalidate('services')
+        self.api.masterdata_cache.invalidate('event_masterdata')
+        self.assertEqual(self.api.get_services(serviceId=service['id'])['name'], 'Renamed')
+        self.assertEqual(self.api.get_event_masterdata(type='services', returnAsDict=True)[service['id']]['name'],
+                         'Renamed')
+
+        self.assertIsNone(self.api.get_event_masterdata(type='unknownType', returnAsDict=True))
+
+    def test_set_event_services_counts_unknown(self):
+        """
+        Checks that unknown services are skipped and reported as failed while other changes are applied
+        :return:
+        """
+        eventId = next(iter(self.server.state.data['events']))
+        serviceId = self.server.state.data['services'][0]['id']
+
+        self.assertFalse(self.api.set_event_services_counts_bulk(eventId, {serviceId: 4, 999999: 1}))
+        self.assertEqual(self.api.get_event_services_counts_ajax(eventId=eventId, serviceId=serviceId),
+                         {serviceId: 4})
+        self.assertTrue(self.api.set_event_services_counts_bulk(eventId, {serviceId: 4}))
+
+    def test_metrics(self):
+        """
+        Checks that requests including retries and requests of worker threads are reported with the public method
+        :return:
+        """
+        metrics = MetricsAggregator()
+        metrics.attach(self.api)
+        events = []
+        self.api.add_hook('before_request', events.append)
+
+        self.api.get_songs_by_tag(50)
+        self.server.state.fail_next = 1
+        self.api.get_event_agenda(1)
+
+        summary = {(row['caller'], row['endpoint']): row for row in metrics.summary()}
+        songs_pages = -(-len(self.server.state.data['songs']) // 7)
+        self.assertEqual(summary[('get_songs_by_tag', '/api/songs')]['requests'], songs_pages)
+        self.assertEqual(summary[('get_songs_by_tag', '/?q=churchservice/ajax&func=getAllSongs')]['requests'], 1)
+        self.assertEqual(summary[('get_event_agenda', '/api/events/{id}/agenda')]['retries'], 1)
+        self.assertEqual(summary[('get_event_agenda', '/api/events/{id}/agenda')]['errors'], 1)
+        self.assertEqual(len(events), songs_pages + 3)
+        self.assertIn('get_songs_by_tag', metrics.summary_table())
+        self.assertIn('churchtools_requests_total{caller="get_event_agenda",method="GET",'
+                      'endpoint="/api/events/{id}/agenda",status="503"} 1', metrics.prometheus())
+
+        metrics.detach(self.api)
+        self.api.remove_hook('before_request', events.append)
+        self.assertFalse(self.api._observed())
+
+    def test_get_event_agendas(self):
+        """
+        Checks that agendas of multiple events are loaded in parallel and events without agenda are reported as None
+        :return:
+        """
+        event_ids = list(self.server.state.data['events'].keys())
+        agendas = self.api.get_event_agendas(event_ids)
+        self.assertEqual(list(agendas.keys()), event_ids)
+        for event_id, agenda in agendas.items():
+            if event_id in self.server.state.data['agendas']:
+                self.assertEqual(agenda['id'], self.server.state.data['agendas'][event_id]['id'])
+            else:
+                self.assertIsNone(agenda)
+
+    def test_agenda_docx_renderer(self):
+        """
+        Checks styles and text of rendered agendas and that combined and parallel rendering contain all agendas
+        :return:
+        """
+        agendas = list(self.server.state.data['agendas'].values())[:3]
+        agendas[0]['items'][2]['note'] = 'Tab\tand new line\n& <special> characters'
+        service_groups = {group['id']: group for group in self.server.state.data['service_groups']}
+        renderer = AgendaDocxRenderer()
+
+        document = self.api.get_event_agenda_docx(agendas[0], serviceGroups=service_groups)
+        expected = [('Normal' if level is None else 'Heading {}'.format(level), text)
+                    for level, text in agenda_paragraphs(agendas[0], service_groups)]
+        self.assertEqual([(paragraph.style.name, paragraph.text) for paragraph in document.paragraphs], expected)
+        self.assertIn('Tab\tand new line\n& <special> characters', [text for _, text in expected])
+
+        combined = docx.Document(io.BytesIO(renderer.render_many_bytes(agendas, serviceGroups=service_groups)))
+        texts = [text for agenda in agendas for _, text in agenda_paragraphs(agenda, service_groups) + [(None, '\n')]]
+        self.assertEqual([paragraph.text for paragraph in combined.paragraphs], texts[:-1])
+
+        self.assertEqual(renderer.render_parallel(agendas, serviceGroups=service_groups, processes=2),
+                         [renderer.render_bytes(agenda, serviceGroups=service_groups) for agenda in agendas])
+
+        template = docx.Document()
+        template.styles['Heading 4'].delete()
+        template_file = io.BytesIO()
+        template.save(template_file)
+        template_file.seek(0)
+        with self.assertRaisesRegex(ValueError, 'Heading 4'):
+            AgendaDocxRenderer(template_file)
+
+    def test_file_download_bulk(self):
+        """
+        Checks parallel downloads, skipping of existing files and resuming of partial downloads
+        :return:
+        """
+        files = self.server.state.data['files'][('song_arrangement', '1')]
+        targets = [('song_arrangement', 1, None), ('song_arrangement', 2, files[0]['name'])]
+        with tempfile.TemporaryDirectory() as directory:
+            results = self.api.file_download_bulk(targets, target_path=directory)
+            self.assertEqual(results, {('song_arrangement', 1, files[0]['name']): True,
+                                       ('song_arrangement', 1, files[1]['name']): True,
+                                       ('song_arrangement', 2, files[0]['name']): False})
+            path = os.sep.join([directory, 'song_arrangement', '1', files[0]['name']])
+            with open(path, 'rb') as file:
+                self.assertEqual(file.read(), self.server.state.data['file_contents'][files[0]['id']])
+
+            request_count = self.server.state.request_count
+            self.api.file_download_bulk(targets[:1], target_path=directory)
+            self.assertEqual(self.server.state.request_count - request_count, 1)
+
+            file_url = next(file['fileUrl'] for file in self.api.get_files('song_arrangement', 1)
+                            if file['id'] == files[0]['id'])
+            content = self.server.state.data['file_contents'][files[0]['id']]
+            os.remove(path)
+            with open('{}.{}.part'.format(path, hashlib.sha1(file_url.encode('utf-8')).hexdigest()[:12]), 'wb') as file:
+                file.write(content[:1000])
+            events = []
+            self.api.add_hook('after_response', events.append)
+            self.assertEqual(self.api.file_download_from_urls([(file_url, path, len(content))]), {path: True})
+            self.assertEqual([(event['status'], event['bytes']) for event in events], [(206, len(content) - 1000)])
+            with open(path, 'rb') as file:
+                self.assertEqual(file.read(), content)
+
+            # an unreachable url only fails its own file
+            os.remove(path)
+            unreachable_path = os.sep.join([directory, 'unreachable.bin'])
+            results = self.api.file_download_from_urls([('http://127.0.0.1:1/unreachable', unreachable_path, None),
+                                                        (file_url, path, len(content))])
+            self.assertEqual(results, {unreachable_path: False, path: True})
+
+    def test_file_download_chunked(self):
+        """
+        Checks that files sent with Transfer-Encoding chunked and without a known size are downloaded completely
+        :return:
+        """
+        self.server.state.chunked_downloads = True
+        file = self.server.state.data['files'][('song_arrangement', '1')][0]
+        content = os.urandom(300000)
+        self.server.state.data['file_contents'][file['id']] = content
+        file_url = next(item['fileUrl'] for item in self.api.get_files('song_arrangement', 1)
+                        if item['id'] == file['id'])
+        with self.api.session.get(file_url, stream=True) as response:
+            self.assertEqual(response.headers.get('Transfer-Encoding'), 'chunked')
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.sep.join([directory, file['name']])
+            self.assertEqual(self.api.file_download_from_urls([(file_url, path, None)]), {path: True})
+            with open(path, 'rb') as downloaded:
+                self.assertEqual(downloaded.read(), content)
+
+    @unittest.skipIf(aiohttp is None, 'optional dependency aiohttp not installed')
+    def test_async_api(self):
+        """
+        Checks that the async client logs in and requests independent items in parallel
+        :return:
+        """
+
+        async def run():
+            async with AsyncChurchToolsApi(self.server.url, ct_token=self.server.state.token) as api:
+                user = await api.who_am_i()
+                events = await api.get_events(from_='2000-01-01')
+                agendas = await asyncio.gather(*[api.get_event_agenda(event['id']) for event in events])
+                songs = await api.get_songs()
+                song = await api.get_song_ajax(1)
+                return user, events, agendas, songs, song
+
+        user, events, agendas, songs, song = asyncio.run(run())
+        self.assertIsInstance(user, dict)
+        self.assertEqual(len(events), len(self.server.state.data['events']))
+        self.assertEqual([agenda['id'] if agenda is not None else None for agenda in agendas],
+                         [self.server.state.data['agendas'][event['id']]['id']
+                          if event['id'] in self.server.state.data['agendas'] else None for event in events])
+        self.assertEqual(len(songs), len(self.server.state.data['songs']))
+        self.assertEqual(song['bezeichnung'], self.server.state.data['songs'][1]['name'])
+
+    def test_sync_song_files(self):
+        """
+        Checks that only new files are downloaded and that removed files are reported or deleted
+        :return:
+        """
+        files = self.server.state.data['files'][('song_arrangement', '1')]
+        file_count = sum(len(items) for key, items in self.server.state.data['files'].items()
+                         if key[0] == 'song_arrangement')
+        with tempfile.TemporaryDirectory() as directory:
+            result = self.api.sync_song_files(directory)
+            self.assertEqual(len(result['downloaded']), file_count)
+            with open(os.sep.join([directory, '1', files[0]['name']]), 'rb') as file:
+                self.assertEqual(file.read(), self.server.state.data['file_contents'][files[0]['id']])
+
+            self.server.state.data['files'][('song_arrangement', '1')] = files[1:]
+            result = self.api.sync_song_files(directory)
+            self.assertEqual((len(result['downloaded']), result['unchanged']), (0, file_count - 1))
+            self.assertEqual(result['orphaned'], [os.sep.join(['1', files[0]['name']])])
+
+            result = self.api.sync_song_files(directory, delete_orphans=True)
+            self.assertEqual(result['deleted'], [os.sep.join(['1', files[0]['name']])])
+            self.assertFalse(os.path.exists(os.sep.join([directory, '1', files[0]['name']])))
+
+    def test_sync_song_files_replaced(self):
+        """
+        Checks that a file replaced by an upload with the same name and size is downloaded again
+        and neither reported as orphaned nor deleted - the previous copy is kept until the download succeeds
+        :return:
+        """
+        name = self.server.state.data['files'][('song_arrangement', '1')][1]['name']
+        path = os.sep.join(['1', name])
+        with tempfile.TemporaryDirectory() as directory:
+            self.api.sync_song_files(directory)
+            with open(os.sep.join([directory, path]), 'rb') as file:
+                content = bytes(255 - byte for byte in file.read())
+            upload_path = os.sep.join([directory, 'upload.bin'])
+            with open(upload_path, 'wb') as file:
+                file.write(content)
+            self.assertTrue(self.api.file_upload(upload_path, 'song_arrangement', 1, custom_file_name=name,
+                                                 overwrite=True))
+
+            # a failed download keeps the previous copy
+            self.server.state.error_endpoints = ['filedownload']
+            self.server.state.error_status = 404
+            self.server.state.fail_next = 1
+            with open(os.sep.join([directory, path]), 'rb') as file:
+                previous_content = file.read()
+            result = self.api.sync_song_files(directory, delete_orphans=True)
+            self.assertEqual((result['failed'], result['deleted']), ([path], []))
+            with open(os.sep.join([directory, path]), 'rb') as file:
+                self.assertEqual(file.read(), previous_content)
+            self.server.state.error_endpoints = None
+
+            result = self.api.sync_song_files(directory, delete_orphans=True)
+            self.assertEqual((result['downloaded'], result['orphaned'], result['deleted']), ([path], [], []))
+            with open(os.sep.join([directory, path]), 'rb') as file:
+                self.assertEqual(file.read(), content)
+
+            result = self.api.sync_song_files(directory, delete_orphans=True)
+            self.assertEqual((result['downloaded'], result['deleted']), ([], []))
+            self.assertTrue(os.path.isfile(os.sep.join([directory, path])))
+
+    def test_file_upload_many(self):
+        """
+        Checks that multiple files are uploaded with streamed requests and replaced using overwrite
+        :return:
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for number in range(3):
+                paths.append(os.sep.join([directory, 'upload_{}.bin'.format(number)]))
+                with open(paths[-1], 'wb') as file:
+                    file.write(os.urandom(1000 + number))
+            uploads = [(path, 'song_arrangement', arrangement_id, None) for arrangement_id in (1, 2) for path in paths]
+            uploads.append((paths[0], 'song_arrangement', 1, 'invalid/name.bin'))
+
+            request_count = self.server.state.request_count
+            result = self.api.file_upload_many(uploads, files_per_request=2)
+            self.assertEqual(self.server.state.request_count - request_count, 4)
+            self.assertEqual(sum(result['results'].values()), 6)
+            self.assertFalse(result['results'][('song_arrangement', 1, 'invalid/name.bin')])
+            self.assertGreater(result['bytes'], 6003)
+            self.assertGreater(result['throughput'], 0)
+
+            self.assertTrue(self.api.file_upload(paths[1], 'song_arrangement', 1, custom_file_name='upload_0.bin',
+                                                 overwrite=True))
+            files = [file for file in self.api.get_files('song_arrangement', 1) if file['name'] == 'upload_0.bin']
+            self.assertEqual([file['size'] for file in files], [1001])
+
+            # a missing file only fails its own batch
+            missing = os.sep.join([directory, 'missing.bin'])
+            uploads = [(missing, 'song_arrangement', 3, None), (paths[0], 'song_arrangement', 3, None),
+                       (paths[1], 'song_arrangement', 3, None)]
+            result = self.api.file_upload_many(uploads, files_per_request=2)
+            self.assertEqual(result['results'], {('song_arrangement', 3, 'missing.bin'): False,
+                                                 ('song_arrangement', 3, 'upload_0.bin'): False,
+                                                 ('song_arrangement', 3, 'upload_1.bin'): True})
+
+
+class TestsWebService(unittest.TestCase):
+    """
+    Tests of the web service using the local mock server
+    The Flask 2.3 test client does not work with Werkzeug 3 (installed by docker/requirements.txt),
+    therefore the app is served by a werkzeug server in a background thread
+    """
+
+    def setUp(self):
+        # events of the web service start today
+        self.server = MockServer(fixtures=generate_fixtures(start_date=datetime.now(timezone.utc))).start()
+        self.clients = ChurchToolsWebService.clients
+        ChurchToolsWebService.app.ct_domain = self.server.url
+        self.app_server = make_server('127.0.0.1', 0, ChurchToolsWebService.app, threaded=True)
+        threading.Thread(target=self.app_server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:{}'.format(self.app_server.server_port)
+        self.session = requests.Session()
+
+    def tearDown(self):
+        self.session.close()
+        self.app_server.shutdown()
+        self.app_server.server_close()
+        ChurchToolsWebService.clients = self.clients
+        self.server.stop()
+
+    def login(self, registry):
+        """
+        Logs in to the web service using a new client registry
+        :param registry: registry used by the web service
+        :type registry: ClientRegistry
+        :return:
+        """
+        ChurchToolsWebService.clients = registry
+        response = self.session.post(self.url + '/login', allow_redirects=False,
+                                     data={'ct_user': self.server.state.username,
+                                           'ct_password': self.server.state.password, 'ct_domain': self.server.url})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(registry), 1)
+
+    def test_client_registry(self):
+        """
+        Checks that clients are identified by random tokens and removed after the idle timeout
+        :return:
+        """
+        registry = ClientRegistry(idle_timeout=0.5)
+        api = ChurchToolsApi(domain=self.server.url, ct_token=self.server.state.token)
+        user = api.who_am_i()
+        token = registry.add(api, user)
+        self.assertNotEqual(token, registry.add(api, user))
+        self.assertIs(registry.get(token)['api'], api)
+        self.assertEqual(registry.identity(token, registry.get(token)), user)
+        self.assertIsNone(registry.get('unknown'))
+        time.sleep(0.6)
+        self.assertIsNone(registry.get(token))
+        self.assertEqual(registry.remove_expired(), 1)
+        self.assertEqual(len(registry), 0)
+
+        self.login(ClientRegistry(idle_timeout=0.5))
+        self.assertEqual(self.session.get(self.url + '/main', allow_redirects=False).status_code, 200)
+        time.sleep(0.6)
+        response = self.session.get(self.url + '/main', allow_redirects=False)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.headers['Location'].endswith('/login'))
+        self.assertEqual(len(ChurchToolsWebService.clients), 0)
+
+    def test_client_registry_revalidation(self):
+        """
+        Checks that a client is removed by the background revalidation once its login is no longer valid
+        :return:
+        """
+        registry = ClientRegistry(identity_validity=0.5)
+        self.login(registry)
+        request_count = self.server.state.request_count
+        self.assertEqual(self.session.get(self.url + '/main', allow_redirects=False).status_code, 200)
+        self.assertEqual(self.server.state.request_count, request_count, 'confirmed login should be used')
+
+        # logout in ChurchTools - the cached login is still used until the revalidation is done
+        self.server.state.sessions.clear()
+        time.sleep(0.6)
+        self.assertEqual(self.session.get(self.url + '/main', allow_redirects=False).status_code, 200)
+        for _ in range(50):
+            if len(registry) == 0:
+                break
+            time.sleep(0.1)
+        self.assertEqual(len(registry), 0)
+        self.assertGreater(self.server.state.request_count, request_count)
+        self.assertEqual(self.session.get(self.url + '/main', allow_redirects=False).status_code, 302)
+
+    def test_agenda_docx_download(self):
+        """
+        Checks that docx downloads are cached per agenda version and outdated documents are removed
+        :return:
+        """
+        registry = ClientRegistry()
+        self.login(registry)
+        response = self.session.get(self.url + '/events')
+        event_id = int(re.search(r'name="event_id" value="(\d+)"', response.text).group(1))
+
+        downloads = [self.session.post(self.url + '/events', data={'event_id': event_id, 'submit_docx': 'Download'})
+                     for _ in range(2)]
+        self.assertEqual(downloads[0].headers['Content-Type'], ChurchToolsWebService.DOCX_MIMETYPE)
+        self.assertEqual(downloads[0].content, downloads[1].content)
+        docx_cache = next(iter(registry._clients.values()))['data']['docx_cache']
+        self.assertEqual(docx_cache.statistics()['hits'], 1)
+
+        # documents with other service groups are kept for the same agenda
+        service_group_id = self.server.state.data['service_groups'][0]['id']
+        self.session.post(self.url + '/events', data={'event_id': event_id, 'submit_docx': 'Download',
+                                                      'service_group {}'.format(service_group_id): 'on'})
+        agenda = self.server.state.data['agendas'][event_id]
+        self.assertEqual(len(docx_cache.get(agenda['id'])['content']), 2)
+        self.assertEqual(docx_cache.statistics()['entries'], 1)
+
+        # a changed agenda is downloaded as new document which replaces the outdated one
+        agenda['items'][-1]['title'] = 'Changed item'
+        agenda['meta']['modifiedDate'] = '2030-01-01T00:00:00Z'
+        response = self.session.post(self.url + '/events', data={'event_id': event_id, 'submit_docx': 'Download'})
+        paragraphs = [paragraph.text for paragraph in docx.Document(io.BytesIO(response.content)).paragraphs]
+        self.assertTrue(any('Changed item' in paragraph for paragraph in paragraphs))
+        documents = docx_cache.get(agenda['id'])
+        self.assertEqual((documents['modified'], len(documents['content'])), ('2030-01-01T00:00:00Z', 1))
+        self.assertEqual(docx_cache.statistics()['entries'], 1)
+
+
+class TestsBenchmark(unittest.TestCase):
+    """
+    Tests of the benchmark suite using the local mock server
+    """
+
+    def test_run_benchmarks(self):
+        """
+        Runs two small benchmarks and checks the reported values
+        :return:
+        """
+        self.assertEqual(percentile([3, 1, 2, 4], 50), 2)
+        self.assertEqual(percentile([3, 1, 2, 4], 95), 4)
+
+        results = run_benchmarks(names=['get_persons', 'agenda_docx'], iterations=2,
+                                 fixture_kwargs={'persons': 30, 'songs': 10, 'events': 4},
+                                 server_kwargs={'page_size': 10})
+        self.assertEqual(results['results']['get_persons']['requests'], 6)
+        self.assertGreater(results['results']['get_persons']['requests_per_second'], 0)
+        self.assertLessEqual(results['results']['agenda_docx']['latency_p50'],
+                             results['results']['agenda_docx']['latency_p95'])
 
 
 class TestsChurchToolsApi(unittest.TestCase):
@@ -69,6 +699,34 @@ class TestsChurchToolsApi(unittest.TestCase):
         result = self.api.login_ct_rest_api(ct_user=username, ct_password=password)
         self.assertTrue(result)
 
+    def test_pool_statistics(self):
+        """
+        Checks that connections of the session are reused with custom pool settings
+        :return:
+        """
+        ct_api = ChurchToolsApi(self.ct_domain, ct_token=self.ct_token, pool_maxsize=4, pool_block=True, timeout=30)
+        ct_api.get_persons()
+        ct_api.get_songs()
+        statistics = ct_api.get_pool_statistics()
+        self.assertEqual(len(statistics), 1)
+        host_statistics = list(statistics.values())[0]
+        self.assertLessEqual(host_statistics['connections_created'], 4)
+        self.assertGreater(host_statistics['connections_reused'], 0)
+        ct_api.session.close()
+
+    def test_response_cache(self):
+        """
+        Checks that GET responses are served from a persistent cache within their ttl
+        :return:
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            cache = SQLiteResponseCache(os.sep.join([directory, 'cache.sqlite']), endpoint_ttls={'/api/tags': 60})
+            ct_api = ChurchToolsApi(self.ct_domain, ct_token=self.ct_token, response_cache=cache)
+            tags = ct_api.get_tags()
+            self.assertEqual(ct_api.get_tags(), tags)
+            self.assertEqual(cache.statistics()['hits'], 1)
+            ct_api.session.close()
+
     def test_get_ct_csrf_token(self):
         """
         Test checks that a CSRF token can be requested using the current API status
@@ -110,6 +768,54 @@ class TestsChurchToolsApi(unittest.TestCase):
         result4 = self.api.get_persons(returnAsDict=False)
         self.assertIsInstance(result4, list)
 
+    def test_iter_persons(self):
+        """
+        Checks that the generator variant yields the same persons as get_persons
+        :return:
+        """
+        persons = self.api.get_persons()
+        iterated_persons = list(self.api.iter_persons())
+        self.assertEqual([person['id'] for person in persons], [person['id'] for person in iterated_persons])
+
+        result = list(self.api.iter_persons(ids=[1]))
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0]['id'], 1)
+
+    def test_sync_persons(self):
+        """
+        Checks that the first sync reports all persons as added and an immediate second sync reports no changes
+        :return:
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot_path = os.sep.join([directory, 'persons.json'])
+            persons = self.api.get_persons()
+
+            changeset = self.api.sync_persons(snapshot_path)
+            self.assertEqual(len(changeset['added']), len(persons))
+            self.assertTrue(os.path.isfile(snapshot_path))
+
+            changeset = self.api.sync_persons(snapshot_path)
+            self.assertEqual(changeset['added'], [])
+            self.assertEqual(changeset['changed'], [])
+            self.assertEqual(changeset['deleted'], [])
+            self.assertEqual(changeset['unchanged'], len(persons))
+
+    def test_log_payloads(self):
+        """
+        Checks that response data is only logged if log_payloads is enabled and truncated to max length
+        :return:
+        """
+        with self.assertLogs(level='DEBUG') as cm:
+            self.api.get_tags()
+        self.assertIn('enable log_payloads for content', '\n'.join(cm.output))
+
+        self.api.log_payloads = True
+        self.api.log_payload_max_length = 10
+        with self.assertLogs(level='DEBUG') as cm:
+            self.api.get_tags()
+        self.assertIn('characters truncated', '\n'.join(cm.output))
+        self.api.log_payloads = False
+
     def test_get_songs(self):
         """
         1. Test requests all songs and checks that result has more than 10 elements (hence default pagination works)
@@ -121,11 +827,30 @@ class TestsChurchToolsApi(unittest.TestCase):
 
         songs = self.api.get_songs()
         self.assertGreater(len(songs), 10)
+        song_ids = [song['id'] for song in songs]
+        self.assertEqual(len(song_ids), len(set(song_ids)), 'parallel pagination should not duplicate pages')
 
         song = self.api.get_songs(song_id=test_song_id)[0]
         self.assertEqual(song['id'], 408)
         self.assertEqual(song['name'], 'Test')
 
+    def test_iter_songs(self):
+        """
+        Checks that the generator variant yields one dict per song including all pages
+        IMPORTANT - This test method and the parameters used depend on the target system!
+        :return:
+        """
+        test_song_id = 408
+
+        songs = self.api.iter_songs()
+        first_song = next(songs)
+        self.assertIsInstance(first_song, dict)
+        self.assertGreater(len(list(songs)) + 1, 10)
+
+        song = list(self.api.iter_songs(song_id=test_song_id))
+        self.assertEqual(len(song), 1)
+        self.assertEqual(song[0]['name'], 'Test')
+
     def test_get_song_ajax(self):
         """
         Testing legacy AJAX API to request one specific song
@@ -285,24 +1010,69 @@ class TestsChurchToolsApi(unittest.TestCase):
         Test method used to add and remove the test tag to some song
         Tag ID and Song ID may vary depending on the server used
         On ELKW1610.KRZ.TOOLS song_id 408 and tag_id 53
-        self.api.ajax_song_last_update = None is required in order to clear the ajax song cache
+        self.api.ajax_song_cache.invalidate() is used in order to clear the ajax song cache
         :return:
         """
-        self.api.ajax_song_last_update = None
+        self.api.ajax_song_cache.invalidate()
         self.assertTrue(self.api.contains_song_tag(408, 53))
         with self.assertNoLogs(level='INFO') as cm:
             response = self.api.remove_song_tag(408, 53)
         self.assertEqual(response.status_code, 200)
 
-        self.api.ajax_song_last_update = None
+        self.api.ajax_song_cache.invalidate()
         self.assertFalse(self.api.contains_song_tag(408, 53))
 
-        self.api.ajax_song_last_update = None
+        self.api.ajax_song_cache.invalidate()
         with self.assertNoLogs(level='INFO') as cm:
             response = self.api.add_song_tag(408, 53)
         self.assertEqual(response.status_code, 200)
 
-        self.api.ajax_song_last_update = None
+        self.api.ajax_song_cache.invalidate()
+        self.assertTrue(self.api.contains_song_tag(408, 53))
+
+    def test_ajax_song_cache(self):
+        """
+        Checks that the AJAX song list is cached, can be forced to update and is patched by tag changes
+        On ELKW1610.KRZ.TOOLS song_id 408 and tag_id 53
+        :return:
+        """
+        self.api.ajax_song_cache.invalidate()
+        self.api.ajax_song_cache.ttl = 300
+        misses = self.api.ajax_song_cache.misses
+        self.api.get_song_ajax(408)
+        self.api.get_song_ajax(408)
+        self.assertEqual(self.api.ajax_song_cache.misses, misses + 1)
+        self.assertGreaterEqual(self.api.ajax_song_cache.hits, 1)
+
+        self.api.get_song_ajax(408, require_update_after_seconds=0)
+        self.assertEqual(self.api.ajax_song_cache.misses, misses + 2)
+
+        self.api.remove_song_tag(408, 53)
+        self.assertFalse(self.api.contains_song_tag(408, 53))
+        self.api.add_song_tag(408, 53)
+        self.assertTrue(self.api.contains_song_tag(408, 53))
+        self.assertEqual(self.api.ajax_song_cache.misses, misses + 2, 'tag changes should not require a reload')
+
+    def test_add_remove_song_tags_bulk(self):
+        """
+        Test method used to remove and add the test tag to some song using the bulk methods
+        On ELKW1610.KRZ.TOOLS song_id 408 has tag_id 53
+        :return:
+        """
+        self.api.ajax_song_cache.invalidate()
+        self.assertTrue(self.api.contains_song_tag(408, 53))
+
+        results = self.api.add_song_tags_bulk([(408, 53)])
+        self.assertEqual(results, [{'song_id': 408, 'song_tag_id': 53, 'result': 'skipped'}])
+
+        results = self.api.remove_song_tags_bulk([(408, 53), (408, 53)])
+        self.assertEqual([result['result'] for result in results], ['changed', 'skipped'])
+        self.api.ajax_song_cache.invalidate()
+        self.assertFalse(self.api.contains_song_tag(408, 53))
+
+        results = self.api.add_song_tags_bulk([(408, 53)])
+        self.assertEqual(results[0]['result'], 'changed')
+        self.api.ajax_song_cache.invalidate()
         self.assertTrue(self.api.contains_song_tag(408, 53))
 
     def test_get_songs_with_tag(self):
@@ -315,10 +1085,32 @@ class TestsChurchToolsApi(unittest.TestCase):
         tagId = 53
         songId = 408
 
-        self.api.ajax_song_last_update = None
+        self.api.ajax_song_cache.invalidate()
         result = self.api.get_songs_by_tag(tagId)
         self.assertEqual(songId, result[0]['id'])
 
+    def test_get_songs_by_tags(self):
+        """
+        Test method to check combined tag filters based on the inverted song tag index
+        songId and tag_id will vary depending on the server used
+        On ELKW1610.KRZ.TOOLS song ID 408 is the first song with tag 53 "Test"
+        :return:
+        """
+        tagId = 53
+        songId = 408
+
+        self.api.ajax_song_cache.invalidate()
+        tag_index = self.api.get_song_tag_index()
+        self.assertIn(songId, tag_index[tagId])
+
+        self.assertIn(songId, self.api.get_song_ids_by_tags(any_of=[tagId, -1]))
+        self.assertIn(songId, self.api.get_song_ids_by_tags(all_of=[tagId]))
+        self.assertNotIn(songId, self.api.get_song_ids_by_tags(all_of=[tagId, -1]))
+        self.assertNotIn(songId, self.api.get_song_ids_by_tags(none_of=[tagId]))
+
+        result = self.api.get_songs_by_tags(all_of=[tagId])
+        self.assertIn(songId, [song['id'] for song in result])
+
     def test_get_events(self):
         """
         Tries to get a list of events and a single event from CT
@@ -425,6 +1217,26 @@ class TestsChurchToolsApi(unittest.TestCase):
         result = self.api.set_event_services_counts_ajax(eventId, serviceId, original_count[serviceId])
         self.assertTrue(result)
 
+    def test_set_event_services_counts_bulk(self):
+        """
+        Test function for changing multiple event services counts at once
+        On ELKW1610.KRZ.TOOLS event ID 2626 is an existing test Event with schedule (1. Jan 2023)
+        On ELKW1610.KRZ.TOOLS serviceID 1 is Predigt (1. Jan 2023) and planned 3 times
+        :return:
+        """
+        eventId = 2626
+        serviceId = 1
+
+        original_count = self.api.get_event_services_counts_ajax(eventId=eventId, serviceId=serviceId)
+
+        result = self.api.set_event_services_counts_bulk(eventId, {serviceId: 2})
+        self.assertTrue(result)
+        new_count = self.api.get_event_services_counts_ajax(eventId=eventId, serviceId=serviceId)
+        self.assertEqual(new_count, {serviceId: 2})
+
+        result = self.api.set_events_services_counts_bulk({eventId: original_count})
+        self.assertEqual(result, {eventId: True})
+
     def test_get_set_event_admins(self):
         """
         Test function to get list of event admins, change it and check again (and reset to original)
@@ -464,6 +1276,25 @@ class TestsChurchToolsApi(unittest.TestCase):
         result = self.api.get_event_masterdata(type='serviceGroups', returnAsDict=False)
         self.assertIsInstance(result, list)
 
+    def test_masterdata_cache(self):
+        """
+        Checks that masterdata and services are only requested once until refreshed
+        :return:
+        """
+        self.assertTrue(self.api.refresh_masterdata())
+        misses = self.api.masterdata_cache.misses
+
+        self.api.get_event_masterdata(type='serviceGroups', returnAsDict=True)
+        self.api.get_event_masterdata(type='serviceGroups', returnAsDict=True)
+        self.api.get_song_category_map()
+        self.api.get_services(returnAsDict=True)
+        self.api.get_services()
+        # only the derived dicts are created once - no additional requests
+        self.assertEqual(self.api.masterdata_cache.misses, misses + 3)
+
+        self.api.refresh_masterdata()
+        self.assertEqual(self.api.masterdata_cache.statistics()['entries'], 2)
+
     def test_get_event_agenda(self):
         """
         Tries to get an event agenda from a CT Event
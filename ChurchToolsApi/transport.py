@@ -0,0 +1,218 @@
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+class RetryPolicy:
+    def __init__(self, max_retries=3, backoff_factor=0.5, max_backoff=30,
+                 retry_status_codes=(429, 502, 503, 504),
+                 retry_methods=('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'),
+                 endpoint_max_retries=None):
+        """
+        Definition when and how often a failed request to ChurchTools is repeated
+        Requests with methods not listed in retry_methods (e.g. POST) are only repeated for 429 Too Many Requests
+        because the server did not process them
+        :param max_retries: number of retries after the first attempt
+        :type max_retries: int
+        :param backoff_factor: seconds used for exponential backoff - delay is random up to backoff_factor * 2^attempt
+        :type backoff_factor: float
+        :param max_backoff: max number of seconds to wait between two attempts unless the server requests more
+        :type max_backoff: float
+        :param retry_status_codes: HTTP status codes which are considered transient
+        :type retry_status_codes: tuple[int]
+        :param retry_methods: HTTP methods which can be repeated safely
+        :type retry_methods: tuple[str]
+        :param endpoint_max_retries: optional dict of url part: max_retries overwriting max_retries for matching urls
+            e.g. {'/api/persons': 5, 'churchservice/ajax': 0} - first match is used
+        :type endpoint_max_retries: dict[str, int]
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_status_codes = retry_status_codes
+        self.retry_methods = retry_methods
+        self.endpoint_max_retries = endpoint_max_retries if endpoint_max_retries is not None else {}
+
+    def max_retries_for(self, url):
+        """
+        Number of retries configured for a specific url
+        :param url: url of the request
+        :type url: str
+        :return: max number of retries
+        :rtype: int
+        """
+        for endpoint, max_retries in self.endpoint_max_retries.items():
+            if endpoint in url:
+                return max_retries
+        return self.max_retries
+
+    def is_retryable(self, method, url, attempt, status_code=None):
+        """
+        Checks if a request should be repeated
+        :param method: HTTP method of the request
+        :type method: str
+        :param url: url of the request
+        :type url: str
+        :param attempt: number of retries already done
+        :type attempt: int
+        :param status_code: status code of the response - None if no response was received
+        :type status_code: int | None
+        :return: if another attempt should be made
+        :rtype: bool
+        """
+        if attempt >= self.max_retries_for(url):
+            return False
+        if status_code is None:
+            return method.upper() in self.retry_methods
+        if status_code not in self.retry_status_codes:
+            return False
+        return method.upper() in self.retry_methods or status_code == 429
+
+    def backoff(self, attempt, retry_after=None):
+        """
+        Number of seconds to wait before the next attempt
+        exponential backoff with full jitter unless the server requested a specific delay using Retry-After
+        :param attempt: number of retries already done
+        :type attempt: int
+        :param retry_after: delay requested by the server in seconds
+        :type retry_after: float | None
+        :return: seconds to wait
+        :rtype: float
+        """
+        if retry_after is not None:
+            return max(retry_after, 0)
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+
+    @staticmethod
+    def parse_retry_after(value):
+        """
+        Interprets the value of a Retry-After header which is either a number of seconds or an HTTP date
+        :param value: header value
+        :type value: str | None
+        :return: seconds to wait or None if not available
+        :rtype: float | None
+        """
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            retry_date = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_date.tzinfo is None:
+            retry_date = retry_date.replace(tzinfo=timezone.utc)
+        return (retry_date - datetime.now(timezone.utc)).total_seconds()
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        """
+        Client side rate limiter which allows bursts up to capacity and rate requests per second on average
+        Shared by all threads using the same ChurchToolsApi object
+        :param rate: number of requests per second
+        :type rate: float
+        :param capacity: max number of requests which can be sent at once - defaults to rate
+        :type capacity: float
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.tokens = self.capacity
+        self.last_update = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Takes one token - waits until a token is available
+        :return: seconds waited
+        :rtype: float
+        """
+        waited = 0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_update) * self.rate)
+                self.last_update = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class MultipartStream:
+    def __init__(self, files, field='files[]'):
+        """
+        multipart/form-data request body of multiple files which are read only while the request is sent
+        Can be used as data of a request - requests uses read and __len__ for a streamed body with Content-Length
+        The content of the files must not change until the request is sent
+        :param files: list of (filename sent to the server, local filepath)
+        :type files: list[tuple[str, str]]
+        :param field: name of the form field of all files
+        :type field: str
+        """
+        self.boundary = uuid.uuid4().hex
+        self.content_type = 'multipart/form-data; boundary={}'.format(self.boundary)
+        self.bytes_read = 0
+
+        # parts are either bytes or filepaths which are opened when they are reached
+        self._parts = []
+        for filename, filepath in files:
+            name = filename.replace('"', '%22').replace('\r', '%0D').replace('\n', '%0A')
+            self._parts.append('--{}\r\nContent-Disposition: form-data; name="{}"; filename="{}"\r\n'
+                               'Content-Type: application/octet-stream\r\n\r\n'
+                               .format(self.boundary, field, name).encode('utf-8'))
+            self._parts.append(filepath)
+            self._parts.append(b'\r\n')
+        self._parts.append('--{}--\r\n'.format(self.boundary).encode('utf-8'))
+        self._length = sum(len(part) if isinstance(part, bytes) else os.path.getsize(part) for part in self._parts)
+        self._index = 0
+        self._position = 0
+        self._file = None
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        """
+        :param size: max number of bytes - all remaining if negative
+        :type size: int
+        :return: next bytes of the body - empty if everything was read
+        :rtype: bytes
+        """
+        chunks = []
+        remaining = size if size is not None and size >= 0 else self._length
+        while remaining > 0 and self._index < len(self._parts):
+            part = self._parts[self._index]
+            if isinstance(part, bytes):
+                chunk = part[self._position:self._position + remaining]
+                self._position += len(chunk)
+                finished = self._position >= len(part)
+            else:
+                if self._file is None:
+                    self._file = open(part, 'rb')
+                chunk = self._file.read(remaining)
+                finished = len(chunk) < remaining
+                if finished:
+                    self._file.close()
+                    self._file = None
+            if finished:
+                self._index += 1
+                self._position = 0
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        data = b''.join(chunks)
+        self.bytes_read += len(data)
+        return data
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
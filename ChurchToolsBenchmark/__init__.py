@@ -0,0 +1,237 @@
+import io
+import logging
+import math
+import multiprocessing
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime, timezone
+from importlib.metadata import PackageNotFoundError, version
+
+from ChurchToolsApi import ChurchToolsApi, agenda_docx
+from ChurchToolsMockServer import MockServer
+from ChurchToolsMockServer.fixtures import generate_fixtures
+
+try:
+    import resource
+except ImportError:  # not available on windows
+    resource = None
+
+
+def percentile(values, percent):
+    """
+    Nearest rank percentile
+    :param values: measured values
+    :type values: list[float]
+    :param percent: e.g. 95
+    :type percent: float
+    :return: value below which percent of all values are
+    :rtype: float | None
+    """
+    if len(values) == 0:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def peak_rss_kb():
+    """
+    :return: max resident set size of this process in KB so far or None if not available
+    :rtype: int | None
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if platform.system() == 'Darwin' else peak
+
+
+class BenchmarkContext:
+    def __init__(self, api, directory):
+        """
+        Data shared by all benchmarks of one run - prepared once so benchmarks only measure the client
+        :param api: logged in api connected to the mock server
+        :type api: ChurchToolsApi
+        :param directory: temporary directory for uploads and downloads
+        :type directory: str
+        """
+        self.api = api
+        self.directory = directory
+        self.events = api.get_events(from_='2000-01-01')
+        self.agendas = [agenda for agenda in api.get_event_agendas([event['id'] for event in self.events]).values()
+                        if agenda is not None]
+        self.agenda = self.agendas[0]
+        self.service_groups = api.get_event_masterdata(type='serviceGroups', returnAsDict=True)
+        self.song_tag_id = api.get_tags(type='songs')[0]['id']
+        self.upload_path = os.sep.join([directory, 'benchmark_upload.bin'])
+        with open(self.upload_path, 'wb') as file:
+            file.write(os.urandom(256 * 1024))
+        self.services_count = 0
+
+
+def benchmark_get_persons(context):
+    context.api.get_persons()
+
+
+def benchmark_get_songs(context):
+    context.api.get_songs()
+
+
+def benchmark_get_songs_by_tag(context):
+    context.api.ajax_song_cache.invalidate()
+    context.api.get_songs_by_tag(context.song_tag_id)
+
+
+def benchmark_event_agendas(context):
+    for event in context.events:
+        context.api.get_event_agenda(event['id'])
+
+
+def benchmark_file_upload(context):
+    context.api.file_upload(context.upload_path, 'song_arrangement', 1, overwrite=True)
+
+
+def benchmark_file_download(context):
+    context.api.file_download('song_1_0.sng', 'song_arrangement', 1, target_path=context.directory)
+
+
+def benchmark_set_event_services_counts_ajax(context):
+    context.services_count = 1 - context.services_count
+    context.api.set_event_services_counts_ajax(context.events[0]['id'], 1, context.services_count)
+
+
+def benchmark_agenda_docx(context):
+    document = context.api.get_event_agenda_docx(context.agenda, serviceGroups=context.service_groups)
+    document.save(io.BytesIO())
+
+
+def benchmark_agenda_docx_many(context):
+    agenda_docx.default_renderer().render_many_bytes(context.agendas, serviceGroups=context.service_groups)
+
+
+BENCHMARKS = {
+    'get_persons': benchmark_get_persons,
+    'get_songs': benchmark_get_songs,
+    'get_songs_by_tag': benchmark_get_songs_by_tag,
+    'event_agendas': benchmark_event_agendas,
+    'file_upload': benchmark_file_upload,
+    'file_download': benchmark_file_download,
+    'set_event_services_counts_ajax': benchmark_set_event_services_counts_ajax,
+    'agenda_docx': benchmark_agenda_docx,
+    'agenda_docx_many': benchmark_agenda_docx_many,
+}
+
+
+def measure(benchmark, context, iterations=5, warmup=1):
+    """
+    Runs one benchmark repeatedly and summarizes the measurements
+    :param benchmark: function which is called with the context
+    :type benchmark: collections.abc.Callable
+    :param context: shared data of the run
+    :type context: BenchmarkContext
+    :param iterations: number of measured calls
+    :type iterations: int
+    :param warmup: number of calls before measuring e.g. to fill connection pools
+    :type warmup: int
+    :return: dict with iterations, requests, requests_per_second, latency_p50 and latency_p95 (seconds per call),
+        cpu_time (seconds of this process for all calls) and peak_rss_kb (max of the process so far)
+    :rtype: dict
+    """
+    request_count = [0]
+
+    def count_request(response, *args, **kwargs):
+        request_count[0] += 1
+
+    for _ in range(warmup):
+        benchmark(context)
+
+    context.api.session.hooks['response'].append(count_request)
+    durations = []
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    try:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            benchmark(context)
+            durations.append(time.perf_counter() - start)
+    finally:
+        context.api.session.hooks['response'].remove(count_request)
+    wall_time = time.perf_counter() - wall_start
+
+    return {
+        'iterations': iterations,
+        'requests': request_count[0],
+        'requests_per_second': request_count[0] / wall_time if wall_time > 0 else None,
+        'latency_p50': percentile(durations, 50),
+        'latency_p95': percentile(durations, 95),
+        'cpu_time': time.process_time() - cpu_start,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+
+def _serve(connection, fixture_kwargs, server_kwargs):
+    """
+    Target of the mock server process - sends the url of the server once it is listening
+    """
+    server = MockServer(fixtures=generate_fixtures(**fixture_kwargs), **server_kwargs)
+    connection.send(server.url)
+    server.serve_forever()
+
+
+def run_benchmarks(names=None, iterations=5, warmup=1, fixture_kwargs=None, server_kwargs=None, api_kwargs=None):
+    """
+    Starts the mock server in a separate process so CPU time and memory are measured for the client only
+    and runs the selected benchmarks one after another
+    :param names: names of BENCHMARKS to run - all if None
+    :type names: list[str]
+    :param iterations: number of measured calls per benchmark
+    :type iterations: int
+    :param warmup: number of calls per benchmark before measuring
+    :type warmup: int
+    :param fixture_kwargs: params of generate_fixtures e.g. {'persons': 1000}
+    :type fixture_kwargs: dict
+    :param server_kwargs: params of MockChurchTools e.g. {'page_size': 50, 'latency': 0.01}
+    :type server_kwargs: dict
+    :param api_kwargs: params of ChurchToolsApi e.g. {'max_workers': 8}
+    :type api_kwargs: dict
+    :return: json serializable dict with environment, settings and results by benchmark name
+    :rtype: dict
+    """
+    names = names if names is not None else list(BENCHMARKS.keys())
+    fixture_kwargs = fixture_kwargs if fixture_kwargs is not None else {}
+    server_kwargs = server_kwargs if server_kwargs is not None else {}
+    api_kwargs = api_kwargs if api_kwargs is not None else {}
+
+    parent_connection, child_connection = multiprocessing.Pipe()
+    server_process = multiprocessing.Process(target=_serve, args=(child_connection, fixture_kwargs, server_kwargs),
+                                             daemon=True)
+    server_process.start()
+    results = {}
+    try:
+        url = parent_connection.recv()
+        api = ChurchToolsApi(url, ct_token=server_kwargs.get('token', 'mock-token'), **api_kwargs)
+        with tempfile.TemporaryDirectory() as directory:
+            context = BenchmarkContext(api, directory)
+            for name in names:
+                logging.info('Running benchmark %s', name)
+                results[name] = measure(BENCHMARKS[name], context, iterations=iterations, warmup=warmup)
+        api.session.close()
+    finally:
+        server_process.terminate()
+        server_process.join()
+
+    try:
+        package_version = version('ChurchToolsApi')
+    except PackageNotFoundError:
+        package_version = None
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'version': package_version,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {'iterations': iterations, 'warmup': warmup, 'fixtures': fixture_kwargs,
+                     'server': server_kwargs, 'api': api_kwargs},
+        'results': results,
+    }
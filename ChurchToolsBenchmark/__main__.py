@@ -0,0 +1,34 @@
+import argparse
+import json
+import logging
+import sys
+
+from ChurchToolsBenchmark import BENCHMARKS, run_benchmarks
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks of ChurchToolsApi against the local mock server')
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS.keys()), default=None,
+                        help='benchmarks to run - all by default')
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--persons', type=int, default=500)
+    parser.add_argument('--songs', type=int, default=500)
+    parser.add_argument('--events', type=int, default=30)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0, help='seconds added to each request by the server')
+    parser.add_argument('--max-workers', type=int, default=4)
+    parser.add_argument('--output', default=None, help='json file for the results - printed if not specified')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    results = run_benchmarks(names=args.benchmarks, iterations=args.iterations, warmup=args.warmup,
+                             fixture_kwargs={'persons': args.persons, 'songs': args.songs, 'events': args.events},
+                             server_kwargs={'page_size': args.page_size, 'latency': args.latency},
+                             api_kwargs={'max_workers': args.max_workers})
+
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
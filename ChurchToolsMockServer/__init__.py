@@ -0,0 +1,188 @@
+import logging
+import random
+import secrets
+import threading
+
+from flask import Flask
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from ChurchToolsMockServer.fixtures import generate_fixtures
+from ChurchToolsMockServer.routes import mock_api
+
+
+class MockChurchTools:
+    def __init__(self, fixtures=None, page_size=10, latency=0, latency_jitter=0, error_rate=0, error_status=503,
+                 error_endpoints=None, retry_after=None, etags=False, chunked_downloads=False, token='mock-token',
+                 username='admin', password='admin', seed=0):
+        """
+        State and behaviour of a local stand-in for a ChurchTools instance
+        All settings can be changed while the server is running e.g. to inject errors in one step of a test
+        :param fixtures: data as created by generate_fixtures - default fixtures are generated if None
+        :type fixtures: dict
+        :param page_size: max number of items per page of paginated endpoints - smaller limit params are respected
+        :type page_size: int
+        :param latency: seconds each request is delayed before it is processed
+        :type latency: float
+        :param latency_jitter: max additional random delay in seconds
+        :type latency_jitter: float
+        :param error_rate: probability between 0 and 1 that a request is answered with error_status
+        :type error_rate: float
+        :param error_status: HTTP status code of injected errors e.g. 429 or 503
+        :type error_status: int
+        :param error_endpoints: url parts of requests which can fail - all requests if None
+        :type error_endpoints: list[str]
+        :param retry_after: value of the Retry-After header sent with injected errors
+        :type retry_after: int
+        :param etags: if GET responses include an ETag and answer If-None-Match with 304 Not Modified
+        :type etags: bool
+        :param chunked_downloads: if file downloads are sent with Transfer-Encoding chunked instead of
+            Content-Length and without support for Range requests
+        :type chunked_downloads: bool
+        :param token: login token accepted as 'Authorization: Login <token>'
+        :type token: str
+        :param username: username accepted by /api/login
+        :type username: str
+        :param password: password accepted by /api/login
+        :type password: str
+        :param seed: seed used for latency jitter and error injection
+        :type seed: int
+        """
+        self.data = fixtures if fixtures is not None else generate_fixtures(seed=seed)
+        self.page_size = page_size
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.error_endpoints = error_endpoints
+        self.retry_after = retry_after
+        self.etags = etags
+        self.chunked_downloads = chunked_downloads
+        self.token = token
+        self.username = username
+        self.password = password
+        self.fail_next = 0
+        self.request_count = 0
+        self.error_count = 0
+        self.sessions = set()
+        self.csrf_token = secrets.token_hex(16)
+        self.lock = threading.RLock()
+        self._random = random.Random(seed)
+
+    def random(self):
+        """
+        :return: next value of the seeded random generator used for latency and errors
+        :rtype: float
+        """
+        with self.lock:
+            return self._random.random()
+
+    def inject_error(self, path):
+        """
+        Decides if a request is answered with an injected error - fail_next errors are used before error_rate
+        :param path: full path of the request including query string
+        :type path: str
+        :return: if an error should be returned
+        :rtype: bool
+        """
+        if self.error_endpoints is not None and not any(endpoint in path for endpoint in self.error_endpoints):
+            return False
+        with self.lock:
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                self.error_count += 1
+                return True
+            if self.error_rate > 0 and self._random.random() < self.error_rate:
+                self.error_count += 1
+                return True
+        return False
+
+    def next_id(self, items):
+        """
+        :param items: list of dicts with id or dict by id
+        :type items: list | dict
+        :return: id which is not used yet
+        :rtype: int
+        """
+        ids = items.keys() if isinstance(items, dict) else [item['id'] for item in items]
+        return max(ids, default=0) + 1
+
+    def statistics(self):
+        """
+        :return: dict with number of requests and injected errors
+        :rtype: dict
+        """
+        return {'requests': self.request_count, 'errors': self.error_count}
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, code='-', size='-'):
+        """
+        Requests are not logged - logging each request would distort benchmarks
+        """
+
+
+def create_app(state=None, **kwargs):
+    """
+    Creates the flask app of the mock server
+    :param state: state to be used - created using kwargs if None
+    :type state: MockChurchTools
+    :param kwargs: see MockChurchTools
+    :return: flask app with the state available as app.mock_state
+    :rtype: Flask
+    """
+    app = Flask(__name__)
+    app.mock_state = state if state is not None else MockChurchTools(**kwargs)
+    app.register_blueprint(mock_api)
+    return app
+
+
+class MockServer:
+    def __init__(self, state=None, host='127.0.0.1', port=0, **kwargs):
+        """
+        Runs the mock server in a background thread e.g. for tests and benchmarks
+        usage: with MockServer(page_size=20) as server: ChurchToolsApi(server.url, ct_token=server.state.token)
+        :param state: state to be used - created using kwargs if None
+        :type state: MockChurchTools
+        :param host: interface to listen on
+        :type host: str
+        :param port: port to listen on - 0 uses any free port
+        :type port: int
+        :param kwargs: see MockChurchTools
+        """
+        self.app = create_app(state, **kwargs)
+        self.state = self.app.mock_state
+        self._server = make_server(host, port, self.app, threaded=True, request_handler=_QuietRequestHandler)
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        :return: domain to be used by ChurchToolsApi e.g. http://127.0.0.1:50123
+        :rtype: str
+        """
+        return 'http://{}:{}'.format(self._server.host, self._server.port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logging.info('Mock ChurchTools server running on %s', self.url)
+        return self
+
+    def serve_forever(self):
+        """
+        Runs the server in the current thread e.g. within a separate process until stop is called
+        """
+        logging.info('Mock ChurchTools server running on %s', self.url)
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -0,0 +1,36 @@
+import argparse
+import logging
+
+from ChurchToolsMockServer import MockChurchTools, create_app
+from ChurchToolsMockServer.fixtures import generate_fixtures
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local mock of a ChurchTools instance with generated data')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5050)
+    parser.add_argument('--persons', type=int, default=100)
+    parser.add_argument('--songs', type=int, default=100)
+    parser.add_argument('--groups', type=int, default=20)
+    parser.add_argument('--events', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--page-size', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0, help='seconds added to each request')
+    parser.add_argument('--latency-jitter', type=float, default=0, help='max random seconds added to latency')
+    parser.add_argument('--error-rate', type=float, default=0, help='probability of an injected error')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--retry-after', type=int, default=None)
+    parser.add_argument('--etags', action='store_true')
+    parser.add_argument('--chunked-downloads', action='store_true')
+    parser.add_argument('--token', default='mock-token')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    fixtures = generate_fixtures(persons=args.persons, songs=args.songs, groups=args.groups, events=args.events,
+                                 seed=args.seed)
+    state = MockChurchTools(fixtures=fixtures, page_size=args.page_size, latency=args.latency,
+                            latency_jitter=args.latency_jitter, error_rate=args.error_rate,
+                            error_status=args.error_status, retry_after=args.retry_after, etags=args.etags,
+                            chunked_downloads=args.chunked_downloads,
+                            token=args.token, seed=args.seed)
+    app = create_app(state)
+    app.run(host=args.host, port=args.port, threaded=True)
@@ -0,0 +1,338 @@
+import hashlib
+import random
+from datetime import date, datetime, time, timedelta, timezone
+
+FIRST_NAMES = ['Anna', 'Ben', 'Clara', 'David', 'Emma', 'Felix', 'Greta', 'Hannah', 'Jonas', 'Lea', 'Lukas', 'Marie',
+               'Noah', 'Paul', 'Sophie', 'Tim']
+LAST_NAMES = ['Becker', 'Fischer', 'Hoffmann', 'Koch', 'Meyer', 'Müller', 'Richter', 'Schmidt', 'Schneider',
+              'Schulz', 'Wagner', 'Weber']
+CITIES = [('32657', 'Lemgo'), ('31785', 'Hameln'), ('32756', 'Detmold')]
+SONG_WORDS = ['Amazing', 'Blessed', 'Glory', 'Grace', 'Holy', 'Light', 'Lord', 'Praise', 'Shine', 'Song', 'Spirit',
+              'Way']
+SONG_CATEGORIES = ['ELKW1610.krz.tools', 'Gesangbuch', 'Lobpreis', 'Kinderlieder']
+SERVICE_GROUPS = {'Programm': ['Predigt', 'Moderation', 'Lesung'],
+                  'Musik': ['Band', 'Orgel', 'Gesang'],
+                  'Technik': ['Ton', 'Beamer']}
+TAGS = ['in use', 'Weihnachten', 'Ostern', 'Kinder', 'English']
+KEYS = ['C', 'D', 'E', 'F', 'G', 'A', 'Bb']
+
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def format_date(value):
+    """
+    Converts a datetime to the text format used by the ChurchTools REST API
+    :param value: timestamp - naive values are considered UTC
+    :type value: datetime
+    :return: text e.g. 2023-06-15T17:00:00Z
+    :rtype: str
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime(DATE_FORMAT)
+
+
+def meta(created, modified=None):
+    """
+    :param created: creation timestamp
+    :type created: datetime
+    :param modified: timestamp of the last change - defaults to created
+    :type modified: datetime
+    :return: meta dict as used by most REST objects
+    :rtype: dict
+    """
+    return {'createdDate': format_date(created),
+            'modifiedDate': format_date(modified if modified is not None else created),
+            'createdPerson': {'domainIdentifier': '1'}, 'modifiedPerson': {'domainIdentifier': '1'}}
+
+
+def file_content(file_id, size):
+    """
+    Reproducible binary content of a generated file
+    :param file_id: id of the file
+    :type file_id: int
+    :param size: number of bytes
+    :type size: int
+    :return: file content
+    :rtype: bytes
+    """
+    block = hashlib.sha256(str(file_id).encode('utf-8')).digest()
+    return (block * (size // len(block) + 1))[:size]
+
+
+def generate_fixtures(persons=100, songs=100, groups=20, events=30, files_per_arrangement=2, file_size=20000,
+                      seed=0, start_date=None):
+    """
+    Creates reproducible fake data for the mock server - the same params always create the same data
+    :param persons: number of persons - person 1 is the admin used for login
+    :type persons: int
+    :param songs: number of songs - each song has one arrangement
+    :type songs: int
+    :param groups: number of groups
+    :type groups: int
+    :param events: number of weekly events - half of them in the past, most of them with an agenda
+    :type events: int
+    :param files_per_arrangement: number of files attached to each song arrangement
+    :type files_per_arrangement: int
+    :param file_size: size of each generated file in bytes
+    :type file_size: int
+    :param seed: seed of the random generator
+    :type seed: int
+    :param start_date: date of the first event after the past events - defaults to today
+    :type start_date: date
+    :return: dict with lists or dicts of all data types
+    :rtype: dict
+    """
+    rng = random.Random(seed)
+    start_date = start_date if start_date is not None else date.today()
+    created = datetime.combine(start_date - timedelta(days=365), time(8, 0))
+
+    data = {'persons': [], 'songs': {}, 'song_tags': {}, 'groups': [], 'events': {}, 'agendas': {},
+            'event_admins': {}, 'files': {}, 'file_contents': {}, 'calendars': [], 'appointments': {}}
+
+    for person_id in range(1, persons + 1):
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        zip_code, city = rng.choice(CITIES)
+        data['persons'].append({
+            'id': person_id,
+            'firstName': first_name,
+            'lastName': last_name,
+            'email': '{}.{}{}@example.com'.format(first_name.lower(), last_name.lower(), person_id),
+            'street': 'Kirchstraße {}'.format(rng.randint(1, 99)),
+            'zip': zip_code,
+            'city': city,
+            'phonePrivate': '0{}'.format(rng.randint(1000000, 9999999)),
+            'mobile': '0170{}'.format(rng.randint(1000000, 9999999)),
+            'campusId': rng.randint(0, 2),
+            'statusId': rng.choice([0, 1, 1, 1, 3]),
+            'isArchived': rng.random() < 0.05,
+            'meta': meta(created, created + timedelta(minutes=rng.randint(0, 500000))),
+        })
+
+    data['song_categories'] = [{'id': category_id, 'name': name, 'nameTranslated': name, 'sortKey': category_id,
+                                'campusId': None}
+                               for category_id, name in enumerate(SONG_CATEGORIES, start=1)]
+    data['tags'] = {'songs': [{'id': tag_id, 'name': name, 'description': ''}
+                              for tag_id, name in enumerate(TAGS, start=50)],
+                    'persons': [{'id': 1, 'name': 'Mitarbeiter', 'description': ''}]}
+
+    file_id = 1
+    for song_id in range(1, songs + 1):
+        category = rng.choice(data['song_categories'])
+        arrangement_id = song_id
+        song_files = []
+        for number in range(files_per_arrangement):
+            filename = 'song_{}_{}.{}'.format(song_id, number, 'sng' if number == 0 else 'pdf')
+            song_files.append(filename)
+            add_file(data, file_id, 'song_arrangement', arrangement_id, filename,
+                     file_content(file_id, file_size))
+            file_id += 1
+        data['songs'][song_id] = {
+            'id': song_id,
+            'name': '{} {} {}'.format(rng.choice(SONG_WORDS), rng.choice(SONG_WORDS), song_id),
+            'category': {'id': category['id'], 'name': category['name'], 'campusId': None},
+            'shouldPractice': rng.random() < 0.2,
+            'author': '{} {}'.format(rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)),
+            'ccli': str(rng.randint(1000000, 9999999)),
+            'copyright': 'Mock Music',
+            'note': '',
+            'arrangements': [{
+                'id': arrangement_id,
+                'name': 'Standard-Arrangement',
+                'isDefault': True,
+                'keyOfArrangement': rng.choice(KEYS),
+                'bpm': str(rng.randint(60, 140)),
+                'beat': '4/4',
+                'duration': 0,
+                'note': '',
+                'links': [],
+                'files': [],
+                'meta': meta(created),
+            }],
+            'meta': meta(created, created + timedelta(minutes=rng.randint(0, 500000))),
+        }
+        data['song_tags'][song_id] = sorted(tag['id'] for tag in data['tags']['songs'] if rng.random() < 0.3)
+
+    for group_id in range(1, groups + 1):
+        data['groups'].append({
+            'id': group_id,
+            'guid': 'group-{}'.format(group_id),
+            'name': 'Gruppe {}'.format(group_id),
+            'information': {'groupTypeId': rng.randint(1, 3), 'groupStatusId': 1, 'note': ''},
+            'meta': meta(created),
+        })
+
+    service_id = 1
+    data['service_groups'] = []
+    data['services'] = []
+    for service_group_id, (group_name, service_names) in enumerate(SERVICE_GROUPS.items(), start=1):
+        data['service_groups'].append({'id': service_group_id, 'name': group_name, 'nameTranslated': group_name,
+                                       'sortKey': service_group_id, 'viewAll': True, 'campusId': None})
+        for service_name in service_names:
+            data['services'].append({'id': service_id, 'name': service_name, 'nameTranslated': service_name,
+                                     'serviceGroupId': service_group_id, 'sortKey': service_id, 'groupIds': '',
+                                     'tagIds': '', 'allowDecline': True, 'allowExchange': True, 'comment': '',
+                                     'standard': True, 'hidePersonName': False, 'sendReminderMails': False,
+                                     'sendServiceRequestEmails': True, 'allowControlLiveAgenda': False,
+                                     'calTextTemplate': None, 'allowChatAccess': False})
+            service_id += 1
+
+    data['calendars'] = [{'id': calendar_id, 'name': name, 'nameTranslated': name, 'sortKey': calendar_id,
+                          'color': '#0000ff', 'isPublic': True, 'isPrivate': False, 'randomUrl': '', 'iCalSourceUrl':
+                              None, 'accessGroupId': None, 'accessTypeId': None, 'campusId': None}
+                         for calendar_id, name in [(1, 'Gottesdienste'), (2, 'Gemeindeleben')]]
+
+    first_event_date = start_date - timedelta(weeks=events // 2)
+    next_person = 1
+    for event_id in range(1, events + 1):
+        start = datetime.combine(first_event_date + timedelta(weeks=event_id - 1), time(10, 0))
+        event_services = []
+        for service in data['services']:
+            for _ in range(rng.randint(0, 2)):
+                person = data['persons'][next_person % len(data['persons'])] if data['persons'] else None
+                next_person += 1
+                event_services.append(event_service(len(event_services) + 1, service,
+                                                    person if rng.random() < 0.8 else None, rng.random() < 0.7))
+        data['events'][event_id] = {
+            'id': event_id,
+            'guid': 'event-{}'.format(event_id),
+            'name': 'Gottesdienst {}'.format(event_id),
+            'description': '',
+            'startDate': format_date(start),
+            'endDate': format_date(start + timedelta(hours=1, minutes=30)),
+            'calendar': {'domainType': 'calendar', 'domainIdentifier': '1', 'title': 'Gottesdienste'},
+            'isCanceled': rng.random() < 0.05,
+            'appointmentId': event_id,
+            'eventServices': event_services,
+            'meta': meta(created),
+        }
+        if rng.random() < 0.8:
+            data['agendas'][event_id] = agenda(event_id, data['events'][event_id], data, rng, created)
+
+    return data
+
+
+def add_file(data, file_id, domain_type, domain_identifier, name, content):
+    """
+    Adds a file to generated or uploaded data
+    :param data: fixtures as created by generate_fixtures
+    :type data: dict
+    :param file_id: id of the new file
+    :type file_id: int
+    :param domain_type: e.g. 'song_arrangement'
+    :type domain_type: str
+    :param domain_identifier: id of the object the file is attached to
+    :type domain_identifier: int | str
+    :param name: display name of the file
+    :type name: str
+    :param content: file content
+    :type content: bytes
+    :return: file dict without fileUrl which depends on the host of the request
+    :rtype: dict
+    """
+    file = {
+        'id': file_id,
+        'name': name,
+        'filename': hashlib.sha256('{}{}'.format(file_id, name).encode('utf-8')).hexdigest(),
+        'size': len(content),
+        'domainType': domain_type,
+        'domainIdentifier': str(domain_identifier),
+        'imageUrl': None,
+        'meta': meta(datetime.now(timezone.utc)),
+    }
+    data['files'].setdefault((domain_type, str(domain_identifier)), []).append(file)
+    data['file_contents'][file_id] = content
+    return file
+
+
+def event_service(event_service_id, service, person, agreed):
+    """
+    :param event_service_id: id of the assignment
+    :type event_service_id: int
+    :param service: service as in masterdata
+    :type service: dict
+    :param person: assigned person or None for an open request
+    :type person: dict | None
+    :param agreed: if the person accepted
+    :type agreed: bool
+    :return: event service dict as included in events
+    :rtype: dict
+    """
+    return {
+        'id': event_service_id,
+        'personId': person['id'] if person is not None else None,
+        'person': {'domainType': 'person', 'domainIdentifier': str(person['id']),
+                   'title': '{} {}'.format(person['firstName'], person['lastName'])} if person is not None else None,
+        'name': '{} {}'.format(person['firstName'], person['lastName']) if person is not None else None,
+        'serviceId': service['id'],
+        'agreed': agreed and person is not None,
+        'isValid': True,
+        'requestedDate': None,
+        'requesterPersonId': 1,
+        'comment': '',
+        'counter': event_service_id,
+        'allowChat': False,
+    }
+
+
+def agenda(event_id, event, data, rng, created):
+    """
+    Creates an agenda with headers, normal items and songs for one event
+    :return: agenda dict as returned by /api/events/{id}/agenda
+    :rtype: dict
+    """
+    services_by_id = {service['id']: service for service in data['services']}
+    items = [{'title': 'Vorbereitung', 'type': 'header', 'isBeforeEvent': True},
+             {'title': 'Soundcheck', 'type': 'normal', 'isBeforeEvent': True},
+             {'title': 'Begrüßung', 'type': 'normal', 'isBeforeEvent': False},
+             {'title': 'Lied', 'type': 'song', 'isBeforeEvent': False},
+             {'title': 'Predigt', 'type': 'normal', 'isBeforeEvent': False},
+             {'title': 'Lied', 'type': 'song', 'isBeforeEvent': False},
+             {'title': 'Segen', 'type': 'normal', 'isBeforeEvent': False}]
+
+    agenda_items = []
+    for position, item in enumerate(items, start=1):
+        responsible_persons = []
+        for assignment in rng.sample(event['eventServices'], min(2, len(event['eventServices']))):
+            responsible_persons.append({
+                'person': assignment['person'],
+                'service': '[{}]'.format(services_by_id[assignment['serviceId']]['name']),
+                'accepted': assignment['agreed'],
+            })
+        agenda_item = {
+            'id': event_id * 100 + position,
+            'position': position,
+            'type': item['type'],
+            'title': item['title'],
+            'note': rng.choice(['', '', 'Bitte pünktlich sein']),
+            'duration': 300,
+            'start': event['startDate'],
+            'isBeforeEvent': item['isBeforeEvent'],
+            'responsible': {'text': '', 'persons': responsible_persons} if item['type'] != 'header' else [],
+            'serviceGroupNotes': [{'serviceGroupId': service_group['id'], 'note': rng.choice(['', 'Mikrofon'])}
+                                  for service_group in data['service_groups']],
+            'meta': meta(created),
+        }
+        if item['type'] == 'song' and len(data['songs']) > 0:
+            song = data['songs'][rng.choice(list(data['songs'].keys()))]
+            agenda_item['song'] = {'songId': song['id'], 'arrangementId': song['arrangements'][0]['id'],
+                                   'title': song['name'], 'arrangement': song['arrangements'][0]['name'],
+                                   'category': song['category']['name'],
+                                   'key': song['arrangements'][0]['keyOfArrangement'],
+                                   'bpm': song['arrangements'][0]['bpm'], 'isDefault': True}
+        elif item['type'] == 'song':
+            agenda_item['type'] = 'normal'
+        agenda_items.append(agenda_item)
+
+    return {
+        'id': 1000 + event_id,
+        'name': event['name'],
+        'series': 'Gottesdienst',
+        'isFinal': rng.random() < 0.5,
+        'eventStartPosition': 2,
+        'calendarId': 1,
+        'total': len(agenda_items),
+        'items': agenda_items,
+        'meta': meta(created, created + timedelta(minutes=rng.randint(0, 500000))),
+    }
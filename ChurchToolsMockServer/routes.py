@@ -0,0 +1,499 @@
+import copy
+import io
+import json
+import math
+import secrets
+import time
+import zipfile
+from datetime import date, datetime, timezone
+
+from flask import Blueprint, Response, current_app, jsonify, request
+
+from ChurchToolsMockServer.fixtures import DATE_FORMAT, add_file, event_service, format_date, meta
+
+SESSION_COOKIE = 'ChurchTools_mock'
+
+mock_api = Blueprint('mock_api', __name__)
+
+
+def state():
+    """
+    :return: state of the running app
+    :rtype: ChurchToolsMockServer.MockChurchTools
+    """
+    return current_app.mock_state
+
+
+def error(status, message):
+    response = jsonify({'message': message, 'errors': []})
+    response.status_code = status
+    return response
+
+
+def is_logged_in():
+    return request.cookies.get(SESSION_COOKIE) in state().sessions
+
+
+def paginated(items):
+    """
+    Creates a paginated REST response using page and limit params of the request
+    :param items: all matching items
+    :type items: list
+    :return: flask response
+    """
+    page_size = state().page_size
+    if request.args.get('limit', '').isdigit():
+        page_size = min(int(request.args['limit']), page_size)
+    page_size = max(page_size, 1)
+    last_page = max(math.ceil(len(items) / page_size), 1)
+    page = int(request.args['page']) if request.args.get('page', '').isdigit() else 1
+    page = min(max(page, 1), last_page)
+    data = items[(page - 1) * page_size:page * page_size]
+    return jsonify({'data': data, 'meta': {'count': len(data), 'all': len(items),
+                                           'pagination': {'total': len(items), 'limit': page_size,
+                                                          'current': page, 'lastPage': last_page}}})
+
+
+def file_url(file):
+    return '{}?q=public/filedownload&id={}&filename={}'.format(request.host_url, file['id'], file['filename'])
+
+
+def with_file_url(file):
+    result = dict(file)
+    result['fileUrl'] = file_url(file)
+    return result
+
+
+def rest_song(song):
+    """
+    :param song: stored song
+    :type song: dict
+    :return: song as returned by REST API including files of its arrangements
+    :rtype: dict
+    """
+    result = copy.deepcopy(song)
+    for arrangement in result['arrangements']:
+        arrangement['files'] = [with_file_url(file)
+                                for file in state().data['files'].get(('song_arrangement', str(arrangement['id'])), [])]
+    return result
+
+
+def ajax_song(song):
+    """
+    :param song: stored song
+    :type song: dict
+    :return: song as returned by legacy AJAX getAllSongs
+    :rtype: dict
+    """
+    arrangement = song['arrangements'][0]
+    return {
+        'id': str(song['id']),
+        'bezeichnung': song['name'],
+        'songcategory_id': str(song['category']['id']),
+        'author': song['author'],
+        'copyright': song['copyright'],
+        'ccli': song['ccli'],
+        'practice_yn': '1' if song['shouldPractice'] else '0',
+        'tags': [str(tag_id) for tag_id in state().data['song_tags'].get(song['id'], [])],
+        'arrangement': {str(arrangement['id']): {'id': str(arrangement['id']), 'bezeichnung': arrangement['name'],
+                                                 'tonality': arrangement['keyOfArrangement'],
+                                                 'bpm': arrangement['bpm'], 'beat': arrangement['beat'],
+                                                 'default_yn': '1', 'files': {}}},
+    }
+
+
+def touch(item):
+    item['meta']['modifiedDate'] = format_date(datetime.now(timezone.utc))
+
+
+@mock_api.before_request
+def simulate_network():
+    mock_state = state()
+    with mock_state.lock:
+        mock_state.request_count += 1
+    delay = mock_state.latency
+    if mock_state.latency_jitter > 0:
+        delay += mock_state.random() * mock_state.latency_jitter
+    if delay > 0:
+        time.sleep(delay)
+
+    if mock_state.inject_error(request.full_path):
+        response = error(mock_state.error_status, 'Injected error')
+        if mock_state.retry_after is not None:
+            response.headers['Retry-After'] = str(mock_state.retry_after)
+        return response
+
+    public = request.path in ('/api/whoami', '/api/login') or request.args.get('q') == 'public/filedownload'
+    if not public and not is_logged_in():
+        return error(401, 'Session expired!')
+
+
+@mock_api.after_request
+def add_etag(response):
+    if state().etags and request.method == 'GET' and response.status_code == 200 and not response.direct_passthrough:
+        response.add_etag()
+        response.make_conditional(request)
+    return response
+
+
+def login_response(person):
+    session_id = secrets.token_hex(16)
+    with state().lock:
+        state().sessions.add(session_id)
+    response = jsonify({'data': person})
+    response.set_cookie(SESSION_COOKIE, session_id)
+    return response
+
+
+@mock_api.route('/api/whoami')
+def whoami():
+    admin = state().data['persons'][0]
+    if request.headers.get('Authorization') == 'Login {}'.format(state().token):
+        return login_response(admin)
+    if is_logged_in():
+        return jsonify({'data': admin})
+    return jsonify({'data': {'id': -1, 'firstName': 'Anonymous', 'lastName': ''}})
+
+
+@mock_api.route('/api/login', methods=['POST'])
+def login():
+    if request.form.get('username') != state().username or request.form.get('password') != state().password:
+        return error(400, 'Login failed')
+    return login_response({'status': 'success', 'message': None, 'personId': 1})
+
+
+@mock_api.route('/api/csrftoken')
+def csrftoken():
+    return jsonify({'data': state().csrf_token})
+
+
+@mock_api.route('/api/persons')
+def persons():
+    items = state().data['persons']
+    ids = request.args.getlist('ids[]')
+    if len(ids) > 0:
+        ids = {int(person_id) for person_id in ids}
+        items = [person for person in items if person['id'] in ids]
+    if 'is_archived' in request.args:
+        is_archived = request.args['is_archived'].lower() == 'true'
+        items = [person for person in items if person['isArchived'] == is_archived]
+    return paginated(items)
+
+
+@mock_api.route('/api/songs')
+def songs():
+    return paginated([rest_song(song) for song in state().data['songs'].values()])
+
+
+@mock_api.route('/api/songs/<int:song_id>')
+def song(song_id):
+    if song_id not in state().data['songs']:
+        return error(404, 'Song not found')
+    return jsonify({'data': rest_song(state().data['songs'][song_id])})
+
+
+@mock_api.route('/api/groups')
+def groups():
+    return paginated(state().data['groups'])
+
+
+@mock_api.route('/api/groups/<int:group_id>')
+def group(group_id):
+    for item in state().data['groups']:
+        if item['id'] == group_id:
+            return jsonify({'data': item})
+    return error(404, 'Group not found')
+
+
+@mock_api.route('/api/tags')
+def tags():
+    return jsonify({'data': state().data['tags'].get(request.args.get('type', 'songs'), [])})
+
+
+@mock_api.route('/api/events')
+def events():
+    """
+    Events from today onwards unless from/to or direction are specified
+    """
+    from_date = request.args.get('from', date.today().isoformat())
+    to_date = request.args.get('to')
+    items = sorted(state().data['events'].values(), key=lambda event: event['startDate'])
+    if request.args.get('canceled', 'false').lower() != 'true':
+        items = [event for event in items if not event['isCanceled']]
+
+    if request.args.get('direction') == 'backward':
+        items = [event for event in items if event['startDate'][:10] < from_date][::-1]
+    else:
+        items = [event for event in items if event['startDate'][:10] >= from_date]
+        if to_date is not None:
+            items = [event for event in items if event['startDate'][:10] <= to_date]
+    if 'direction' in request.args:
+        limit = request.args.get('limit', '1')
+        if limit.isdigit():
+            items = items[:int(limit)]
+
+    return paginated(items)
+
+
+@mock_api.route('/api/events/<int:event_id>')
+def event(event_id):
+    if event_id not in state().data['events']:
+        return error(404, 'Event not found')
+    return jsonify({'data': state().data['events'][event_id]})
+
+
+@mock_api.route('/api/events/<int:event_id>/agenda')
+def event_agenda(event_id):
+    if event_id not in state().data['agendas']:
+        return error(404, 'No agenda found for event')
+    return jsonify({'data': state().data['agendas'][event_id]})
+
+
+@mock_api.route('/api/agendas/<int:agenda_id>/export', methods=['POST'])
+def agenda_export(agenda_id):
+    agendas = {agenda['id']: agenda for agenda in state().data['agendas'].values()}
+    if agenda_id not in agendas:
+        return error(404, 'Agenda not found')
+    target = request.args.get('target', 'SONG_BEAMER')
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('agenda.json', json.dumps(agendas[agenda_id]))
+    with state().lock:
+        file_id = state().next_id(state().data['file_contents'])
+        file = add_file(state().data, file_id, 'agenda_export', agenda_id,
+                        '{}_{}.zip'.format(target, agenda_id), buffer.getvalue())
+    return jsonify({'data': {'url': '?q=public/filedownload&id={}&filename={}'.format(file['id'], file['filename'])}})
+
+
+@mock_api.route('/api/event/masterdata')
+def event_masterdata():
+    data = state().data
+    return jsonify({'data': {'absenceReasons': [], 'songCategories': data['song_categories'],
+                             'services': data['services'], 'serviceGroups': data['service_groups']}})
+
+
+@mock_api.route('/api/services')
+def services():
+    return jsonify({'data': state().data['services']})
+
+
+@mock_api.route('/api/calendars')
+def calendars():
+    return jsonify({'data': state().data['calendars']})
+
+
+@mock_api.route('/api/calendars/<int:calendar_id>/appointments', methods=['GET', 'POST'])
+def appointments(calendar_id):
+    calendar_appointments = state().data['appointments'].setdefault(calendar_id, {})
+    if request.method == 'GET':
+        start_date = request.values.get('startDate', '0000-00-00')
+        end_date = request.values.get('endDate', '9999-99-99')
+        return jsonify({'data': [{'base': appointment, 'calculated': {'startDate': appointment['startDate'],
+                                                                       'endDate': appointment['endDate']}}
+                                 for appointment in calendar_appointments.values()
+                                 if start_date <= appointment['startDate'][:10] <= end_date]})
+
+    with state().lock:
+        appointment_id = state().next_id(
+            {key: None for items in state().data['appointments'].values() for key in items.keys()})
+        appointment = dict(request.get_json(force=True), id=appointment_id, calendar={'id': calendar_id})
+        calendar_appointments[appointment_id] = appointment
+    response = jsonify({'data': appointment})
+    response.status_code = 201
+    return response
+
+
+@mock_api.route('/api/calendars/<int:calendar_id>/appointments/<int:appointment_id>', methods=['PUT'])
+def appointment(calendar_id, appointment_id):
+    calendar_appointments = state().data['appointments'].setdefault(calendar_id, {})
+    if appointment_id not in calendar_appointments:
+        return error(404, 'Appointment not found')
+    calendar_appointments[appointment_id].update(request.get_json(force=True))
+    return jsonify({'data': calendar_appointments[appointment_id]})
+
+
+@mock_api.route('/api/files/<domain_type>/<domain_identifier>', methods=['GET', 'POST', 'DELETE'])
+def files(domain_type, domain_identifier):
+    key = (domain_type, domain_identifier)
+    if request.method == 'GET':
+        return jsonify({'data': [with_file_url(file) for file in state().data['files'].get(key, [])]})
+
+    with state().lock:
+        if request.method == 'DELETE':
+            for file in state().data['files'].pop(key, []):
+                state().data['file_contents'].pop(file['id'], None)
+            return Response(status=204)
+
+        uploaded = []
+        for upload in request.files.getlist('files[]'):
+            file_id = state().next_id(state().data['file_contents'])
+            uploaded.append(with_file_url(add_file(state().data, file_id, domain_type, domain_identifier,
+                                                   upload.filename, upload.read())))
+    return jsonify({'data': uploaded})
+
+
+@mock_api.route('/api/files/<int:file_id>', methods=['DELETE'])
+def file_delete(file_id):
+    with state().lock:
+        for key, items in state().data['files'].items():
+            for file in items:
+                if file['id'] == file_id:
+                    items.remove(file)
+                    state().data['file_contents'].pop(file_id, None)
+                    return Response(status=204)
+    return error(404, 'File not found')
+
+
+def file_download():
+    """
+    Public download of file content - supports Range requests
+    """
+    file_id = int(request.args.get('id', 0))
+    content = state().data['file_contents'].get(file_id)
+    if content is None:
+        return error(404, 'File not found')
+    if state().chunked_downloads:
+        # a generator without Content-Length is sent in chunks
+        return Response((content[position:position + 10000] for position in range(0, len(content), 10000)),
+                        mimetype='application/octet-stream')
+    response = Response(content, mimetype='application/octet-stream')
+    return response.make_conditional(request, accept_ranges=True, complete_length=len(content))
+
+
+@mock_api.route('/', methods=['GET', 'POST'])
+@mock_api.route('/index.php', methods=['GET', 'POST'])
+def legacy():
+    """
+    Legacy entry point used for file downloads and churchservice/ajax functions
+    """
+    q = request.args.get('q')
+    if q == 'public/filedownload':
+        return file_download()
+    if q != 'churchservice/ajax' or request.method != 'POST':
+        return error(404, 'Unknown legacy module {}'.format(q))
+
+    func = request.args.get('func', request.form.get('func'))
+    if func not in AJAX_FUNCTIONS:
+        return jsonify({'status': 'error', 'message': 'Unknown function {}'.format(func)})
+    with state().lock:
+        return jsonify({'status': 'success', 'data': AJAX_FUNCTIONS[func](request.form)})
+
+
+def ajax_get_all_facts(form):
+    return {}
+
+
+def ajax_get_all_songs(form):
+    return {'songs': {str(song_id): ajax_song(song) for song_id, song in state().data['songs'].items()}}
+
+
+def ajax_add_new_song(form):
+    data = state().data
+    song_id = state().next_id(data['songs'])
+    category = next((category for category in data['song_categories']
+                     if str(category['id']) == form.get('songcategory_id')), data['song_categories'][0])
+    now = datetime.now(timezone.utc)
+    data['songs'][song_id] = {
+        'id': song_id, 'name': form.get('bezeichnung', ''),
+        'category': {'id': category['id'], 'name': category['name'], 'campusId': None},
+        'shouldPractice': False, 'author': form.get('author', ''), 'ccli': form.get('ccli', ''),
+        'copyright': form.get('copyright', ''), 'note': '',
+        'arrangements': [{'id': state().next_id({arrangement['id']: None for item in data['songs'].values()
+                                                 for arrangement in item['arrangements']}),
+                          'name': 'Standard-Arrangement', 'isDefault': True,
+                          'keyOfArrangement': form.get('tonality', ''), 'bpm': form.get('bpm', ''),
+                          'beat': form.get('beat', ''), 'duration': 0, 'note': '', 'links': [], 'files': [],
+                          'meta': meta(now)}],
+        'meta': meta(now),
+    }
+    data['song_tags'][song_id] = []
+    return song_id
+
+
+def ajax_edit_song(form):
+    song = state().data['songs'].get(int(form.get('id', 0)))
+    if song is None:
+        return None
+    song['name'] = form.get('bezeichnung', song['name'])
+    song['author'] = form.get('author', song['author'])
+    song['copyright'] = form.get('copyright', song['copyright'])
+    song['ccli'] = form.get('ccli', song['ccli'])
+    song['shouldPractice'] = form.get('practice_yn', str(int(song['shouldPractice']))) in ('1', 'True', 'true')
+    for category in state().data['song_categories']:
+        if str(category['id']) == form.get('songcategory_id'):
+            song['category'] = {'id': category['id'], 'name': category['name'], 'campusId': None}
+    touch(song)
+    return None
+
+
+def ajax_delete_song(form):
+    song_id = int(form.get('id', 0))
+    state().data['songs'].pop(song_id, None)
+    state().data['song_tags'].pop(song_id, None)
+    return None
+
+
+def ajax_add_song_tag(form):
+    song_tags = state().data['song_tags'].setdefault(int(form['id']), [])
+    if int(form['tag_id']) not in song_tags:
+        song_tags.append(int(form['tag_id']))
+    return None
+
+
+def ajax_del_song_tag(form):
+    song_tags = state().data['song_tags'].setdefault(int(form['id']), [])
+    if int(form['tag_id']) in song_tags:
+        song_tags.remove(int(form['tag_id']))
+    return None
+
+
+def ajax_get_all_event_data(form):
+    event_id = int(form.get('id', 0))
+    if event_id not in state().data['events']:
+        return []
+    item = state().data['events'][event_id]
+    event_data = {'id': str(event_id), 'bezeichnung': item['name'],
+                  'startdate': datetime.strptime(item['startDate'], DATE_FORMAT).strftime('%Y-%m-%d %H:%M:%S')}
+    if event_id in state().data['event_admins']:
+        event_data['admin'] = state().data['event_admins'][event_id]
+    return {str(event_id): event_data}
+
+
+def ajax_add_or_remove_service_to_event(form):
+    event_item = state().data['events'][int(form['id'])]
+    services_by_id = {service['id']: service for service in state().data['services']}
+    item_id = 0
+    while 'col{}'.format(item_id) in form:
+        service_id = int(form['col{}'.format(item_id)])
+        count = int(form.get('count{}'.format(item_id), 0)) if 'val{}'.format(item_id) in form else 0
+        assignments = [service for service in event_item['eventServices'] if service['serviceId'] == service_id]
+        for assignment in assignments[count:]:
+            event_item['eventServices'].remove(assignment)
+        for _ in range(count - len(assignments)):
+            event_item['eventServices'].append(event_service(
+                max([service['id'] for service in event_item['eventServices']], default=0) + 1,
+                services_by_id[service_id], None, False))
+        item_id += 1
+    touch(event_item)
+    return None
+
+
+def ajax_update_event_info(form):
+    if 'admin' in form:
+        state().data['event_admins'][int(form['id'])] = form['admin'].replace(' ', '')
+    return None
+
+
+AJAX_FUNCTIONS = {
+    'getAllFacts': ajax_get_all_facts,
+    'getAllSongs': ajax_get_all_songs,
+    'addNewSong': ajax_add_new_song,
+    'editSong': ajax_edit_song,
+    'deleteSong': ajax_delete_song,
+    'addSongTag': ajax_add_song_tag,
+    'delSongTag': ajax_del_song_tag,
+    'getAllEventData': ajax_get_all_event_data,
+    'addOrRemoveServiceToEvent': ajax_add_or_remove_service_to_event,
+    'updateEventInfo': ajax_update_event_info,
+}
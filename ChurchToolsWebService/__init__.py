@@ -1,11 +1,14 @@
+import io
 import logging
 import os
 from datetime import datetime
 
-from flask import Flask, render_template, request, redirect, session, send_file, url_for
+from flask import Flask, g, render_template, request, redirect, session, send_file, url_for
 
 from ChurchToolsApi import ChurchToolsApi as CTAPI
-from flask_session import Session
+from ChurchToolsApi.agenda_docx import default_renderer
+from ChurchToolsApi.cache import TTLCache
+from ChurchToolsWebService.client_registry import ClientRegistry
 
 app = Flask(__name__)
 app.secret_key = os.urandom(16)
@@ -13,9 +16,13 @@ if 'CT_DOMAIN' in os.environ.keys():
     app.ct_domain = os.environ['CT_DOMAIN']
 
 app.config["SESSION_PERMANENT"] = False
-app.config["SESSION_TYPE"] = "filesystem"
 
-Session(app)
+# logged in api objects and loaded data are kept server side - the session cookie only contains a token
+clients = ClientRegistry(idle_timeout=int(os.environ.get('CT_CLIENT_IDLE_TIMEOUT', 1800)),
+                         identity_validity=int(os.environ.get('CT_IDENTITY_VALIDITY', 60)))
+# agendas are kept per client and reloaded if the event was modified or the entry is older than this
+AGENDA_CACHE_TTL = int(os.environ.get('CT_AGENDA_CACHE_TTL', 300))
+DOCX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
 
 
 @app.route('/')
@@ -25,11 +32,14 @@ def index():
 
 @app.before_request
 def check_session():
-    if request.endpoint != 'login':
-        if 'ct_api' not in session:
-            return redirect(url_for('login'))
-        elif not session['ct_api'].who_am_i():
-            return redirect(url_for('login'))
+    if request.endpoint in ('login', 'static'):
+        return
+    client = clients.get(session.get('client_token'))
+    if client is None:
+        return redirect(url_for('login'))
+    g.ct_user = clients.identity(session['client_token'], client)
+    g.ct_api = client['api']
+    g.client_data = client['data']
 
 
 @app.route('/login', methods=['GET', 'POST'])
@@ -43,8 +53,11 @@ def login():
         password = request.form['ct_password']
         domain = request.form['ct_domain']
 
-        session['ct_api'] = CTAPI(domain, ct_user=user, ct_password=password)
-        if session['ct_api'].who_am_i() is not False:
+        ct_api = CTAPI(domain, ct_user=user, ct_password=password)
+        ct_user = ct_api.who_am_i()
+        if ct_user is not False:
+            clients.remove(session.get('client_token'))
+            session['client_token'] = clients.add(ct_api, ct_user)
             return redirect('/main')
 
         error = 'Invalid Login'
@@ -55,57 +68,126 @@ def login():
 
 @app.route('/main')
 def main():
-    user = session['ct_api'].who_am_i()
-    return render_template('main.html', ct_user=user, ct_domain=app.ct_domain)
+    return render_template('main.html', ct_user=g.ct_user, ct_domain=app.ct_domain)
+
+
+def load_event_agendas(events):
+    """
+    Agendas of the events using the agenda cache of the client - missing, outdated or modified ones
+    (modifiedDate of the event changed) are requested in parallel
+    Changes of an agenda do not change its event - cached agendas are only used to list events with agenda,
+    downloads use load_event_agenda
+    :param events: events as returned by get_events
+    :type events: list[dict]
+    :return: dict of event id: agenda or None if the event does not have an agenda
+    :rtype: dict[int, dict | None]
+    """
+    agenda_cache = g.client_data.setdefault('agenda_cache', TTLCache(ttl=AGENDA_CACHE_TTL))
+    event_agendas = {}
+    missing = {}
+    for event in events:
+        modified = event.get('meta', {}).get('modifiedDate')
+        cached = agenda_cache.get(event['id'])
+        if cached is not None and cached['modified'] == modified:
+            event_agendas[event['id']] = cached['agenda']
+        else:
+            missing[event['id']] = modified
+
+    if len(missing) > 0:
+        logging.debug("Loading %s of %s agendas", len(missing), len(events))
+        for event_id, agenda in g.ct_api.get_event_agendas(missing.keys()).items():
+            agenda_cache.set(event_id, {'modified': missing[event_id], 'agenda': agenda})
+            event_agendas[event_id] = agenda
+    return event_agendas
+
+
+def load_event_agenda(event_id):
+    """
+    Current agenda of an event which also replaces the cached one
+    :param event_id: id of an event listed by /events
+    :type event_id: int
+    :return: agenda or None if the event does not have an agenda
+    :rtype: dict | None
+    """
+    agenda = g.ct_api.get_event_agenda(event_id)
+    event = g.client_data['events'].get(event_id, {})
+    g.client_data.setdefault('agenda_cache', TTLCache(ttl=AGENDA_CACHE_TTL)).set(
+        event_id, {'modified': event.get('meta', {}).get('modifiedDate'), 'agenda': agenda})
+    g.client_data['event_agendas'][event_id] = agenda
+    return agenda
+
+
+def render_agenda_docx(agenda, serviceGroups):
+    """
+    Content of the docx document of an agenda rendered in memory
+    documents are cached per client and agenda for the selected service groups - all documents of an agenda
+    are replaced once its modifiedDate changes
+    :param agenda: event agenda as returned by get_event_agenda
+    :type agenda: dict
+    :param serviceGroups: selected service groups as dict by id
+    :type serviceGroups: dict
+    :return: docx file content
+    :rtype: bytes
+    """
+    docx_cache = g.client_data.setdefault('docx_cache', TTLCache(ttl=AGENDA_CACHE_TTL))
+    modified = agenda.get('meta', {}).get('modifiedDate')
+
+    documents = docx_cache.get(agenda['id'])
+    if documents is None or documents['modified'] != modified:
+        # agendas which are not requested again are removed once they are outdated
+        docx_cache.remove_expired()
+        documents = {'modified': modified, 'content': {}}
+        docx_cache.set(agenda['id'], documents)
+
+    key = tuple(sorted(serviceGroups.keys()))
+    if key not in documents['content']:
+        documents['content'][key] = default_renderer().render_bytes(agenda, serviceGroups=serviceGroups,
+                                                                    excludeBeforeEvent=False)
+    return documents['content'][key]
 
 
 @app.route('/events', methods=['GET', 'POST'])
 def events():
     if request.method == 'GET':
-        session['serviceGroups'] = session['ct_api'].get_event_masterdata(type='serviceGroups', returnAsDict=True)
+        g.client_data['serviceGroups'] = g.ct_api.get_event_masterdata(type='serviceGroups', returnAsDict=True)
 
-        events_temp = session['ct_api'].get_events()
-        # events_temp.extend(session['ct_api'].get_events(eventId=2147))  # debugging
-        # events_temp.extend(session['ct_api'].get_events(eventId=2129))  # debugging
-        logging.debug("{} Events loaded".format(len(events_temp)))
+        events_temp = g.ct_api.get_events()
+        # events_temp.extend(g.ct_api.get_events(eventId=2147))  # debugging
+        # events_temp.extend(g.ct_api.get_events(eventId=2129))  # debugging
+        logging.debug("%s Events loaded", len(events_temp))
 
         event_choices = []
-        session['event_agendas'] = {}
-        session['events'] = {}
+        g.client_data['event_agendas'] = load_event_agendas(events_temp)
+        g.client_data['events'] = {}
 
         for event in events_temp:
-            agenda = session['ct_api'].get_event_agenda(event['id'])
-            if agenda is not None:
-                session['event_agendas'][event['id']] = agenda
-                session['events'][event['id']] = event
+            if g.client_data['event_agendas'][event['id']] is not None:
+                g.client_data['events'][event['id']] = event
                 startdate = datetime.strptime(event['startDate'], '%Y-%m-%dT%H:%M:%S%z')
                 datetext = startdate.astimezone().strftime('%a %b %d\t%H:%M')
                 event = {'id': event['id'], 'label': datetext + '\t' + event['name']}
                 event_choices.append(event)
 
-        logging.debug("{} Events kept because schedule exists".format(len(events_temp)))
+        logging.debug("%s Events kept because schedule exists", len(event_choices))
 
         return render_template('events.html', ct_domain=app.ct_domain, event_choices=event_choices,
-                               service_groups=session['serviceGroups'])
+                               service_groups=g.client_data['serviceGroups'])
     elif request.method == 'POST':
         if 'event_id' not in request.form.keys():
             redirect('/events')
         event_id = int(request.form['event_id'])
         if 'submit_docx' in request.form.keys():
-            event = session['events'][event_id]
-            agenda = session['event_agendas'][event_id]
+            agenda = load_event_agenda(event_id)
+            if agenda is None:
+                return render_template('main.html', error='Agenda of the event not found')
 
             selectedServiceGroups = \
-                {key: value for key, value in session['serviceGroups'].items()
+                {key: value for key, value in g.client_data['serviceGroups'].items()
                  if 'service_group {}'.format(key) in request.form}
 
-            document = session['ct_api'].get_event_agenda_docx(agenda, serviceGroups=selectedServiceGroups,
-                                                               excludeBeforeEvent=False)
-            filename = agenda['name'] + '.docx'
-            document.save(filename)
-            response = send_file(path_or_file=os.getcwd() + '/' + filename, as_attachment=True)
-            os.remove(filename)
-            return response
+            content = render_agenda_docx(agenda, selectedServiceGroups)
+            return send_file(io.BytesIO(content), mimetype=DOCX_MIMETYPE, as_attachment=True,
+                             download_name=agenda['name'] + '.docx')
 
         elif 'submit_communi' in request.form.keys():
             error = 'Communi Group update not yet implemented'
@@ -0,0 +1,131 @@
+import logging
+import secrets
+import threading
+import time
+
+
+class ClientRegistry:
+    def __init__(self, idle_timeout=1800, identity_validity=60):
+        """
+        Server side storage of logged in ChurchToolsApi objects and related data of each web session
+        Only the token returned by add is stored in the session cookie - clients are kept in memory
+        and are therefore only shared by threads of one process (e.g. flask app.run)
+        :param idle_timeout: seconds after the last use after which a client is logged out
+        :type idle_timeout: float
+        :param identity_validity: seconds a confirmed login is used before it is revalidated in background
+        :type identity_validity: float
+        """
+        self.idle_timeout = idle_timeout
+        self.identity_validity = identity_validity
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def add(self, api, user):
+        """
+        Registers a logged in client
+        :param api: client of one user
+        :type api: ChurchToolsApi.ChurchToolsApi
+        :param user: result of api.who_am_i() right after login
+        :type user: dict
+        :return: random token to be stored in the session
+        :rtype: str
+        """
+        token = secrets.token_urlsafe(32)
+        now = time.monotonic()
+        with self._lock:
+            self._clients[token] = {'api': api, 'data': {}, 'user': user, 'validated': now, 'revalidating': False,
+                                    'last_used': now}
+        self.remove_expired()
+        return token
+
+    def get(self, token):
+        """
+        Returns a registered client and marks it as used
+        :param token: token returned by add
+        :type token: str
+        :return: dict with api, user (cached result of who_am_i - see identity) and data (dict for any data of the
+            web session e.g. loaded agendas) or None if unknown or expired
+        :rtype: dict | None
+        """
+        if token is None:
+            return None
+        with self._lock:
+            client = self._clients.get(token)
+            if client is None:
+                return None
+            if client['last_used'] + self.idle_timeout < time.monotonic():
+                del self._clients[token]
+                self._close(client)
+                return None
+            client['last_used'] = time.monotonic()
+            return client
+
+    def identity(self, token, client):
+        """
+        Returns the cached login of a client without contacting ChurchTools
+        if it was confirmed longer than identity_validity ago it is revalidated by a background thread
+        and the client is removed if the login is no longer valid
+        :param token: token returned by add
+        :type token: str
+        :param client: dict as returned by get
+        :type client: dict
+        :return: user dict as returned by who_am_i
+        :rtype: dict
+        """
+        with self._lock:
+            if client['validated'] + self.identity_validity < time.monotonic() and not client['revalidating']:
+                client['revalidating'] = True
+                threading.Thread(target=self._revalidate, args=(token, client), daemon=True).start()
+            return client['user']
+
+    def _revalidate(self, token, client):
+        try:
+            user = client['api'].who_am_i()
+        except Exception:
+            logging.exception('Revalidation of web client failed - keeping cached login')
+            user = client['user']
+        if user is False:
+            logging.info('Login of web client %s is no longer valid', client['user'].get('id'))
+            self.remove(token)
+            return
+        with self._lock:
+            client['user'] = user
+            client['validated'] = time.monotonic()
+            client['revalidating'] = False
+
+    def remove(self, token):
+        """
+        Logs out a client
+        :param token: token returned by add
+        :type token: str
+        """
+        with self._lock:
+            client = self._clients.pop(token, None)
+        if client is not None:
+            self._close(client)
+
+    def remove_expired(self):
+        """
+        Removes all clients which were not used within idle_timeout
+        :return: number of removed clients
+        :rtype: int
+        """
+        now = time.monotonic()
+        with self._lock:
+            expired = [token for token, client in self._clients.items()
+                       if client['last_used'] + self.idle_timeout < now]
+            clients = [self._clients.pop(token) for token in expired]
+        for client in clients:
+            self._close(client)
+        if len(clients) > 0:
+            logging.info('%s idle web clients removed', len(clients))
+        return len(clients)
+
+    @staticmethod
+    def _close(client):
+        if client['api'].session is not None:
+            client['api'].session.close()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._clients)
@@ -11,8 +11,10 @@ def assign_specific_tag_to_all_songs(api):
     """
     songs = api.get_songs()
     all_song_ids = [value['id'] for value in songs]
-    for id in all_song_ids:
-        api.add_song_tag(id, 51)
+    results = api.add_song_tags_bulk([(id, 51) for id in all_song_ids])
+    failed = [result['song_id'] for result in results if result['result'] == 'failed']
+    if len(failed) > 0:
+        logging.warning("Adding tag failed for songs {}".format(failed))
 
 
 if __name__ == '__main__':
@@ -24,4 +24,7 @@ setup(
         'ChurchToolsWebService': ['templates/*.html', 'static/*']
     },
     install_requires=requirements,
+    extras_require={
+        'async': ['aiohttp>=3.8'],
+    },
 )
\ No newline at end of file